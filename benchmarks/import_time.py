@@ -0,0 +1,71 @@
+"""
+Cold start cost of importing the plugin, which mov-cli does on every startup.
+
+Compares importing film_central (scrapers resolved lazily) against importing it and 
+then resolving every scraper, which is what the plugin used to do at import time. mov-cli 
+and the libraries every scraper needs are imported before the timer starts, mov-cli has 
+them loaded anyway by the time it gets to the plugin.
+
+Run from the repository root with: python -m benchmarks.import_time [--runs 15]
+"""
+from __future__ import annotations
+
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+# What mov-cli has already imported when it loads the plugin.
+PRELOAD = """
+import sys, time
+import bs4, httpx, mov_cli
+import mov_cli.scraper, mov_cli.http_client
+"""
+
+LAZY = PRELOAD + """
+start = time.perf_counter()
+import film_central
+elapsed = time.perf_counter() - start
+"""
+
+EAGER = PRELOAD + """
+start = time.perf_counter()
+import film_central
+for name in film_central.plugin["scrapers"]:
+    film_central.plugin["scrapers"][name]
+elapsed = time.perf_counter() - start
+"""
+
+REPORT = """
+import json
+print(json.dumps({"elapsed": elapsed, "modules": len(sys.modules)}))
+"""
+
+def measure(code: str, runs: int) -> tuple:
+    timings = []
+    modules = 0
+
+    for _ in range(runs):
+        # A new interpreter every run so nothing is already imported.
+        output = subprocess.run(
+            [sys.executable, "-c", code + REPORT], capture_output = True, text = True, check = True
+        ).stdout
+
+        result = json.loads(output.strip().splitlines()[-1])
+        timings.append(result["elapsed"])
+        modules = result["modules"]
+
+    return statistics.median(timings), modules
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type = int, default = 15)
+    args = parser.parse_args()
+
+    lazy_time, lazy_modules = measure(LAZY, args.runs)
+    eager_time, eager_modules = measure(EAGER, args.runs)
+
+    print(f"import film_central (lazy):        {lazy_time * 1000:7.1f}ms  {lazy_modules} modules loaded")
+    print(f"import + every scraper (eager):    {eager_time * 1000:7.1f}ms  {eager_modules} modules loaded")
+    print(f"{eager_time / lazy_time:.1f}x faster cold start")
@@ -0,0 +1,112 @@
+"""
+Benchmarks parse time and peak memory of full BeautifulSoup parsing against the targeted 
+parsing the scrapers now do (strained soups for bflix, the streaming parser for vadapav).
+
+Run from the repository root with: python -m benchmarks.parsing [--pages DIR] [--parser html.parser]
+
+DIR can hold saved real pages named "bflix-*.html" (nites.nz search pages) and 
+"vadapav-*.html" (directory listings). Without it synthetic pages of a similar shape are used.
+"""
+from __future__ import annotations
+
+import timeit
+import argparse
+import tracemalloc
+from pathlib import Path
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from film_central.vadapav.directory import parse_directory, parse_directory_html
+
+def synthetic_bflix_page(results: int = 40) -> str:
+    articles = "".join(
+        f"""
+        <article class="post dfx fcl movies more-infos">
+            <div class="post-thumbnail"><figure><img data-src="//image.tmdb.org/t/p/w342/{i}.jpg" alt=""></figure></div>
+            <header class="entry-header"><div class="entry-title">Film {i}</div>
+                <div class="entry-meta"><span class="quality">HD</span><span class="year">20{i % 25:02d}</span></div>
+            </header>
+            <div class="entry-content"><p>{"Some long description of the film. " * 8}</p></div>
+            <ul><li class="fg1"><a class="btn" href="https://nites.nz/movies/film-{i}/">Watch</a></li></ul>
+        </article>
+        """ for i in range(results)
+    )
+
+    filler = "".join(f'<div class="widget"><ul>{"<li><a href=#>Link</a></li>" * 20}</ul></div>' for _ in range(30))
+
+    return f"<html><head><title>nites</title>{'<script>var x = 1;</script>' * 20}</head><body><nav>{filler}</nav><main>{articles}</main><aside>{filler}</aside></body></html>"
+
+def synthetic_vadapav_page(entries: int = 300) -> str:
+    directories = "".join(f'<div class="row"><a class="directory-entry" href="/{i:08x}-dir/">Season {i:02d}</a><span>-</span></div>' for i in range(entries // 10))
+    files = "".join(
+        f'<div class="row"><a class="file-entry wrap" href="/f/{i:08x}" data-href="/f/{i:08x}">Show.S01E{i:02d}.1080p.WEB.mkv</a><span>1.2 GB</span></div>' for i in range(entries)
+    )
+
+    return f'<html><head><title>vadapav</title></head><body><div class="directory"><div><span>TV</span><span>Show</span></div>{directories}{files}</div></body></html>'
+
+def full_bflix(html: str, parser: str) -> list:
+    soup = BeautifulSoup(html, parser)
+    return [result.find("div", {"class": "entry-title"}).text for result in soup.select("article.post.dfx.fcl.movies.more-infos")]
+
+def targeted_bflix(html: str, parser: str) -> list:
+    soup = BeautifulSoup(html, parser, parse_only = SoupStrainer("article"))
+    return [result.find("div", {"class": "entry-title"}).text for result in soup.select("article.post.dfx.fcl.movies.more-infos")]
+
+def full_vadapav(html: str, parser: str):
+    return parse_directory("", BeautifulSoup(html, parser))
+
+def targeted_vadapav(html: str, parser: str):
+    return parse_directory_html("", html, lambda x: BeautifulSoup(x, parser))
+
+def measure(function, html: str, parser: str):
+    timer = timeit.Timer(lambda: function(html, parser))
+    number, _ = timer.autorange()
+    seconds = min(timer.repeat(repeat = 3, number = number)) / number
+
+    tracemalloc.start()
+    function(html, parser)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return seconds, peak
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type = Path, default = None)
+    parser.add_argument("--parser", default = "html.parser")
+    args = parser.parse_args()
+
+    pages = {
+        "bflix": [synthetic_bflix_page()],
+        "vadapav": [synthetic_vadapav_page()],
+    }
+
+    if args.pages is not None:
+        for name in pages:
+            saved_pages = [path.read_text(encoding = "utf-8") for path in sorted(args.pages.glob(f"{name}-*.html"))]
+
+            if saved_pages:
+                pages[name] = saved_pages
+
+    cases = {
+        "bflix": (full_bflix, targeted_bflix),
+        "vadapav": (full_vadapav, targeted_vadapav),
+    }
+
+    print(f"{'page':<10} {'size':>8} {'full':>10} {'targeted':>10} {'full peak':>11} {'targeted peak':>14}")
+
+    for name, (full, targeted) in cases.items():
+
+        for html in pages[name]:
+            assert full(html, args.parser) == targeted(html, args.parser), f"Targeted {name} parsing disagrees with a full parse!"
+
+            full_time, full_peak = measure(full, html, args.parser)
+            targeted_time, targeted_peak = measure(targeted, html, args.parser)
+
+            print(
+                f"{name:<10} {len(html) // 1024:>6}KB {full_time * 1000:>8.2f}ms {targeted_time * 1000:>8.2f}ms " \
+                    f"{full_peak / 1024:>9.0f}KB {targeted_peak / 1024:>12.0f}KB"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Micro-benchmark of the shared RC4 engine against the pure python RC4 that 
+``VidPlay.decode_data`` and ``VidSrcToScraper.__deobf`` used to carry.
+
+Run from the repository root with: python -m benchmarks.rc4
+"""
+from __future__ import annotations
+
+import os
+import timeit
+
+from film_central.vidsrcto.ext.rc4 import rc4_decode
+
+KEY = "WXrUARXb1aDLaZjI"
+
+# Roughly: a vidplay id, an encoded source url, a mediainfo sized payload and something big.
+PAYLOAD_SIZES = (16, 256, 4 * 1024, 64 * 1024)
+
+def legacy_rc4(key: str, data: bytes | bytearray | str) -> bytearray:
+    key_bytes = bytes(key, 'utf-8')
+    s = bytearray(range(256))
+    j = 0
+
+    for i in range(256):
+        j = (j + s[i] + key_bytes[i % len(key_bytes)]) & 0xff
+        s[i], s[j] = s[j], s[i]
+
+    decoded = bytearray(len(data))
+    i = 0
+    k = 0
+
+    for index in range(len(data)):
+        i = (i + 1) & 0xff
+        k = (k + s[i]) & 0xff
+        s[i], s[k] = s[k], s[i]
+        t = (s[i] + s[k]) & 0xff
+
+        if isinstance(data[index], str):
+            decoded[index] = ord(data[index]) ^ s[t]
+        elif isinstance(data[index], int):
+            decoded[index] = data[index] ^ s[t]
+
+    return decoded
+
+def bench(function, data: bytes) -> float:
+    timer = timeit.Timer(lambda: function(KEY, data))
+    number, _ = timer.autorange()
+
+    return min(timer.repeat(repeat = 5, number = number)) / number
+
+def main() -> None:
+    print(f"{'size':>10} {'legacy':>12} {'rc4':>12} {'speedup':>9}")
+
+    for size in PAYLOAD_SIZES:
+        data = os.urandom(size)
+
+        assert legacy_rc4(KEY, data) == rc4_decode(KEY, data)
+
+        legacy_time = bench(legacy_rc4, data)
+        new_time = bench(rc4_decode, data)
+
+        print(f"{size:>10} {legacy_time * 1e6:>10.1f}us {new_time * 1e6:>10.1f}us {legacy_time / new_time:>8.1f}x")
+
+if __name__ == "__main__":
+    main()
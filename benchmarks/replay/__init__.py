@@ -0,0 +1,11 @@
+"""
+Offline replay benchmarks for every scraper.
+
+Recorded HTTP exchanges (a "cassette") are served by a local stand-in server with injected 
+latency, so search, scrape_episodes and scrape can be timed without touching the real sites.
+
+Run with: python -m benchmarks.replay [--cassette FILE] [--latency 0.05] [--jitter 0.02]
+Record a cassette from the real sites with: python -m benchmarks.replay --record FILE
+"""
+from .cassette import *
+from .server import *
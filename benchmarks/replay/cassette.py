@@ -0,0 +1,200 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Dict, List, Optional
+    from pathlib import Path
+
+import json
+import base64
+from urllib.parse import quote, urlsplit, parse_qsl, urlencode
+from dataclasses import dataclass, field, asdict
+
+__all__ = (
+    "Exchange",
+    "Cassette",
+    "synthetic_cassette",
+)
+
+@dataclass
+class Exchange:
+    method: str
+    url: str
+    status: int
+    headers: Dict[str, str] = field(default_factory = dict)
+    body: str = ""
+    """Base64 of the response body."""
+    match: str = "exact"
+    """"exact" matches the url with its query params in any order, "prefix" matches any url starting with it."""
+
+    @property
+    def content(self) -> bytes:
+        return base64.b64decode(self.body)
+
+def normalize_url(url: str) -> str:
+    parts = urlsplit(url)
+    return parts._replace(query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values = True))), fragment = "").geturl()
+
+class Cassette():
+    def __init__(self, exchanges: Optional[List[Exchange]] = None) -> None:
+        self.exchanges: List[Exchange] = []
+        self.__exact: Dict[tuple, Exchange] = {}
+
+        for exchange in exchanges or []:
+            self.add(exchange)
+
+    def add(self, exchange: Exchange) -> None:
+        self.exchanges.append(exchange)
+
+        if exchange.match == "exact":
+            self.__exact[(exchange.method, normalize_url(exchange.url))] = exchange
+
+    def add_response(self, method: str, url: str, status: int, content: bytes | str, headers: Optional[Dict[str, str]] = None, match: str = "exact") -> None:
+        if isinstance(content, str):
+            content = content.encode()
+
+        self.add(Exchange(method, url, status, headers or {}, base64.b64encode(content).decode(), match))
+
+    def find(self, method: str, url: str) -> Optional[Exchange]:
+        exchange = self.__exact.get((method, normalize_url(url)))
+
+        if exchange is None and method == "HEAD": # HEADs are answered from the recorded GET.
+            exchange = self.__exact.get(("GET", normalize_url(url)))
+
+        if exchange is None:
+            prefixes = [x for x in self.exchanges if x.match == "prefix" and x.method in (method, "GET") and url.startswith(x.url)]
+
+            if prefixes:
+                exchange = max(prefixes, key = lambda x: len(x.url))
+
+        return exchange
+
+    @classmethod
+    def load(cls, path: Path) -> Cassette:
+        return cls([Exchange(**exchange) for exchange in json.loads(path.read_text(encoding = "utf-8"))])
+
+    def save(self, path: Path) -> None:
+        path.write_text(json.dumps([asdict(x) for x in self.exchanges], indent = 1), encoding = "utf-8")
+
+def synthetic_cassette() -> Cassette:
+    """
+    A cassette shaped like the real sites, so the suite runs out of the box. 
+    Record a real one with ``--record`` for numbers closer to reality.
+    """
+    from mov_cli.utils.scraper import TheMovieDB
+    from film_central.vidsrcto.ext.rc4 import rc4_decode
+
+    cassette = Cassette()
+    html = {"content-type": "text/html; charset=utf-8"}
+    json_headers = {"content-type": "application/json"}
+
+    # vadapav
+    vadapav = "https://vadapav.mov"
+
+    def vadapav_page(breadcrumb: str, directories = (), files = ()) -> str:
+        entries = "".join(f'<div class="row"><a class="directory-entry" href="{href}">{name}</a></div>' for name, href in directories)
+        entries += "".join(f'<div class="row"><a class="file-entry" href="{href}" data-href="{href}">{name}</a><span>1.2 GB</span></div>' for name, href in files)
+
+        return f'<html><head><title>vadapav</title></head><body><div class="directory"><div><span>{breadcrumb}</span></div>{entries}</div></body></html>'
+
+    films = [(f"Benchmark Film {i} ({2000 + i})", f"/{i:08x}-film/") for i in range(12)]
+    shows = [(f"Benchmark Show {i}", f"/{i:08x}-show/") for i in range(8)]
+
+    cassette.add_response("GET", f"{vadapav}/s/benchmark", 200, vadapav_page("Search", films + shows), html)
+
+    for name, href in films:
+        files = [(f"{name[:-7]}.{resolution}.mkv", f"{href}{resolution}.mkv") for resolution in ("720p", "1080p", "2160p")]
+        page = vadapav_page("Movies", [("..", "/")], files + [(f"{name[:-7]}.srt", f"{href}en.srt")])
+
+        cassette.add_response("GET", f"{vadapav}{href}", 200, page, html)
+        cassette.add_response("GET", f"{vadapav}/{href.strip('/')}", 200, page, html)
+
+    for name, href in shows:
+        seasons = [(f"Season {season:02d}", f"{href}s{season:02d}/") for season in range(1, 7)]
+        page = vadapav_page("TV", [("..", "/")] + seasons)
+
+        cassette.add_response("GET", f"{vadapav}{href}", 200, page, html)
+        cassette.add_response("GET", f"{vadapav}/{href.strip('/')}", 200, page, html)
+
+        for season in range(1, 7):
+            files = [(f"Show.S{season:02d}E{episode:02d}.1080p.mkv", f"{href}s{season:02d}/e{episode:02d}.mkv") for episode in range(1, 11)]
+            cassette.add_response("GET", f"{vadapav}{href}s{season:02d}/", 200, vadapav_page("TV", [("..", href)], files), html)
+
+    # bflix
+    nites = "https://nites.nz"
+
+    articles = "".join(
+        f"""<article class="post dfx fcl movies more-infos">
+            <div class="post-thumbnail"><figure><img data-src="//image.tmdb.org/t/p/w342/{i}.jpg"></figure></div>
+            <header><div class="entry-title">Benchmark Film {i}</div><span class="quality">HD</span><span class="year">{2000 + i}</span></header>
+            <div class="entry-content"><p>{"A long description. " * 10}</p></div>
+            <ul><li class="fg1"><a class="btn" href="{nites}/movies/film-{i}/">Watch</a></li></ul>
+        </article>""" for i in range(20)
+    )
+    filler = "".join(f'<div class="widget"><ul>{"<li><a href=#>Link</a></li>" * 20}</ul></div>' for _ in range(20))
+
+    cassette.add_response("GET", f"{nites}/?s=benchmark", 200, f"<html><body><nav>{filler}</nav><main>{articles}</main></body></html>", html)
+
+    for i in range(20):
+        cassette.add_response(
+            "GET", f"{nites}/movies/film-{i}/", 200, 
+            f'<html><body>{filler}<div id="options-0"><iframe data-lazy-src="{nites}/embed/{i}"></iframe></div></body></html>', html
+        )
+        cassette.add_response("GET", f"{nites}/embed/{i}", 200, f'<html><body><iframe src="https://bflix.gs/e/{i}"></iframe></body></html>', html)
+        cassette.add_response("GET", f"https://bflix.gs/e/{i}", 200, f"<html><head><title>file{i}</title></head><body></body></html>", html)
+
+    # vidsrc.to (+ TMDB and vidplay)
+    vidsrc = "https://vidsrc.to"
+    provider = "https://vid2v11.site"
+    tmdb = TheMovieDB(None)
+
+    tmdb_movies = [{"id": 1000 + i, "title": f"Benchmark Film {i}", "release_date": f"{2000 + i}-01-01", "poster_path": f"/{i}.jpg"} for i in range(10)]
+    tmdb_shows = [{"id": 2000 + i, "name": f"Benchmark Show {i}", "first_air_date": f"{2000 + i}-01-01"} for i in range(5)]
+
+    cassette.add_response("GET", tmdb.search_url.format("movie", "benchmark", tmdb.api_key), 200, json.dumps({"results": tmdb_movies}), json_headers)
+    cassette.add_response("GET", tmdb.search_url.format("tv", "benchmark", tmdb.api_key), 200, json.dumps({"results": tmdb_shows}), json_headers)
+
+    for show in tmdb_shows:
+        seasons = [{"season_number": season, "episode_count": 10} for season in range(0, 6)]
+        cassette.add_response("GET", tmdb.metadata.format("tv", show["id"], tmdb.api_key), 200, json.dumps({"seasons": seasons}), json_headers)
+
+    def add_vidsrc_embed(embed_url: str, data_id: str) -> None:
+        cassette.add_response("GET", embed_url, 200, f'<html><body><a data-id="{data_id}">Server</a></body></html>', html)
+        cassette.add_response(
+            "GET", f"{vidsrc}/ajax/embed/episode/{data_id}/sources", 200, 
+            json.dumps({"result": [{"title": "Vidplay", "id": f"{data_id}-vp"}]}), json_headers
+        )
+
+        vidplay_url = quote(f"{provider}/e/{data_id}?t=benchmark&autostart=true")
+        encoded_url = base64.b64encode(bytes(rc4_decode("WXrUARXb1aDLaZjI", vidplay_url.encode()))).decode().replace("/", "_").replace("+", "-")
+
+        cassette.add_response("GET", f"{vidsrc}/ajax/embed/source/{data_id}-vp", 200, json.dumps({"result": {"url": encoded_url}}), json_headers)
+
+    for i, movie in enumerate(tmdb_movies):
+
+        if i % 3 == 2: # Some titles vidsrc.to doesn't have.
+            cassette.add_response("GET", f"{vidsrc}/embed/movie/{movie['id']}", 404, "Not Found", html)
+            continue
+
+        add_vidsrc_embed(f"{vidsrc}/embed/movie/{movie['id']}", f"m{movie['id']}")
+
+    for show in tmdb_shows:
+
+        for episode in range(1, 11):
+            add_vidsrc_embed(f"{vidsrc}/embed/tv/{show['id']}/1/{episode}", f"t{show['id']}e{episode}")
+
+    cassette.add_response(
+        "GET", "https://github.com/JDALab/vidkey-js/blob/main/keys.json", 200, 
+        '<html>"rawLines": ["[\\\\"benchkey1\\\\",\\\\"benchkey2\\\\"]"]</html>', html
+    )
+    cassette.add_response("GET", f"{provider}/futoken", 200, "var k='benchmarkfutoken';", {"content-type": "text/javascript"})
+    cassette.add_response(
+        "GET", f"{provider}/mediainfo/", 200, 
+        json.dumps({"result": {"sources": [{"file": "https://cdn.example/master.m3u8"}]}}), json_headers, match = "prefix"
+    )
+
+    # The streams themselves, for the HEAD requests that check they're still up.
+    for stream_host in ("https://myfilestorage.xyz/", "https://cdn.example/"):
+        cassette.add_response("GET", stream_host, 200, "", {"content-type": "video/mp4"}, match = "prefix")
+
+    return cassette
@@ -0,0 +1,252 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Any, Callable, Dict, List, Optional
+
+import time
+import argparse
+import threading
+import tracemalloc
+from pathlib import Path
+from html.parser import HTMLParser
+from dataclasses import dataclass, field
+
+import bs4
+from mov_cli import Config, MetadataType
+from mov_cli.utils import EpisodeSelector
+
+from film_central.utils import SingleFlight
+
+from .cassette import Cassette, synthetic_cassette
+from .server import ReplayServer, ReplayHTTPClient, RecordingHTTPClient
+
+__all__ = ()
+
+ALL_PHASES = ["search", "scrape_episodes", "scrape", "scrape_season"]
+
+@dataclass
+class PhaseResult:
+    scraper: str
+    phase: str
+    wall_time: float = 0
+    parse_time: float = 0
+    requests: int = 0
+    saved: int = 0
+    """Requests and parses that piggybacked on an identical one already in flight."""
+    peak_memory: Optional[int] = None
+    error: Optional[str] = None
+
+@dataclass
+class Scenario:
+    name: str
+    scraper: Callable[[Config, Any], Any]
+    query: str = "benchmark"
+    phases: List[str] = field(default_factory = lambda: ["search", "scrape_episodes", "scrape"])
+
+class ParseClock():
+    """
+    Adds up the time spent building soups and feeding the stdlib html parser, from every thread. 
+    Nested calls (bs4 feeding html.parser) only count once.
+    """
+    def __init__(self) -> None:
+        self.total = 0.0
+        self.__lock = threading.Lock()
+        self.__local = threading.local()
+        self.__originals = {}
+
+    def __timed(self, func: Callable) -> Callable:
+        clock = self
+
+        def timed(*args, **kwargs):
+            depth = getattr(clock.__local, "depth", 0)
+            clock.__local.depth = depth + 1
+            start = time.perf_counter()
+
+            try:
+                return func(*args, **kwargs)
+            finally:
+                clock.__local.depth = depth
+
+                if depth == 0:
+                    with clock.__lock:
+                        clock.total += time.perf_counter() - start
+
+        return timed
+
+    def __enter__(self) -> ParseClock:
+        for owner, name in ((bs4.BeautifulSoup, "__init__"), (HTMLParser, "feed")):
+            original = getattr(owner, name)
+            self.__originals[(owner, name)] = original
+            setattr(owner, name, self.__timed(original))
+
+        return self
+
+    def __exit__(self, *args) -> None:
+        for (owner, name), original in self.__originals.items():
+            setattr(owner, name, original)
+
+def scenarios() -> List[Scenario]:
+    from film_central.bflix import BFlix
+    from film_central.vadapav import VadapavScraper
+    from film_central.vidsrcto import VidSrcToScraper
+
+    # Every cache is off, we want to time the scrapers themselves. Variant probing is off 
+    # too, it would download from the real CDNs and make runs non-deterministic.
+    options = {"cache": False, "probe": False}
+
+    return [
+        Scenario("bflix", lambda config, http_client: BFlix(config, http_client, dict(options))),
+        Scenario("vadapav", lambda config, http_client: VadapavScraper(config, http_client, dict(options)), phases = ALL_PHASES),
+        Scenario("vidsrcto", lambda config, http_client: VidSrcToScraper(config, http_client, dict(options)), phases = ALL_PHASES),
+        Scenario("vidplay", lambda config, http_client: VidSrcToScraper(config, http_client, dict(options)), phases = ["search", "resolve_source"]),
+    ]
+
+def run_scenario(scenario: Scenario, config: Config, http_client: ReplayHTTPClient, trace_memory: bool) -> List[PhaseResult]:
+    from film_central.vidsrcto.ext.keys import KEY_STORE, FUTOKEN_STORE
+
+    # Vidplay keys are shared by the whole process, start every scenario cold.
+    KEY_STORE.invalidate()
+    FUTOKEN_STORE.invalidate("https://vid2v11.site")
+
+    results = []
+    state: Dict[str, Any] = {"scraper": scenario.scraper(config, http_client)}
+
+    def search():
+        state["results"] = list(state["scraper"].search(scenario.query, 20))
+        state["metadata"] = next((x for x in state["results"] if x.type == MetadataType.MULTI), state["results"][0])
+
+    def scrape_episodes():
+        return state["scraper"].scrape_episodes(state["metadata"])
+
+    def scrape():
+        return state["scraper"].scrape(state["metadata"], EpisodeSelector(1, 1))
+
+    def scrape_season():
+        return list(state["scraper"].scrape_season(state["metadata"], 1))
+
+    def resolve_source():
+        vidplay = state["scraper"].vidplay
+        return vidplay.resolve_source("https://vid2v11.site/e/benchmark?t=benchmark", "https://vid2v11.site")
+
+    phases = {
+        "search": search, 
+        "scrape_episodes": scrape_episodes, 
+        "scrape": scrape, 
+        "scrape_season": scrape_season, 
+        "resolve_source": resolve_source
+    }
+
+    for phase in scenario.phases:
+        result = PhaseResult(scenario.name, phase)
+        requests_before = sum(http_client.requests.values())
+        saved_before = SingleFlight.default().saved()
+
+        if trace_memory:
+            tracemalloc.start()
+
+        with ParseClock() as parse_clock:
+            start = time.perf_counter()
+
+            try:
+                phases[phase]()
+            except Exception as e:
+                result.error = f"{e.__class__.__name__}: {e}"
+
+            result.wall_time = time.perf_counter() - start
+
+        if trace_memory:
+            result.peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        result.parse_time = parse_clock.total
+        result.requests = sum(http_client.requests.values()) - requests_before
+        result.saved = SingleFlight.default().saved() - saved_before
+
+        results.append(result)
+
+        if result.error is not None:
+            break # the next phases depend on this one.
+
+    return results
+
+def record(path: Path, query: str) -> None:
+    """Runs every scenario against the real sites and saves what was exchanged."""
+    cassette = Cassette()
+    config = Config()
+
+    for scenario in scenarios():
+        scraper = scenario.scraper(config, RecordingHTTPClient(cassette))
+
+        try:
+            metadata = list(scraper.search(query, 20))
+            scraper.scrape_episodes(metadata[0])
+            scraper.scrape(metadata[0], EpisodeSelector(1, 1))
+        except Exception as e:
+            print(f"{scenario.name}: {e.__class__.__name__}: {e}")
+
+    cassette.save(path)
+    print(f"Recorded {len(cassette.exchanges)} exchanges to '{path}'.")
+
+def format_results(results: List[PhaseResult]) -> str:
+    lines = [f"{'scraper':<14} {'phase':<16} {'wall':>9} {'parse':>9} {'requests':>9} {'saved':>6} {'peak mem':>10}"]
+
+    for result in results:
+        peak_memory = "-" if result.peak_memory is None else f"{result.peak_memory / 1024:.0f} KiB"
+
+        lines.append(
+            f"{result.scraper:<14} {result.phase:<16} {result.wall_time * 1000:>7.1f}ms "
+            f"{result.parse_time * 1000:>7.1f}ms {result.requests:>9} {result.saved:>6} {peak_memory:>10}" + 
+            (f"  ({result.error})" if result.error else "")
+        )
+
+    return "\n".join(lines)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog = "python -m benchmarks.replay", description = "Times every scraper against recorded http exchanges.")
+    parser.add_argument("--cassette", type = Path, help = "A cassette recorded with --record, defaults to a synthetic one.")
+    parser.add_argument("--record", type = Path, metavar = "FILE", help = "Record a cassette from the real sites instead.")
+    parser.add_argument("--query", default = "benchmark")
+    parser.add_argument("--latency", type = float, default = 0.05, help = "Seconds every response is held back for.")
+    parser.add_argument("--jitter", type = float, default = 0.02, help = "Up to this many seconds are added or taken off the latency.")
+    parser.add_argument("--rounds", type = int, default = 3)
+    parser.add_argument("--scraper", action = "append", help = "Only run these scrapers.")
+    args = parser.parse_args()
+
+    if args.record is not None:
+        record(args.record, args.query)
+        return
+
+    cassette = Cassette.load(args.cassette) if args.cassette else synthetic_cassette()
+    config = Config()
+
+    selected = [x for x in scenarios() if args.scraper is None or x.name in args.scraper]
+
+    with ReplayServer(cassette, args.latency, args.jitter) as server:
+
+        for scenario in selected:
+            scenario.query = args.query
+
+            best: Dict[str, PhaseResult] = {}
+
+            # Timings are the best of the rounds, memory is measured in a 
+            # separate round as tracemalloc slows everything down a lot.
+            for _ in range(args.rounds):
+
+                for result in run_scenario(scenario, config, ReplayHTTPClient(server.url), trace_memory = False):
+
+                    if result.phase not in best or result.wall_time < best[result.phase].wall_time:
+                        best[result.phase] = result
+
+            for result in run_scenario(scenario, config, ReplayHTTPClient(server.url), trace_memory = True):
+
+                if result.phase in best:
+                    best[result.phase].peak_memory = result.peak_memory
+
+            print(format_results(list(best.values())), end = "\n\n")
+
+        if server.unmatched:
+            print("Requests missing from the cassette:")
+
+            for url, count in server.unmatched.most_common():
+                print(f"  {count}x {url}")
@@ -0,0 +1,156 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Dict, Optional
+
+    from httpx import Response
+
+    from .cassette import Cassette
+
+import time
+import random
+import threading
+from collections import Counter
+from urllib.parse import urlsplit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+from mov_cli.http_client import HTTPClient
+
+__all__ = (
+    "ReplayServer",
+    "ReplayHTTPClient",
+    "RecordingHTTPClient",
+)
+
+# Headers httpx would get wrong if we replayed them as recorded.
+SKIPPED_HEADERS = ("content-length", "content-encoding", "transfer-encoding", "connection")
+
+class ReplayServer():
+    """
+    Serves a cassette on localhost. The original url is carried in the path 
+    (``/https/vadapav.mov/s/query``) and every response is held back by 
+    ``latency`` seconds, give or take up to ``jitter`` seconds.
+    """
+    def __init__(self, cassette: Cassette, latency: float = 0.05, jitter: float = 0.02, seed: int = 0) -> None:
+        self.cassette = cassette
+        self.latency = latency
+        self.jitter = jitter
+        self.unmatched: Counter[str] = Counter()
+
+        self.__random = random.Random(seed)
+        self.__random_lock = threading.Lock()
+
+        self.__server = ThreadingHTTPServer(("127.0.0.1", 0), self.__handler())
+        self.__server.daemon_threads = True
+        self.__server.handle_error = lambda request, client_address: None # Clients hang up mid-body on purpose (e.g. probes).
+        self.__thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.__server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def delay(self) -> float:
+        with self.__random_lock:
+            return max(0, self.latency + self.__random.uniform(-self.jitter, self.jitter))
+
+    def __enter__(self) -> ReplayServer:
+        self.__thread = threading.Thread(target = self.__server.serve_forever, daemon = True)
+        self.__thread.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.__server.shutdown()
+        self.__server.server_close()
+
+    def __handler(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                self.__replay("GET")
+
+            def do_HEAD(self) -> None:
+                self.__replay("HEAD")
+
+            def do_POST(self) -> None:
+                self.rfile.read(int(self.headers.get("content-length", 0)))
+                self.__replay("POST")
+
+            def __replay(self, method: str) -> None:
+                scheme, _, rest = self.path.lstrip("/").partition("/")
+                url = f"{scheme}://{rest}"
+
+                time.sleep(server.delay())
+
+                exchange = server.cassette.find(method, url)
+
+                if exchange is None:
+                    server.unmatched[url] += 1
+                    status, headers, content = 404, {"content-type": "text/plain"}, b"Not in the cassette."
+                else:
+                    status, headers, content = exchange.status, exchange.headers, exchange.content
+
+                self.send_response(status)
+
+                for name, value in headers.items():
+
+                    if name.lower() not in SKIPPED_HEADERS:
+                        self.send_header(name, value)
+
+                self.send_header("content-length", str(len(content)))
+                self.end_headers()
+
+                if method != "HEAD":
+                    self.wfile.write(content)
+
+        return Handler
+
+class ReplayHTTPClient(HTTPClient):
+    """A mov-cli http client that sends every request to a :class:`ReplayServer` instead, counting them per host."""
+    def __init__(self, server_url: str, **kwargs) -> None:
+        self.server_url = server_url
+        self.requests: Counter[str] = Counter()
+        self.__requests_lock = threading.Lock()
+
+        super().__init__(**kwargs)
+
+    def request(self, method, url: str, params: Optional[Dict[str, str]] = None, headers = None, include_default_headers = False, redirect = False, **kwargs) -> Response:
+        full_url = httpx.URL(url).copy_merge_params(params or {})
+
+        with self.__requests_lock:
+            self.requests[full_url.host] += 1
+
+        parts = urlsplit(str(full_url))
+        replay_url = f"{self.server_url}/{parts.scheme}/{parts.netloc}{parts.path or '/'}" + (f"?{parts.query}" if parts.query else "")
+
+        return super().request(method, replay_url, None, headers, include_default_headers, redirect, **kwargs)
+
+class RecordingHTTPClient(HTTPClient):
+    """A mov-cli http client that records every exchange it makes with the real sites into a cassette."""
+    def __init__(self, cassette: Cassette, **kwargs) -> None:
+        self.cassette = cassette
+        self.__cassette_lock = threading.Lock()
+
+        super().__init__(**kwargs)
+
+    def request(self, method, url: str, params: Optional[Dict[str, str]] = None, headers = None, include_default_headers = False, redirect = False, **kwargs) -> Response:
+        response = super().request(method, url, params, headers, include_default_headers, redirect, **kwargs)
+
+        with self.__cassette_lock:
+            self.cassette.add_response(
+                method.upper(), 
+                str(response.request.url), 
+                response.status_code, 
+                response.content, 
+                {name: value for name, value in response.headers.items() if name.lower() not in SKIPPED_HEADERS}
+            )
+
+        return response
@@ -4,21 +4,38 @@ from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from mov_cli.plugins import PluginHookData
 
-from .bflix import *
-from .vadapav import *
-from .vidsrcto import *
+from .lazy import LazyScrapers
+
+# Scrapers are only imported once mov-cli actually uses them, as the plugin gets imported on every startup.
+SCRAPERS = {
+    "BFlix": "film_central.bflix.scraper",
+    "VadapavScraper": "film_central.vadapav.scraper",
+    "VidSrcToScraper": "film_central.vidsrcto.scraper",
+    "AggregateScraper": "film_central.aggregate.scraper",
+    "AdaptiveScraper": "film_central.aggregate.adaptive",
+}
 
 plugin: PluginHookData = {
     "version": 1,
     "package_name": "film-central", # Required for the plugin update checker.
-    "scrapers": {
-        "DEFAULT": BFlix,
-        "ANDROID.DEFAULT": VadapavScraper,
-        "IOS.DEFAULT": VadapavScraper,
-        "bflix": BFlix, # Experimental
-        "vadapav": VadapavScraper,
-        "vidsrcto": VidSrcToScraper,
-    }
+    "scrapers": LazyScrapers({
+        "DEFAULT": "film_central.aggregate.adaptive:AdaptiveScraper", # Whichever provider is fastest right now.
+        "ANDROID.DEFAULT": "film_central.vadapav.scraper:VadapavScraper",
+        "IOS.DEFAULT": "film_central.vadapav.scraper:VadapavScraper",
+        "bflix": "film_central.bflix.scraper:BFlix", # Experimental
+        "vadapav": "film_central.vadapav.scraper:VadapavScraper",
+        "vidsrcto": "film_central.vidsrcto.scraper:VidSrcToScraper",
+        "aggregate": "film_central.aggregate.scraper:AggregateScraper", # Searches them all and races them for streams.
+        "adaptive": "film_central.aggregate.adaptive:AdaptiveScraper",
+    })
 }
 
-__version__ = "1.4.2"
\ No newline at end of file
+def __getattr__(name: str):
+    # Keeps 'from film_central import BFlix' working without importing every scraper up front.
+    if name in SCRAPERS:
+        import importlib
+        return getattr(importlib.import_module(SCRAPERS[name]), name)
+
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
+__version__ = "1.4.2"
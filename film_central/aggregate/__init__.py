@@ -0,0 +1,2 @@
+from .scraper import *
+from .adaptive import *
\ No newline at end of file
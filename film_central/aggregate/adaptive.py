@@ -0,0 +1,283 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Dict, Iterable, List, Literal, Optional, Tuple
+
+    StatsKindT = Literal["search", "scrape"]
+
+    from mov_cli import Config
+    from mov_cli.http_client import HTTPClient
+    from mov_cli.scraper import ScraperOptionsT
+
+import json
+import time
+import threading
+import statistics
+from collections import Counter
+from dataclasses import dataclass, asdict, fields
+from concurrent.futures import ThreadPoolExecutor
+
+from mov_cli import utils
+from mov_cli.scraper import Scraper
+from mov_cli import Multi, Single, Metadata
+
+from ..utils import CachedHTTPClient, DiskStore, HTTPCache, HTTPClientWrapper, get_cache_directory, wrap_http_client
+from .scraper import PROVIDERS
+
+__all__ = (
+    "AdaptiveScraper",
+    "ProviderStats",
+    "ProviderHealth",
+)
+
+PROVIDER_URLS = {
+    "bflix": "https://nites.nz",
+    "vadapav": "https://vadapav.mov",
+    "vidsrcto": "https://vidsrc.to",
+}
+
+STATS_TTL = 30 * 24 * 60 * 60
+SMOOTHING = 0.3
+"""How much a new sample moves the rolling averages."""
+UNHEALTHY_ERROR_RATE = 0.5
+PROBE_INTERVAL = 10 * 60
+"""Providers we haven't heard from in this long get a cheap HEAD to see how they're doing."""
+
+probe_executor = ThreadPoolExecutor(max_workers = 3, thread_name_prefix = "film-central-probe")
+
+@dataclass
+class ProviderStats:
+    latency: Optional[float] = None
+    """Rolling average of how long the provider took to answer, in seconds."""
+    error_rate: float = 0.0
+    """Rolling average of failures, 0 (never fails) to 1 (always fails)."""
+    samples: int = 0
+    updated_at: float = 0.0
+
+    @classmethod
+    def from_json(cls, value: bytes) -> ProviderStats:
+        """Fields this version doesn't know (saved by another one) are dropped, stats that can't be read at all start over."""
+        names = {field.name for field in fields(cls)}
+
+        try:
+            return cls(**{name: x for name, x in json.loads(value).items() if name in names})
+        except (ValueError, TypeError, AttributeError):
+            return cls()
+
+    def record(self, duration: Optional[float], failed: bool) -> None:
+        if duration is not None:
+            self.latency = duration if self.latency is None else self.latency + SMOOTHING * (duration - self.latency)
+
+        self.error_rate += SMOOTHING * (float(failed) - self.error_rate)
+        self.samples += 1
+        self.updated_at = time.time()
+
+    @property
+    def healthy(self) -> bool:
+        return self.error_rate < UNHEALTHY_ERROR_RATE
+
+    @property
+    def score(self) -> Optional[float]:
+        """Lower is better, None until the provider has answered at least once."""
+        if self.latency is None:
+            return None
+
+        return self.latency * (1 + 4 * self.error_rate)
+
+class ProviderHealth():
+    """
+    Per provider latency and error rates, persisted so every run starts with what the last one learned.
+
+    Searches and scrapes are kept apart as a scrape is a chain of several requests, only the search 
+    stats (what routing a search decides on) rank the providers but failing either makes one unhealthy.
+    """
+    def __init__(self, store: DiskStore, providers: Iterable[str]) -> None:
+        self.store = store
+
+        self.__lock = threading.Lock()
+        self.__stats: Dict[Tuple[str, StatsKindT], ProviderStats] = {}
+
+        for name in providers:
+
+            for kind in ("search", "scrape"):
+                entry = store.get(f"provider:{name}:{kind}")
+                self.__stats[(name, kind)] = ProviderStats.from_json(entry.value) if entry is not None else ProviderStats()
+
+    @classmethod
+    def default(cls, providers: Iterable[str]) -> ProviderHealth:
+        return cls(DiskStore.open(get_cache_directory().joinpath("provider-stats.sqlite3"), max_size = 1024 * 1024), providers)
+
+    def stats(self, name: str, kind: StatsKindT = "search") -> ProviderStats:
+        with self.__lock:
+            return self.__stats[(name, kind)]
+
+    def record(self, name: str, duration: Optional[float], failed: bool, kind: StatsKindT = "search") -> None:
+        with self.__lock:
+            stats = self.__stats[(name, kind)]
+            stats.record(duration, failed)
+            data = json.dumps(asdict(stats)).encode()
+
+        self.store.set(f"provider:{name}:{kind}", data, STATS_TTL)
+
+    def ranked(self) -> List[str]:
+        """
+        Fastest healthy providers first, unhealthy ones last (still tried if everything else fails). 
+        Providers we haven't measured yet are ranked as typical ones, the median of the known scores.
+        """
+        with self.__lock:
+            names = [name for name, kind in self.__stats if kind == "search"]
+            healthy = {name: self.__stats[(name, "search")].healthy and self.__stats[(name, "scrape")].healthy for name in names}
+            scores = {name: self.__stats[(name, "search")].score for name in names}
+
+        known_scores = [score for score in scores.values() if score is not None]
+        prior = statistics.median(known_scores) if known_scores else 0.0
+
+        return sorted(
+            names, key = lambda name: (not healthy[name], prior if scores[name] is None else scores[name])
+        )
+
+    def due_for_probe(self) -> List[str]:
+        now = time.time()
+        last_heard_from: Dict[str, float] = {}
+
+        with self.__lock:
+
+            for (name, _), stats in self.__stats.items():
+                last_heard_from[name] = max(last_heard_from.get(name, 0.0), stats.updated_at)
+
+        return [name for name, updated_at in last_heard_from.items() if now - updated_at > PROBE_INTERVAL]
+
+class AdaptiveScraper(Scraper):
+    """
+    Sends each search to whichever provider is currently fastest and healthy, falling back to 
+    the next one if it fails or finds nothing. Titles are scraped with the provider that found them.
+    """
+    def __init__(self, config: Config, http_client: HTTPClient, options: Optional[ScraperOptionsT] = None) -> None:
+        options = options or {}
+        http_client = wrap_http_client(http_client, options)
+
+        provider_names = options.get("providers")
+        provider_names = provider_names.split(",") if isinstance(provider_names, str) else list(PROVIDERS)
+
+        # Built when first routed to, so an unused provider costs nothing.
+        self.__providers: Dict[str, Scraper] = {}
+        self.__provider_names = [name for name in provider_names if name in PROVIDERS]
+        self.__providers_lock = threading.Lock()
+
+        self.health = ProviderHealth.default(self.__provider_names)
+        self.cache = http_cache_of(http_client)
+        """The http cache in our stack (None if it's off), to leave what it answered out of the latencies."""
+
+        # (metadata id, title) -> the provider that found it, ids only mean something to their own provider.
+        self.__origins: Dict[Tuple[str, str], str] = {}
+
+        super().__init__(config, http_client, options)
+
+    def search(self, query: str, limit: Optional[int] = None) -> Iterable[Metadata]:
+        self.__probe_stale_providers()
+
+        for name in self.health.ranked():
+            started_at = time.perf_counter()
+            cache_events = self.__cache_events()
+            found_any = False
+
+            try:
+
+                for metadata in self.__provider(name).search(query, limit):
+
+                    if not found_any: # Time to first result is what the user feels.
+                        found_any = True
+                        self.__record(name, "search", started_at, cache_events, failed = False)
+                        self.logger.debug(f"Routed the search to '{name}'.")
+
+                    self.__origins[(str(metadata.id), metadata.title)] = name
+
+                    yield metadata
+
+            except Exception as e:
+                self.health.record(name, time.perf_counter() - started_at, failed = True)
+
+                if found_any:
+                    raise
+
+                self.logger.warning(f"Searching with '{name}' failed, trying the next provider. Error: {e}")
+                continue
+
+            if found_any:
+                return
+
+            # Nothing found isn't the provider's fault but it does tell us how fast it is.
+            self.__record(name, "search", started_at, cache_events, failed = False)
+
+    def scrape_episodes(self, metadata: Metadata):
+        return self.__origin_provider(metadata).scrape_episodes(metadata)
+
+    def scrape(self, metadata: Metadata, episode: utils.EpisodeSelector) -> Optional[Multi | Single]:
+        name = self.__origins.get((str(metadata.id), metadata.title), self.health.ranked()[0])
+        started_at = time.perf_counter()
+        cache_events = self.__cache_events()
+
+        try:
+            media = self.__provider(name).scrape(metadata, episode)
+        except Exception:
+            self.__record(name, "scrape", started_at, cache_events, failed = True)
+            raise
+
+        self.__record(name, "scrape", started_at, cache_events, failed = media is None)
+
+        return media
+
+    def __origin_provider(self, metadata: Metadata) -> Scraper:
+        return self.__provider(self.__origins.get((str(metadata.id), metadata.title), self.health.ranked()[0]))
+
+    def __record(self, name: str, kind: StatsKindT, started_at: float, cache_events: Counter[str], failed: bool) -> None:
+        duration = time.perf_counter() - started_at
+        events = self.__cache_events() - cache_events
+
+        # Answered without going to the provider it says nothing about how fast the provider 
+        # is (only that it's up), the cache would make it look almost instant.
+        if events["hit"] > 0 and events["miss"] == 0 and events["revalidated"] == 0:
+            duration = None
+
+        self.health.record(name, duration, failed = failed, kind = kind)
+
+    def __cache_events(self) -> Counter[str]:
+        return Counter() if self.cache is None else self.cache.event_counts()
+
+    def __provider(self, name: str) -> Scraper:
+        with self.__providers_lock:
+            provider = self.__providers.get(name)
+
+            if provider is None:
+                provider = PROVIDERS[name](self.config, self.http_client, self.options)
+                self.__providers[name] = provider
+
+            return provider
+
+    def __probe_stale_providers(self) -> None:
+        for name in self.health.due_for_probe():
+            probe_executor.submit(self.__probe, name)
+
+    def __probe(self, name: str) -> None:
+        try:
+            response = self.http_client.request("HEAD", PROVIDER_URLS[name], include_default_headers = True, redirect = True)
+            failed = response.status_code >= 500
+        except Exception:
+            failed = True
+
+        self.logger.debug(f"Probed '{name}' ({'down' if failed else 'up'}).")
+
+        # A HEAD is much quicker than a search so it only counts towards health, not latency.
+        self.health.record(name, None, failed = failed)
+
+def http_cache_of(http_client: HTTPClient) -> Optional[HTTPCache]:
+    """The cache of the ``CachedHTTPClient`` in that stack of http client wrappers, if there is one."""
+    while isinstance(http_client, HTTPClientWrapper):
+
+        if isinstance(http_client, CachedHTTPClient):
+            return http_client.cache
+
+        http_client = http_client.http_client
+
+    return None
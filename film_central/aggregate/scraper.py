@@ -0,0 +1,181 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Dict, Iterable, List, Optional, Tuple
+
+    from mov_cli import Config
+    from mov_cli.http_client import HTTPClient
+    from mov_cli.scraper import ScraperOptionsT
+
+import re
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from mov_cli import utils
+from mov_cli.scraper import Scraper
+from mov_cli import Multi, Single, Metadata, MetadataType
+
+from ..lazy import LazyScrapers
+from ..utils import StreamCache, race, get_bool_option, wrap_http_client
+
+__all__ = ("AggregateScraper",)
+
+# Imported when first used, so picking the default (adaptive) scraper doesn't import every provider.
+PROVIDERS = LazyScrapers({
+    "bflix": "film_central.bflix.scraper:BFlix",
+    "vadapav": "film_central.vadapav.scraper:VadapavScraper",
+    "vidsrcto": "film_central.vidsrcto.scraper:VidSrcToScraper",
+})
+
+class AggregateScraper(Scraper):
+    """
+    Searches every provider at once, merging their results as they come in, 
+    then races the providers that have the chosen title for the first working stream.
+
+    Every result is tagged with the provider it came from (``metadata.provider``) so a title 
+    we have no alternatives for can still be scraped with the provider that found it.
+    """
+    def __init__(self, config: Config, http_client: HTTPClient, options: Optional[ScraperOptionsT] = None) -> None:
+        options = options or {}
+        http_client = wrap_http_client(http_client, options)
+
+        # e.g. '-- providers vadapav,vidsrcto' to leave bflix out.
+        provider_names = options.get("providers")
+        provider_names = provider_names.split(",") if isinstance(provider_names, str) else list(PROVIDERS)
+
+        self.providers: Dict[str, Scraper] = {
+            name: PROVIDERS[name](config, http_client, options) for name in provider_names if name in PROVIDERS
+        }
+
+        # Every provider's copy of each title we've seen, keyed by title_key(). Kept across 
+        # searches so a title picked from an earlier search still has all its copies.
+        self.__alternatives: Dict[tuple, List[Tuple[str, Metadata]]] = {}
+        self.__alternatives_lock = threading.Lock()
+
+        super().__init__(config, http_client, options)
+
+    def search(self, query: str, limit: Optional[int] = None) -> Iterable[Metadata]:
+        limit = 20 if limit is None else limit
+
+        results: queue.Queue[Tuple[str, Optional[Metadata]]] = queue.Queue()
+        listing = threading.Event() # Cleared once we've listed enough titles (or the caller stopped listening).
+        listing.set()
+
+        listed = set()
+
+        def search_provider(name: str, provider: Scraper) -> None:
+            try:
+
+                for metadata in provider.search(query, limit):
+                    metadata.provider = name
+                    key = title_key(metadata)
+
+                    # Copies of titles that are already listed don't count towards the limit, so 
+                    # we keep recording them after it's reached, they're what scrape() races.
+                    with self.__alternatives_lock:
+                        self.__add_copy(key, name, metadata)
+
+                        new_title = listing.is_set() and key not in listed
+                        listed.add(key)
+
+                    if new_title:
+                        results.put((name, metadata))
+
+            except Exception as e:
+                self.logger.warning(f"Searching '{name}' failed, carrying on without it: {e}")
+
+            finally:
+                results.put((name, None))
+
+        executor = ThreadPoolExecutor(max_workers = len(self.providers) or 1)
+
+        for name, provider in self.providers.items():
+            executor.submit(search_provider, name, provider)
+
+        executor.shutdown(wait = False)
+
+        finished = 0
+        yielded = 0
+
+        try:
+
+            while finished < len(self.providers) and yielded < limit:
+                name, metadata = results.get()
+
+                if metadata is None:
+                    finished += 1
+                    continue
+
+                yielded += 1
+
+                yield metadata
+
+        finally:
+            listing.clear()
+
+    def scrape_episodes(self, metadata: Metadata):
+        calls = [
+            lambda provider = self.providers[name], metadata = copy: provider.scrape_episodes(metadata)
+                for name, copy in self.__copies_of(metadata)
+        ]
+
+        episodes = race(calls, accept = lambda episodes: bool(episodes) and None not in episodes)
+
+        return episodes if episodes is not None else {None: 1}
+
+    def scrape(self, metadata: Metadata, episode: utils.EpisodeSelector) -> Optional[Multi | Single]:
+        validate = get_bool_option(self.options, "validate", True)
+
+        def scrape_with(name: str, copy: Metadata) -> Optional[Tuple[str, Multi | Single]]:
+            media = self.providers[name].scrape(copy, episode)
+
+            if media is None or (validate and not StreamCache.is_still_valid(self.http_client, media)):
+                return None
+
+            return name, media
+
+        winner = race(
+            lambda name = name, copy = copy: scrape_with(name, copy) for name, copy in self.__copies_of(metadata)
+        )
+
+        if winner is None:
+            return None
+
+        self.logger.debug(f"'{winner[0]}' won the race for '{metadata.title}'.")
+
+        return winner[1]
+
+    def __add_copy(self, key: tuple, name: str, metadata: Metadata) -> None:
+        copies = self.__alternatives.setdefault(key, [])
+
+        if not any(copy_name == name and copy.id == metadata.id for copy_name, copy in copies):
+            copies.append((name, metadata))
+
+    def __copies_of(self, metadata: Metadata) -> List[Tuple[str, Metadata]]:
+        """
+        Every provider's copy of that title. For a title we've never seen that's the provider 
+        it's tagged with or, failing that, every provider (the ones it doesn't belong to just fail).
+        """
+        with self.__alternatives_lock:
+            copies = list(self.__alternatives.get(title_key(metadata), []))
+
+        if copies:
+            return copies
+
+        provider_name = getattr(metadata, "provider", None)
+
+        if provider_name in self.providers:
+            return [(provider_name, metadata)]
+
+        return [(name, metadata) for name in self.providers]
+
+def title_key(metadata: Metadata) -> tuple:
+    """What two providers' copies of the same title have in common."""
+    title = re.sub(r"[^a-z0-9]+", " ", metadata.title.lower()).strip()
+
+    if metadata.type == MetadataType.SINGLE: # Remakes share titles, the year tells them apart.
+        return (title, metadata.type, str(metadata.year or "").strip()[:4])
+
+    return (title, metadata.type)
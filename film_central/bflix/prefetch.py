@@ -0,0 +1,79 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Callable, Optional
+    from concurrent.futures import Future
+
+    from mov_cli.media import Metadata, Single
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from devgoldyutils import LoggerAdapter
+from mov_cli.logger import mov_cli_logger
+
+__all__ = (
+    "Prefetcher",
+)
+
+logger = LoggerAdapter(mov_cli_logger, prefix = "Prefetcher")
+
+class Prefetcher():
+    """
+    Speculatively resolves search results in the background so picking one of them is instant.
+
+    At most ``workers`` resolutions run at once and at most ``max_entries`` results are kept, 
+    the oldest are dropped first. Starting a new search cancels everything queued for the last one.
+    """
+    def __init__(self, resolve: Callable[[Metadata], Optional[Single]], workers: int = 2, max_entries: int = 8) -> None:
+        self.resolve = resolve
+        self.workers = workers
+        self.max_entries = max_entries
+
+        self.__executor: Optional[ThreadPoolExecutor] = None
+        self.__futures: OrderedDict[str, Future] = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def new_search(self) -> None:
+        """Drops everything prefetched for the previous search, cancelling what hasn't started yet."""
+        with self.__lock:
+
+            for future in self.__futures.values():
+                future.cancel()
+
+            self.__futures.clear()
+
+    def submit(self, metadata: Metadata) -> None:
+        with self.__lock:
+
+            if metadata.id in self.__futures:
+                return
+
+            if self.__executor is None:
+                self.__executor = ThreadPoolExecutor(max_workers = self.workers, thread_name_prefix = "bflix-prefetch")
+
+            logger.debug(f"Prefetching '{metadata.title}'...")
+            self.__futures[metadata.id] = self.__executor.submit(self.resolve, metadata)
+
+            while len(self.__futures) > self.max_entries:
+                _, oldest_future = self.__futures.popitem(last = False)
+                oldest_future.cancel()
+
+    def take(self, metadata: Metadata) -> Optional[Single]:
+        """
+        Returns the prefetched media for that result, waiting on it if it's still in flight 
+        (it's already ahead of a fresh scrape). None if it was never prefetched or failed.
+        """
+        with self.__lock:
+            future = self.__futures.pop(metadata.id, None)
+
+        if future is None or future.cancelled():
+            return None
+
+        try:
+            return future.result()
+        except Exception as e:
+            logger.debug(f"Prefetching '{metadata.title}' failed, scraping it normally. Error: {e}")
+            return None
@@ -1,3 +1,19 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Dict, Iterable, List, Optional, Set
+
+import re
+import json
+import atexit
+import threading
+import unicodedata
+from collections import Counter
+from difflib import SequenceMatcher
+
+from ..utils import get_cache_directory
+
 __all__ = ()
 
 # A hardcoded dictionary of common search terms that when 
@@ -8,11 +24,267 @@ QUERIES_CORRECTIONS = {
     "Spider-Man": ("spiderman",)
 }
 
-def optimize_query(query: str) -> str:
+# How many titles from past search results we remember to learn spellings from.
+MAX_SEEN_TITLES = 2000
+
+# The words of a query as typed, everything in between (spaces, apostrophes, hyphens) is left as it is.
+WORD_REGEX = re.compile(r"[^\W_]+")
+
+# Seen titles are written back to disk at most this often (in seconds) and once more on exit, not on every search.
+SAVE_DELAY = 5.0
+
+# How similar an unknown word has to be to a known one for us to correct it.
+MIN_SIMILARITY = 0.85
+
+def normalize(text: str) -> str:
+    """Lowercases, strips accents and folds hyphens / punctuation into single spaces."""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(char for char in text if not unicodedata.combining(char))
+
+    return " ".join(re.sub(r"[^\w\s]|_", " ", text.lower()).split())
+
+def compact(text: str) -> str:
+    """The normalized text without spaces, so "spider man", "spider-man" and "spiderman" are all the same key."""
+    return normalize(text).replace(" ", "")
+
+def match_case(typed_word: str, word: str) -> str:
+    """Gives ``word`` the casing ``typed_word`` was typed in ("Spiderman" -> "Spider-Man", "ALIENS" -> "ALIENS")."""
+    if len(typed_word) > 1 and typed_word.isupper():
+        return word.upper()
+
+    if typed_word[:1].isupper():
+        return WORD_REGEX.sub(lambda match: match.group()[:1].upper() + match.group()[1:], word)
+
+    return word
+
+def trigrams(word: str) -> Set[str]:
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class QueryIndex():
+    """
+    Lookup tables for correcting queries before they're sent to bflix.
+
+    Whole queries are matched through their compact key against the corrections table, then 
+    every word that bflix has never shown us is matched against the compact keys of hyphenated 
+    words in known titles ("spiderman" -> "spider-man"). Those are exact matches so they're always 
+    applied. Fuzzy lookups also split words that are two words of a known title ("ironman" -> "iron man") 
+    and fix typos by trigram similarity, candidates come from a trigram inverted index. They're guesses 
+    ("anyone" -> "any one") so callers only ask for them once the query as typed found nothing.
+    """
+    def __init__(self) -> None:
+        self.__corrections: Dict[str, str] = {}
+        self.__words: Set[str] = set()
+        self.__compound_words: Dict[str, str] = {}
+        self.__joined_words: Dict[str, str] = {}
+        self.__trigram_index: Dict[str, Set[str]] = {}
+
+    def add_correction(self, correct_query: str, wrong_queries: Iterable[str]) -> None:
+        for query in (correct_query, *wrong_queries):
+            self.__corrections[compact(query)] = correct_query
+
+        self.add_title(correct_query)
+
+    def add_title(self, title: str) -> None:
+        # Hyphens are kept here so compound words keep their real spelling.
+        raw_words = re.sub(r"[^\w\s-]|_", " ", unicodedata.normalize("NFKC", title).lower()).split()
+
+        for raw_word in raw_words:
+            parts = normalize(raw_word).split()
+
+            if len(parts) > 1: # e.g. "spider-man"
+                self.__compound_words[compact(raw_word)] = raw_word
+
+            for word in parts:
+                self.__add_word(word)
+
+        words = normalize(title).split()
+
+        for first, second in zip(words, words[1:]):
+            self.__joined_words.setdefault(first + second, f"{first} {second}")
+
+    def lookup(self, query: str, fuzzy: bool = False) -> Optional[str]:
+        """
+        Returns the corrected query or None if there's nothing to correct. Only the unknown words 
+        are swapped out, the rest of the query (case, punctuation, spacing) is kept as it was typed.
+        """
+        correction = self.__corrections.get(compact(query))
+
+        if correction is not None:
+            return correction
+
+        corrected_query = WORD_REGEX.sub(lambda match: self.__correct_word(match.group(), fuzzy), query)
+
+        if corrected_query == query:
+            return None
+
+        return corrected_query
+
+    def __correct_word(self, typed_word: str, fuzzy: bool) -> str:
+        word = normalize(typed_word)
+
+        if not word or word in self.__words or word.isdigit():
+            return typed_word
+
+        correction = self.__compound_words.get(word)
+
+        if correction is None and fuzzy:
+            correction = self.__joined_words.get(word) or self.__closest_word(word)
+
+        if correction is None:
+            return typed_word
+
+        return match_case(typed_word, correction)
+
+    def __add_word(self, word: str) -> None:
+        if word in self.__words:
+            return
+
+        self.__words.add(word)
+
+        for trigram in trigrams(word):
+            self.__trigram_index.setdefault(trigram, set()).add(word)
+
+    def __closest_word(self, word: str) -> Optional[str]:
+        if len(word) < 5: # Too short to tell a typo from a different word.
+            return None
+
+        overlaps = Counter()
+
+        for trigram in trigrams(word):
+            overlaps.update(self.__trigram_index.get(trigram, ()))
+
+        best_word, best_similarity = None, 0.0
+
+        # Trigrams only narrow it down, they're poor at transpositions ("gaurdians") so 
+        # the few best candidates are compared properly.
+        for candidate, _ in overlaps.most_common(10):
+
+            # Bflix already matches on substrings, "alien" shouldn't become "aliens".
+            if candidate.startswith(word) or word.startswith(candidate):
+                continue
+
+            similarity = SequenceMatcher(None, word, candidate).ratio()
+
+            if similarity > best_similarity:
+                best_word, best_similarity = candidate, similarity
+
+        return best_word if best_similarity >= MIN_SIMILARITY else None
+
+class SeenTitles():
+    """
+    Titles from past bflix search results, kept on disk so the query index learns across runs. 
+    New titles are batched up and written ``save_delay`` seconds after the first of them (and on exit).
+    """
+    def __init__(self, save_delay: float = SAVE_DELAY) -> None:
+        self.path = get_cache_directory().joinpath("bflix-titles.json")
+        self.save_delay = save_delay
+
+        self.__titles: Optional[List[str]] = None
+        self.__lock = threading.Lock()
+
+        self.__dirty = False
+        self.__save_timer: Optional[threading.Timer] = None
+        self.__save_lock = threading.Lock()
+
+        atexit.register(self.save)
+
+    @property
+    def titles(self) -> List[str]:
+        with self.__lock:
+
+            if self.__titles is None:
+                try:
+                    self.__titles = json.loads(self.path.read_text(encoding = "utf-8"))
+                except (OSError, ValueError):
+                    self.__titles = []
+
+            return self.__titles
+
+    def add(self, titles: Iterable[str]) -> List[str]:
+        """Remembers the titles and returns the ones we hadn't seen yet."""
+        known_titles = self.titles
+
+        with self.__lock:
+            known = set(known_titles)
+            new_titles = [title for title in dict.fromkeys(titles) if title not in known]
+
+            if new_titles:
+                known_titles.extend(new_titles)
+                del known_titles[:-MAX_SEEN_TITLES]
+
+                self.__dirty = True
+
+                if self.__save_timer is None:
+                    self.__save_timer = threading.Timer(self.save_delay, self.save)
+                    self.__save_timer.daemon = True
+                    self.__save_timer.start()
+
+        return new_titles
+
+    def save(self) -> None:
+        """Writes the titles to disk now, if any were added since the last write."""
+        with self.__save_lock:
+
+            with self.__lock:
+
+                if self.__save_timer is not None:
+                    self.__save_timer.cancel()
+                    self.__save_timer = None
+
+                if not self.__dirty:
+                    return
+
+                titles = list(self.__titles)
+                self.__dirty = False
+
+            try:
+                self.path.write_text(json.dumps(titles), encoding = "utf-8")
+            except OSError:
+                pass
+
+_seen_titles: Optional[SeenTitles] = None
+_seen_titles_lock = threading.Lock()
+
+def get_seen_titles() -> SeenTitles:
+    """Opened on first use, so importing bflix doesn't touch the cache directory."""
+    global _seen_titles
+
+    with _seen_titles_lock:
+
+        if _seen_titles is None:
+            _seen_titles = SeenTitles()
+
+        return _seen_titles
+
+_query_index: Optional[QueryIndex] = None
+_query_index_lock = threading.Lock()
+
+def get_query_index() -> QueryIndex:
+    global _query_index
+
+    with _query_index_lock:
+
+        if _query_index is None:
+            _query_index = QueryIndex()
+
+            for correct_query, wrong_queries in QUERIES_CORRECTIONS.items():
+                _query_index.add_correction(correct_query, wrong_queries)
+
+            for title in get_seen_titles().titles:
+                _query_index.add_title(title)
+
+        return _query_index
+
+def remember_titles(titles: Iterable[str]) -> None:
+    """Feeds titles bflix returned back into the query index."""
+    new_titles = get_seen_titles().add(titles)
 
-    for correct_query, wrong_queries in QUERIES_CORRECTIONS.items():
+    if new_titles:
+        query_index = get_query_index()
 
-        if query.lower() in wrong_queries:
-            return correct_query
+        for title in new_titles:
+            query_index.add_title(title)
 
-    return query
\ No newline at end of file
+def optimize_query(query: str, fuzzy: bool = False) -> str:
+    return get_query_index().lookup(query, fuzzy) or query
@@ -2,21 +2,21 @@ from __future__ import annotations
 from typing import TYPE_CHECKING, Iterable
 
 if TYPE_CHECKING:
-    from typing import Optional
+    from typing import Callable, Iterator, Optional
 
-    from bs4 import Tag
-    from httpx import Response
+    from bs4 import Tag, BeautifulSoup
     from mov_cli.config import Config
     from mov_cli.http_client import HTTPClient
     from mov_cli.scraper import ScraperOptionsT
 
+from bs4 import SoupStrainer
 from mov_cli import Scraper
 from mov_cli.utils import EpisodeSelector
 from mov_cli.media import Metadata, MetadataType, Single
 
-from httpx import ReadTimeout
-
-from .query_optimizer import optimize_query
+from ..utils import cached_stream, get_int_option, tracer, wrap_http_client
+from .prefetch import Prefetcher
+from .query_optimizer import optimize_query, remember_titles
 
 __all__ =(
     "BFlix",
@@ -33,52 +33,59 @@ class BFlix(Scraper):
     ) -> None:
         super().__init__(
             config = config,
-            http_client = http_client,
+            http_client = wrap_http_client(http_client, options or {}),
             options = options
         )
 
+        # Opt-in, resolves the top N results of each search in the background.
+        self.prefetch_count = get_int_option(self.options, "prefetch", 0)
+        self.prefetcher = Prefetcher(self.__resolve, workers = min(self.prefetch_count, 3) or 1)
+
     def search(self, query: str, limit: int | None = None) -> Iterable[Metadata]:
         if query == "*":
             query = "" # Will return latest content.
 
-        response = self.__request_and_handle_timeouts(
-            method = "GET",
-            url = BFLIX_HOST,
-            params = {"s": optimize_query(query)}
-        )
+        self.prefetcher.new_search()
+        prefetched = 0
+
+        # Typo corrections are guesses, so they're only searched for if the query as typed found nothing.
+        for search_query in dict.fromkeys((optimize_query(query), optimize_query(query, fuzzy = True))):
+            found = False
 
-        soup = self.soup(response.text)
-
-        search_results = soup.select("article.post.dfx.fcl.movies.more-infos")
-
-        for result in search_results:
-            title = result.find("div", {"class": "entry-title"}).text
-            # description = result.find("div", {"class": "entry-content"}).find("p").text
-            watch_url = result.find("li", {"class": "fg1"}).find("a", {"class": "btn"})["href"]
-            image_url = result.find("div", {"class": "post-thumbnail"}).find("img")["data-src"] # Not every result has an image.
-            quality_or_type = result.find("span", {"class": "quality"}).text # We use it to determine between multi media or single though.
-            year = result.find("span", {"class": "year"}).text
-
-            if quality_or_type == "TV-Show":
-                # We won't support tv shows for this scraper as they use a 
-                # different video embed for tv shows and I have no idea how to scrape them.
-                continue
-
-            yield Metadata(
-                id = watch_url,
-                title = title,
-                type = MetadataType.SINGLE,
-                image_url = "https:" + image_url.replace("w342", "w500"),
-                year = year
+            response = self.http_client.request(
+                method = "GET",
+                url = BFLIX_HOST,
+                params = {"s": search_query}
             )
 
+            for metadata in parse_search_results(soup_only(self.soup, response.text, "article")):
+                found = True
+
+                if prefetched < self.prefetch_count:
+                    self.prefetcher.submit(metadata)
+                    prefetched += 1
+
+                yield metadata
+
+            if found:
+                break
+
+    @cached_stream(ttl = 24 * 60 * 60) # myfilestorage urls are stable for a while.
     def scrape(self, metadata: Metadata, episode: EpisodeSelector) -> Optional[Single]:
-        response = self.__request_and_handle_timeouts(
+        prefetched_media = self.prefetcher.take(metadata)
+
+        if prefetched_media is not None:
+            return prefetched_media
+
+        return self.__resolve(metadata)
+
+    def __resolve(self, metadata: Metadata) -> Single:
+        response = self.http_client.request(
             method = "GET",
             url = metadata.id
         )
 
-        soup = self.soup(response.text)
+        soup = soup_only(self.soup, response.text, "div", {"id": "options-0"})
 
         iframe_tag = soup.find("div", {"id": "options-0"}).find("iframe")
 
@@ -91,52 +98,66 @@ class BFlix(Scraper):
             referrer = "https://bflix.gs/"
         )
 
-    def __request_and_handle_timeouts(self, method: str, url: str, hangs: int = 5, **kwargs) -> Response:
-        """
-        For some reason some requests to this site randomly hang then fail.
-        This function should handle that until 5 hangs or what is specified is reached.
-        """
-        try:
-            response = self.http_client.request(
-                method = method,
-                url = url,
-                **kwargs
-            )
-
-        except ReadTimeout as e:
-            self.logger.warning(
-                "Bflix request timed out! This is unusually normal for bflix so I'm going to retry..."
-            )
-
-            if hangs == 0:
-                self.logger.critical(
-                    "We tried to handle the timeouts but this time bflix timed out more than expected. Report this!"
-                )
-
-                raise e
-
-            response = self.__request_and_handle_timeouts(method, url, hangs - 1, **kwargs)
-
-        return response
-
     def __grab_bflix_player_stream_url(self, player_iframe: Tag) -> str:
-        nites_video_embed_response = self.__request_and_handle_timeouts(
+        nites_video_embed_response = self.http_client.request(
             method = "GET",
             url = player_iframe["data-lazy-src"]
         )
 
-        nites_video_embed_soup = self.soup(nites_video_embed_response.text)
+        nites_video_embed_soup = soup_only(self.soup, nites_video_embed_response.text, "iframe")
 
         bflix_video_embed_tag = nites_video_embed_soup.find("iframe")
 
-        bflix_video_embed_response = self.__request_and_handle_timeouts(
+        bflix_video_embed_response = self.http_client.request(
             method = "GET",
             url = bflix_video_embed_tag["src"]
         )
 
-        bflix_video_embed_soup = self.soup(bflix_video_embed_response.text)
+        return stream_url_from_player(soup_only(self.soup, bflix_video_embed_response.text, "title"))
+
+def soup_only(soup: Callable[..., BeautifulSoup], html: str, *strainer_args, **strainer_kwargs) -> BeautifulSoup:
+    """
+    Only builds the tags matching the strainer instead of a tree of the whole page. 
+    Falls back to a full parse if nothing came out (html5lib ignores strainers for example).
+    """
+    with tracer.span("bflix.soup", "parse", bytes = len(html)) as span:
+        strained_soup = soup(html, parse_only = SoupStrainer(*strainer_args, **strainer_kwargs))
+
+        if strained_soup.find() is None:
+            span.set("fallback", True)
+            return soup(html)
+
+    return strained_soup
+
+def parse_search_results(soup: BeautifulSoup) -> Iterator[Metadata]:
+    search_results = soup.select("article.post.dfx.fcl.movies.more-infos")
+
+    # Lets the query optimizer learn the spelling bflix uses for titles.
+    remember_titles(result.find("div", {"class": "entry-title"}).text for result in search_results)
+
+    for result in search_results:
+        title = result.find("div", {"class": "entry-title"}).text
+        # description = result.find("div", {"class": "entry-content"}).find("p").text
+        watch_url = result.find("li", {"class": "fg1"}).find("a", {"class": "btn"})["href"]
+        image_url = result.find("div", {"class": "post-thumbnail"}).find("img")["data-src"] # Not every result has an image.
+        quality_or_type = result.find("span", {"class": "quality"}).text # We use it to determine between multi media or single though.
+        year = result.find("span", {"class": "year"}).text
+
+        if quality_or_type == "TV-Show":
+            # We won't support tv shows for this scraper as they use a 
+            # different video embed for tv shows and I have no idea how to scrape them.
+            continue
+
+        yield Metadata(
+            id = watch_url,
+            title = title,
+            type = MetadataType.SINGLE,
+            image_url = "https:" + image_url.replace("w342", "w500"),
+            year = year
+        )
 
-        # WTF THE ID IS EMBEDDED IN THE TITLE TAG!
-        my_file_storage_id: str = bflix_video_embed_soup.find("head").find("title").text
+def stream_url_from_player(bflix_video_embed_soup: BeautifulSoup) -> str:
+    # WTF THE ID IS EMBEDDED IN THE TITLE TAG!
+    my_file_storage_id: str = bflix_video_embed_soup.find("title").text
 
-        return f"https://myfilestorage.xyz/{my_file_storage_id}.mp4"
\ No newline at end of file
+    return f"https://myfilestorage.xyz/{my_file_storage_id}.mp4"
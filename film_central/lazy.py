@@ -0,0 +1,85 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Any, Dict, Iterator, Tuple, Type
+
+    from mov_cli.scraper import Scraper
+
+import importlib
+from collections.abc import Mapping, ItemsView, ValuesView
+
+__all__ = (
+    "LazyScraper",
+    "LazyScrapers",
+)
+
+class LazyScraper():
+    """
+    Stands in for a scraper class until it's actually called (or looked into), only then 
+    importing the module it lives in. mov-cli only ever calls or compares the classes it 
+    gets from a plugin, so a handle is all it needs to list and pick scrapers.
+    """
+    __slots__ = ("path", "__class")
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        """``module:ClassName``"""
+        self.__class = None
+
+    def resolve(self) -> Type[Scraper]:
+        if self.__class is None:
+            module_name, _, class_name = self.path.partition(":")
+            self.__class = getattr(importlib.import_module(module_name), class_name)
+
+        return self.__class
+
+    def __call__(self, *args, **kwargs) -> Scraper:
+        return self.resolve()(*args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.resolve(), name)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, LazyScraper):
+            return self.path == other.path
+
+        if isinstance(other, type):
+            return self.path == f"{other.__module__}:{other.__qualname__}"
+
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self.path)
+
+    def __repr__(self) -> str:
+        return f"<LazyScraper '{self.path}'>"
+
+class LazyScrapers(Mapping):
+    """
+    The plugin's ``scrapers`` mapping. Indexing it imports and returns the scraper class, 
+    iterating its items or values hands out ``LazyScraper`` handles so nothing is imported.
+    """
+    def __init__(self, paths: Dict[str, str]) -> None:
+        self.__scrapers = {name: LazyScraper(path) for name, path in paths.items()}
+
+    def __getitem__(self, name: str) -> Type[Scraper]:
+        return self.__scrapers[name].resolve()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.__scrapers)
+
+    def __len__(self) -> int:
+        return len(self.__scrapers)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.__scrapers
+
+    def items(self) -> ItemsView[Tuple[str, LazyScraper]]:
+        return self.__scrapers.items()
+
+    def values(self) -> ValuesView[LazyScraper]:
+        return self.__scrapers.values()
+
+    def lazy(self, name: str) -> LazyScraper:
+        return self.__scrapers[name]
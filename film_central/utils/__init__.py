@@ -0,0 +1,13 @@
+from .options import *
+from .concurrency import *
+from .paths import *
+from .store import *
+from .http_client import *
+from .tracing import *
+from .http_cache import *
+from .single_flight import *
+from .retry import *
+from .http_stack import *
+from .timing import *
+from .stream_cache import *
+from .variants import *
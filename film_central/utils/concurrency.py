@@ -0,0 +1,157 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Callable, Iterable, Generator, TypeVar, Any, Optional
+
+    T = TypeVar("T")
+    R = TypeVar("R")
+
+from itertools import islice
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+__all__ = (
+    "ordered_map",
+    "unordered_map",
+    "race",
+)
+
+def ordered_map(
+    func: Callable[[T], R], 
+    iterable: Iterable[T], 
+    workers: int, 
+    limit: Optional[int] = None, 
+    counts: Callable[[R], bool] = lambda result: True
+) -> Generator[R, Any, None]:
+    """
+    Runs ``func`` over ``iterable`` in a bounded thread pool, yielding results in the original order.
+
+    Only ``workers`` items are ever in flight, so a consumer that stops 
+    iterating early (e.g. because it hit a limit) stops the work as well.
+
+    With ``limit`` it stops by itself once that many results ``counts`` is true for have been yielded, 
+    and never has more items in flight than results it still needs, so no work is started that would be thrown away.
+    """
+    remaining = float("inf") if limit is None else limit
+
+    if remaining <= 0:
+        return
+
+    if workers <= 1:
+
+        for item in iterable:
+            result = func(item)
+
+            yield result
+
+            if counts(result):
+                remaining -= 1
+
+                if remaining <= 0:
+                    return
+
+        return
+
+    iterator = iter(iterable)
+    executor = ThreadPoolExecutor(max_workers = workers)
+
+    pending = deque(
+        executor.submit(func, item) for item in islice(iterator, int(min(workers, remaining)))
+    )
+
+    try:
+
+        while pending:
+            result = pending.popleft().result()
+
+            if counts(result):
+                remaining -= 1
+
+            # Top the window back up before handing the result over so 
+            # the pool keeps working while the consumer deals with it.
+            for item in islice(iterator, max(0, int(min(workers, remaining)) - len(pending))):
+                pending.append(executor.submit(func, item))
+
+            yield result
+
+            if remaining <= 0:
+                return
+
+    finally:
+
+        for future in pending:
+            future.cancel()
+
+        executor.shutdown(wait = False)
+
+def unordered_map(func: Callable[[T], R], iterable: Iterable[T], workers: int) -> Generator[R, Any, None]:
+    """
+    Like ``ordered_map`` but yields each result as soon as it's ready instead of in the original order.
+    """
+    if workers <= 1:
+        yield from ordered_map(func, iterable, workers)
+        return
+
+    iterator = iter(iterable)
+    executor = ThreadPoolExecutor(max_workers = workers)
+
+    pending = set(
+        executor.submit(func, item) for item in islice(iterator, workers)
+    )
+
+    try:
+
+        while pending:
+            done, pending = wait(pending, return_when = FIRST_COMPLETED)
+
+            for future in done:
+
+                for item in islice(iterator, 1):
+                    pending.add(executor.submit(func, item))
+
+                yield future.result()
+
+    finally:
+
+        for future in pending:
+            future.cancel()
+
+        executor.shutdown(wait = False)
+
+def race(calls: Iterable[Callable[[], R]], accept: Callable[[R], bool] = lambda result: result is not None) -> Optional[R]:
+    """
+    Runs every call at once and returns the first result ``accept`` is happy with, or None if none of them were. 
+    Calls that raise count as rejected. Losers that haven't started are cancelled, the rest finish in the background.
+    """
+    calls = list(calls)
+
+    if not calls:
+        return None
+
+    executor = ThreadPoolExecutor(max_workers = len(calls))
+
+    def accepted(call: Callable[[], R]):
+        result = call()
+        return result, accept(result)
+
+    pending = set(executor.submit(accepted, call) for call in calls)
+
+    try:
+
+        while pending:
+            done, pending = wait(pending, return_when = FIRST_COMPLETED)
+
+            for future in done:
+
+                if future.exception() is None and future.result()[1]:
+                    return future.result()[0]
+
+        return None
+
+    finally:
+
+        for future in pending:
+            future.cancel()
+
+        executor.shutdown(wait = False)
@@ -0,0 +1,227 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Dict, Optional, Tuple
+
+    from mov_cli.http_client import HTTPClient
+
+    from .store import StoreEntry
+
+import json
+import threading
+from datetime import timedelta
+from collections import Counter
+
+from httpx import URL, Request, Response
+
+from .store import DiskStore
+from .paths import get_cache_directory
+from .http_client import HTTPClientWrapper
+from .tracing import tracer
+
+__all__ = (
+    "HTTPCache",
+    "CachedHTTPClient",
+    "DEFAULT_TTLS",
+)
+
+# How long (in seconds) a response from each host is served without asking the site again.
+# Hosts not listed here are never cached, that covers anything handing out short lived 
+# tokens or stream urls (vidplay's futoken and mediainfo for example).
+DEFAULT_TTLS: Dict[str, int] = {
+    "vadapav.mov": 6 * 60 * 60, # Plain directory listings, they barely change.
+    "nites.nz": 60 * 60,
+    "bflix.gs": 60 * 60,
+    "vidsrc.to": 15 * 60,
+    "api.themoviedb.org": 24 * 60 * 60,
+}
+
+# Paths on those hosts that are never cached even though the host is, vidsrc.to's 
+# ajax endpoints hand out obfuscated one time source urls for example.
+UNCACHEABLE_PATHS: Dict[str, Tuple[str, ...]] = {
+    "vidsrc.to": ("/ajax/",),
+}
+
+# Request headers that can change what a site answers with, so they're part of the cache key.
+KEY_HEADERS = ("referer", "accept", "accept-language", "origin", "x-requested-with")
+
+# Headers that describe the wire encoding rather than the content, 
+# we store the decoded body so these would only confuse httpx later.
+WIRE_HEADERS = ("content-encoding", "content-length", "transfer-encoding")
+
+class HTTPCache():
+    """
+    On-disk cache of GET responses with per-host TTLs and ETag / Last-Modified revalidation.
+
+    The ``stats`` counter keeps ``(host, event)`` counts where event is one of 
+    "hit", "miss", "revalidated" or "stored". Use them to tune the TTLs.
+    """
+    __default: Optional[HTTPCache] = None
+    __default_lock = threading.Lock()
+
+    def __init__(
+        self, 
+        store: DiskStore, 
+        ttls: Optional[Dict[str, int]] = None, 
+        uncacheable_paths: Optional[Dict[str, Tuple[str, ...]]] = None
+    ) -> None:
+        self.store = store
+        self.ttls = DEFAULT_TTLS if ttls is None else ttls
+        self.uncacheable_paths = UNCACHEABLE_PATHS if uncacheable_paths is None else uncacheable_paths
+
+        self.stats: Counter[Tuple[str, str]] = Counter()
+        self.__stats_lock = threading.Lock()
+
+    @classmethod
+    def default(cls) -> HTTPCache:
+        """The cache shared by every scraper in this process."""
+        with cls.__default_lock:
+
+            if cls.__default is None:
+                cls.__default = cls(DiskStore.open(get_cache_directory().joinpath("http-cache.sqlite3")))
+
+            return cls.__default
+
+    def ttl_for(self, host: str) -> int:
+        """Returns the TTL for a host, also matching on parent domains (e.g. "www.vadapav.mov" -> "vadapav.mov")."""
+        while host:
+            ttl = self.ttls.get(host)
+
+            if ttl is not None:
+                return ttl
+
+            _, _, host = host.partition(".")
+
+        return 0
+
+    def ttl_for_url(self, url: URL) -> int:
+        """Like ``ttl_for`` but 0 for the paths listed in ``uncacheable_paths``."""
+        if url.path.startswith(self.uncacheable_paths.get(url.host, ())):
+            return 0
+
+        return self.ttl_for(url.host)
+
+    @staticmethod
+    def key_for(url: URL, headers: Optional[Dict[str, str]] = None) -> str:
+        """The url plus any request headers in ``KEY_HEADERS``, so e.g. a different Referer is a different entry."""
+        key_headers = sorted(
+            (name.lower(), value) for name, value in (headers or {}).items() if name.lower() in KEY_HEADERS
+        )
+
+        return "\n".join([str(url)] + [f"{name}: {value}" for name, value in key_headers])
+
+    def event_counts(self) -> Counter[str]:
+        """The ``stats`` added up over every host."""
+        counts: Counter[str] = Counter()
+
+        with self.__stats_lock:
+
+            for (_, event), count in self.stats.items():
+                counts[event] += count
+
+        return counts
+
+    def count(self, host: str, event: str) -> None:
+        with self.__stats_lock:
+            self.stats[(host, event)] += 1
+
+        if event != "stored":
+            tracer.annotate("cache", event)
+
+    def load(self, key: str) -> Optional[Tuple[StoreEntry, Response]]:
+        entry = self.store.get(key, allow_stale = True)
+
+        if entry is None:
+            return None
+
+        raw_metadata, _, content = entry.value.partition(b"\0")
+        metadata = json.loads(raw_metadata)
+
+        response = Response(
+            metadata["status_code"],
+            headers = metadata["headers"],
+            content = content,
+            request = Request("GET", metadata["url"])
+        )
+        response.elapsed = timedelta(0) # httpx raises if this is read and it was never set.
+
+        return entry, response
+
+    def save(self, key: str, response: Response, ttl: int) -> None:
+        metadata = {
+            "url": str(response.url),
+            "status_code": response.status_code,
+            "headers": [
+                (name, value) for name, value in response.headers.items() if name.lower() not in WIRE_HEADERS
+            ]
+        }
+
+        self.store.set(key, json.dumps(metadata).encode() + b"\0" + response.content, ttl)
+
+class CachedHTTPClient(HTTPClientWrapper):
+    """Serves cacheable GET requests from an ``HTTPCache``, revalidating stale entries with the site when possible."""
+    def __init__(self, http_client: HTTPClient, cache: HTTPCache) -> None:
+        self.cache = cache
+
+        super().__init__(http_client)
+
+    def request(self, method: str, url: str, params: Optional[Dict[str, str]] = None, headers: Optional[Dict[str, str]] = None, **kwargs) -> Response:
+        full_url = URL(url).copy_merge_params(params or {})
+        ttl = self.cache.ttl_for_url(full_url)
+
+        uncacheable = (
+            method.upper() != "GET" or 
+            ttl <= 0 or 
+            any(kwargs.get(x) for x in ("content", "data", "json", "files")) or 
+            any(name.lower() == "range" for name in headers or {}) # Partial content, e.g. a variant probe's sample.
+        )
+
+        if uncacheable:
+            return super().request(method, url, params = params, headers = headers, **kwargs)
+
+        key = self.cache.key_for(full_url, headers)
+        host = full_url.host
+
+        cached = self.cache.load(key)
+
+        if cached is not None and cached[0].fresh:
+            self.cache.count(host, "hit")
+            return cached[1]
+
+        headers = dict(headers or {})
+
+        if cached is not None:
+            etag = cached[1].headers.get("etag")
+            last_modified = cached[1].headers.get("last-modified")
+
+            if etag is not None:
+                headers["If-None-Match"] = etag
+
+            if last_modified is not None:
+                headers["If-Modified-Since"] = last_modified
+
+        response = super().request(method, url, params = params, headers = headers, **kwargs)
+
+        if response.status_code == 304 and cached is not None:
+            self.cache.count(host, "revalidated")
+            self.cache.store.touch(key, ttl)
+            return cached[1]
+
+        self.cache.count(host, "miss")
+
+        if response.status_code == 200 and "no-store" not in response.headers.get("cache-control", ""):
+            self.cache.save(key, response, self.__ttl_with_expires(response, ttl))
+            self.cache.count(host, "stored")
+
+        return response
+
+    def __ttl_with_expires(self, response: Response, ttl: int) -> int:
+        """Respects 'Cache-Control: max-age' when the site asks for less than our TTL."""
+        for directive in response.headers.get("cache-control", "").split(","):
+            name, _, value = directive.strip().partition("=")
+
+            if name.lower() == "max-age" and value.isdigit():
+                return min(ttl, int(value))
+
+        return ttl
@@ -0,0 +1,75 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Dict, Optional
+
+    from httpx import Response
+    from mov_cli.http_client import HTTPClient
+
+from devgoldyutils import LoggerAdapter
+from mov_cli.logger import mov_cli_logger
+
+__all__ = (
+    "HTTPClientWrapper",
+    "unwrap_http_client",
+)
+
+class HTTPClientWrapper():
+    """
+    Base class for the layers we stack on top of mov-cli's ``HTTPClient``.
+
+    Every GET is funnelled into ``request()`` so a layer only has to override that, 
+    anything else (cookies, headers, etc) falls through to the wrapped client.
+    """
+    def __init__(self, http_client: HTTPClient) -> None:
+        self.http_client = http_client
+
+        self.logger = LoggerAdapter(mov_cli_logger, prefix = self.__class__.__name__)
+
+    def __getattr__(self, name: str):
+        return getattr(self.http_client, name)
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict[str, str]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        include_default_headers: bool = False,
+        redirect: bool = False,
+        **kwargs
+    ) -> Response:
+        return self.http_client.request(
+            method,
+            url = url,
+            params = params,
+            headers = dict(headers or {}), # mov-cli mutates the headers it's given.
+            include_default_headers = include_default_headers,
+            redirect = redirect,
+            **kwargs
+        )
+
+    def get(
+        self,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        include_default_headers: bool = True,
+        redirect: bool = False,
+        **kwargs
+    ) -> Response:
+        return self.request(
+            "GET",
+            url = url,
+            headers = headers,
+            include_default_headers = include_default_headers,
+            redirect = redirect,
+            **kwargs
+        )
+
+def unwrap_http_client(http_client: HTTPClient) -> HTTPClient:
+    """Returns the client at the bottom of a stack of ``HTTPClientWrapper``s (mov-cli's own)."""
+    while isinstance(http_client, HTTPClientWrapper):
+        http_client = http_client.http_client
+
+    return http_client
@@ -0,0 +1,53 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from mov_cli.http_client import HTTPClient
+    from mov_cli.scraper import ScraperOptionsT
+
+from .options import get_bool_option, get_int_option
+from .http_client import HTTPClientWrapper
+from .http_cache import HTTPCache, CachedHTTPClient
+from .retry import RequestPolicy, RetryingHTTPClient
+from .single_flight import CoalescingHTTPClient
+from .tracing import JSONLinesSink, TracingHTTPClient, tracer
+
+__all__ = (
+    "wrap_http_client",
+    "trace_to",
+)
+
+def wrap_http_client(http_client: HTTPClient, options: ScraperOptionsT) -> HTTPClient:
+    """
+    Stacks our shared http layers on top of mov-cli's http client. 
+    Every scraper should pass its client through this before using it.
+    """
+    if isinstance(http_client, HTTPClientWrapper): # Already wrapped, e.g. a scraper handing its client to another.
+        return http_client
+
+    http_client = RetryingHTTPClient(
+        http_client,
+        default_policy = RequestPolicy(
+            deadline = get_int_option(options, "deadline", int(RequestPolicy.deadline))
+        ),
+        retries = None if options.get("retries") is None else get_int_option(options, "retries", RequestPolicy.retries)
+    )
+
+    if get_bool_option(options, "cache", True):
+        http_client = CachedHTTPClient(http_client, HTTPCache.default())
+
+    # Above the cache so concurrent misses for the same page turn into one request.
+    if get_bool_option(options, "coalesce", True):
+        http_client = CoalescingHTTPClient(http_client)
+
+    trace_path = options.get("trace")
+
+    if isinstance(trace_path, str):
+        trace_to(trace_path)
+
+    return TracingHTTPClient(http_client)
+
+def trace_to(path: str) -> None:
+    """Attaches a JSON lines sink writing to that path, unless one already is."""
+    if not any(isinstance(sink, JSONLinesSink) and sink.path == path for sink in tracer.sinks):
+        tracer.add_sink(JSONLinesSink(path))
@@ -0,0 +1,37 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from mov_cli.scraper import ScraperOptionsT
+
+__all__ = (
+    "get_int_option",
+    "get_bool_option",
+)
+
+def get_int_option(options: ScraperOptionsT, name: str, default: int) -> int:
+    """
+    Returns a scraper option as an int. Options passed on the command line 
+    always arrive as strings (or True for bare flags) so we have to coerce them ourselves.
+    """
+    value = options.get(name)
+
+    if value is None or isinstance(value, bool):
+        return default
+
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+def get_bool_option(options: ScraperOptionsT, name: str, default: bool) -> bool:
+    """Returns a scraper option as a bool, accepting flags and the usual true / false spellings."""
+    value = options.get(name)
+
+    if value is None:
+        return default
+
+    if isinstance(value, bool):
+        return value
+
+    return str(value).lower() in ("1", "true", "yes", "on")
@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+__all__ = (
+    "get_cache_directory",
+)
+
+def get_cache_directory() -> Path:
+    """Returns the directory film-central keeps its on-disk caches in."""
+    try:
+        from mov_cli.utils import what_platform
+        from mov_cli.utils.paths import get_cache_directory as get_mov_cli_cache_directory
+
+        cache_directory = get_mov_cli_cache_directory(what_platform())
+
+    except (ImportError, TypeError): # Older mov-cli versions don't ship a cache directory.
+        cache_directory = Path(os.getenv("XDG_CACHE_HOME") or Path.home().joinpath(".cache")).joinpath("mov-cli")
+
+    cache_directory = cache_directory.joinpath("film-central")
+    cache_directory.mkdir(parents = True, exist_ok = True)
+
+    return cache_directory
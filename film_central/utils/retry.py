@@ -0,0 +1,282 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Dict, Optional
+
+    from httpx import Response
+    from mov_cli.http_client import HTTPClient
+
+import time
+import random
+import threading
+from collections import deque
+from dataclasses import dataclass, replace
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import httpx
+from mov_cli.errors import MovCliException
+
+from .http_client import HTTPClientWrapper
+from .tracing import tracer
+
+__all__ = (
+    "RequestPolicy",
+    "CircuitBreaker",
+    "RetryingHTTPClient",
+    "HostUnavailable",
+    "DEFAULT_POLICIES",
+)
+
+RETRY_STATUS_CODES = (429, 502, 503, 504)
+
+# Only requests that are safe to send twice get retried (or hedged).
+IDEMPOTENT_METHODS = ("GET", "HEAD")
+
+@dataclass(frozen = True)
+class RequestPolicy:
+    """How requests to a host are retried, hedged and bounded in time."""
+    retries: int = 2
+    """Extra attempts after the first one fails."""
+    backoff: float = 0.5
+    """Base delay of the exponential backoff, doubled every attempt."""
+    max_backoff: float = 4.0
+    deadline: float = 45.0
+    """Upper bound on the total time spent on one request including every retry."""
+    attempt_timeout: float = 15.0
+    """Timeout of a single attempt, it gets shortened to fit in what's left of the deadline."""
+    hedge: bool = False
+    """Fire a duplicate GET when the first one is slower than usual and take whichever answers first."""
+    min_hedge_delay: float = 1.5
+
+    def backoff_for(self, attempt: int) -> float:
+        # "Full jitter", spreads retries out so they don't arrive in lockstep.
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+DEFAULT_POLICIES: Dict[str, RequestPolicy] = {
+    # For some reason requests to bflix randomly hang then fail, 
+    # hedging gets around most of those without waiting out the timeout.
+    "nites.nz": RequestPolicy(retries = 5, hedge = True, attempt_timeout = 10.0, deadline = 40.0),
+    "bflix.gs": RequestPolicy(retries = 5, hedge = True, attempt_timeout = 10.0, deadline = 40.0),
+}
+
+class HostUnavailable(MovCliException):
+    """Raised when a host's circuit breaker is open because it keeps failing."""
+    def __init__(self, host: str, retry_in: float) -> None:
+        super().__init__(
+            f"'{host}' has failed too many times in a row so we're not sending it more requests for now. " \
+                f"It'll be tried again in {retry_in:.0f} seconds."
+        )
+
+class CircuitBreaker():
+    """
+    Stops sending requests to a host after ``failure_threshold`` failed requests in a row 
+    (a request that only succeeded after retrying doesn't count, one that ran out of retries counts once).
+
+    After ``reset_timeout`` seconds one request is let through, if it succeeds the 
+    breaker closes again, otherwise it stays open for another ``reset_timeout``.
+    """
+    __breakers: Dict[str, CircuitBreaker] = {}
+    __breakers_lock = threading.Lock()
+
+    def __init__(self, host: str, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+        self.__lock = threading.Lock()
+
+    @classmethod
+    def for_host(cls, host: str) -> CircuitBreaker:
+        """Breakers are shared process-wide so every scraper sees the same host health."""
+        with cls.__breakers_lock:
+            breaker = cls.__breakers.get(host)
+
+            if breaker is None:
+                breaker = cls(host)
+                cls.__breakers[host] = breaker
+
+            return breaker
+
+    def before_request(self) -> None:
+        with self.__lock:
+
+            if self.opened_at is None:
+                return
+
+            open_for = time.monotonic() - self.opened_at
+
+            if open_for < self.reset_timeout:
+                raise HostUnavailable(self.host, self.reset_timeout - open_for)
+
+            # Half open, let this one request through as a probe.
+            self.opened_at = time.monotonic()
+
+    def record_success(self) -> None:
+        with self.__lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self) -> None:
+        with self.__lock:
+            self.failures += 1
+
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+class LatencyTracker():
+    """Rolling window of request durations per host, used to decide when to hedge."""
+    def __init__(self, window: int = 50) -> None:
+        self.window = window
+
+        self.__durations: Dict[str, deque] = {}
+        self.__lock = threading.Lock()
+
+    def record(self, host: str, duration: float) -> None:
+        with self.__lock:
+            self.__durations.setdefault(host, deque(maxlen = self.window)).append(duration)
+
+    def p95(self, host: str) -> Optional[float]:
+        with self.__lock:
+            durations = sorted(self.__durations.get(host, ()))
+
+        if len(durations) < 5: # Not enough samples to mean anything yet.
+            return None
+
+        return durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+
+latencies = LatencyTracker()
+hedge_executor = ThreadPoolExecutor(max_workers = 8, thread_name_prefix = "film-central-hedge")
+
+class RetryingHTTPClient(HTTPClientWrapper):
+    """
+    Retries failed GET and HEAD requests with jittered exponential backoff inside an overall deadline, per host policies. 
+    ``retries`` (the scraper's ``retries`` option) overrides the retries of every policy when it's given.
+    """
+    def __init__(
+        self, 
+        http_client: HTTPClient, 
+        default_policy: RequestPolicy = RequestPolicy(), 
+        policies: Optional[Dict[str, RequestPolicy]] = None, 
+        retries: Optional[int] = None
+    ) -> None:
+        self.default_policy = default_policy
+        self.policies = DEFAULT_POLICIES if policies is None else policies
+        self.retries = retries
+
+        super().__init__(http_client)
+
+    def policy_for(self, host: str) -> RequestPolicy:
+        policy = self.policies.get(host)
+
+        if policy is None:
+            policy = self.default_policy
+        else:
+            # The retry budget passed in through the scraper options still applies.
+            policy = replace(policy, deadline = min(policy.deadline, self.default_policy.deadline))
+
+        if self.retries is not None:
+            policy = replace(policy, retries = self.retries)
+
+        return policy
+
+    def request(self, method: str, url: str, **kwargs) -> Response:
+        host = httpx.URL(url).host
+        policy = self.policy_for(host)
+        breaker = CircuitBreaker.for_host(host)
+
+        if method.upper() not in IDEMPOTENT_METHODS:
+            policy = replace(policy, retries = 0, hedge = False)
+
+        # Checked once per request, the retries below are part of the same request as far as the breaker is concerned.
+        breaker.before_request()
+
+        deadline = time.monotonic() + policy.deadline
+
+        response = None
+        error = None
+
+        for attempt in range(policy.retries + 1):
+            remaining = deadline - time.monotonic()
+            attempt_kwargs = dict(kwargs)
+            attempt_kwargs.setdefault("timeout", max(0.1, min(policy.attempt_timeout, remaining)))
+
+            if attempt > 0:
+                tracer.annotate("retries", attempt)
+
+            try:
+                if policy.hedge:
+                    response = self.__hedged_request(method, url, host, policy, attempt_kwargs)
+                else:
+                    response = self.__timed_request(method, url, host, attempt_kwargs)
+
+                error = None
+
+            except (httpx.TimeoutException, httpx.TransportError) as e:
+                response = None
+                error = e
+
+            if error is None and response.status_code not in RETRY_STATUS_CODES:
+                breaker.record_success()
+                return response
+
+            delay = policy.backoff_for(attempt)
+
+            if attempt == policy.retries or time.monotonic() + delay >= deadline:
+                break
+
+            self.logger.warning(
+                f"Request to '{host}' failed ({error or response.status_code}), retrying in {delay:.1f}s " \
+                    f"(attempt {attempt + 1} of {policy.retries + 1})..."
+            )
+            time.sleep(delay)
+
+        breaker.record_failure()
+
+        if error is not None:
+            self.logger.critical(f"Gave up on '{host}' after retrying, it keeps failing. Report this if it persists!")
+            raise error
+
+        return response
+
+    def __timed_request(self, method: str, url: str, host: str, kwargs: dict) -> Response:
+        started_at = time.monotonic()
+        response = super().request(method, url, **kwargs)
+
+        latencies.record(host, time.monotonic() - started_at)
+
+        return response
+
+    def __hedged_request(self, method: str, url: str, host: str, policy: RequestPolicy, kwargs: dict) -> Response:
+        """
+        Sends the request and, if it hasn't answered within the host's p95 latency, sends a 
+        duplicate and returns whichever finishes first. The slower one is left to finish in the background.
+        """
+        p95 = latencies.p95(host)
+        hedge_delay = max(policy.min_hedge_delay, p95 if p95 is not None else policy.attempt_timeout / 3)
+
+        first = hedge_executor.submit(self.__timed_request, method, url, host, kwargs)
+        done, _ = wait([first], timeout = hedge_delay)
+
+        if done:
+            return first.result()
+
+        self.logger.debug(f"Request to '{host}' is taking longer than {hedge_delay:.1f}s, sending a hedged request...")
+        tracer.annotate("hedged", True)
+
+        second = hedge_executor.submit(self.__timed_request, method, url, host, kwargs)
+        pending = {first, second}
+
+        while True:
+            done, pending = wait(pending, return_when = FIRST_COMPLETED)
+
+            for future in done:
+
+                if future.exception() is None:
+                    return future.result()
+
+            if not pending: # Both failed.
+                return done.pop().result()
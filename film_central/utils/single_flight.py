@@ -0,0 +1,121 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Any, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+    from httpx import Response
+    from mov_cli.http_client import HTTPClient
+
+    R = TypeVar("R")
+
+import threading
+from collections import Counter
+from concurrent.futures import Future
+
+from httpx import URL
+
+from .http_client import HTTPClientWrapper
+from .tracing import tracer
+
+__all__ = (
+    "SingleFlight",
+    "CoalescingHTTPClient",
+)
+
+class SingleFlight():
+    """
+    Collapses concurrent calls for the same key into one: the first caller runs the function
+    and everyone that asks for that key while it's still running waits for and shares its result
+    (or exception). Nothing is kept once the call finishes, that's what the caches are for.
+
+    The ``stats`` counter keeps ``(namespace, event)`` counts where event is "run" or "coalesced",
+    every "coalesced" is a request (or parse) that didn't have to happen.
+    """
+    __default: Optional[SingleFlight] = None
+    __default_lock = threading.Lock()
+
+    def __init__(self) -> None:
+        self.stats: Counter[Tuple[str, str]] = Counter()
+
+        self.__in_flight: Dict[Hashable, Future] = {}
+        self.__lock = threading.Lock()
+
+    @classmethod
+    def default(cls) -> SingleFlight:
+        """The group shared by every scraper in this process."""
+        with cls.__default_lock:
+
+            if cls.__default is None:
+                cls.__default = cls()
+
+            return cls.__default
+
+    def do(self, namespace: str, key: Hashable, func: Callable[[], R]) -> R:
+        with self.__lock:
+            future = self.__in_flight.get((namespace, key))
+            leader = future is None
+
+            if leader:
+                future = Future()
+                self.__in_flight[(namespace, key)] = future
+
+            self.stats[(namespace, "run" if leader else "coalesced")] += 1
+
+        if not leader:
+            tracer.annotate("coalesced", True)
+            return future.result()
+
+        try:
+            result = func()
+            future.set_result(result)
+            return result
+
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+
+        finally:
+            with self.__lock:
+                self.__in_flight.pop((namespace, key), None)
+
+    def saved(self, namespace: Optional[str] = None) -> int:
+        """How many calls were answered by someone else's in-flight call (in that namespace or overall)."""
+        with self.__lock:
+            return sum(
+                count for (name, event), count in self.stats.items() if event == "coalesced" and namespace in (None, name)
+            )
+
+class CoalescingHTTPClient(HTTPClientWrapper):
+    """
+    Sends identical GET and HEAD requests that are in flight at the same time (same url, params
+    and headers) only once, the callers all get the same response. Counted per host under ``flights.stats``.
+    """
+    def __init__(self, http_client: HTTPClient, flights: Optional[SingleFlight] = None) -> None:
+        self.flights = SingleFlight.default() if flights is None else flights
+
+        super().__init__(http_client)
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict[str, str]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        **kwargs: Any
+    ) -> Response:
+        if method.upper() not in ("GET", "HEAD") or any(kwargs.get(x) for x in ("content", "data", "json", "files")):
+            return super().request(method, url, params = params, headers = headers, **kwargs)
+
+        full_url = URL(url).copy_merge_params(params or {})
+
+        key = (
+            method.upper(),
+            str(full_url),
+            tuple(sorted((headers or {}).items())),
+            tuple(sorted((name, str(value)) for name, value in kwargs.items() if name != "timeout"))
+        )
+
+        return self.flights.do(
+            full_url.host, key, lambda: super(CoalescingHTTPClient, self).request(method, url, params = params, headers = headers, **kwargs)
+        )
@@ -0,0 +1,126 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, NamedTuple
+
+if TYPE_CHECKING:
+    from typing import Dict, Optional
+    from pathlib import Path
+
+import time
+import zlib
+import sqlite3
+import threading
+
+__all__ = (
+    "DiskStore",
+    "StoreEntry",
+)
+
+class StoreEntry(NamedTuple):
+    value: bytes
+    stored_at: float
+    expires_at: float
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+class DiskStore():
+    """
+    A small compressed key-value store on top of SQLite, bounded in size by evicting the least recently used entries.
+
+    SQLite gives us a single file that is safe to share between threads and mov-cli processes.
+    Stale entries are kept around (until evicted) as callers like the http cache still need them for revalidation.
+    """
+    __stores: Dict[str, DiskStore] = {}
+    __stores_lock = threading.Lock()
+
+    def __init__(self, path: Path, max_size: int = 64 * 1024 * 1024) -> None:
+        self.path = path
+        self.max_size = max_size
+
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(str(path), timeout = 10, check_same_thread = False, isolation_level = None)
+
+        self.__connection.execute("PRAGMA journal_mode=WAL")
+        self.__connection.execute(
+            "CREATE TABLE IF NOT EXISTS entries (" \
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, " \
+                "stored_at REAL NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL" \
+            ")"
+        )
+        self.__connection.execute("CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)")
+
+    @classmethod
+    def open(cls, path: Path, max_size: int = 64 * 1024 * 1024) -> DiskStore:
+        """Returns the process-wide store for that file, opening it on first use."""
+        with cls.__stores_lock:
+            store = cls.__stores.get(str(path))
+
+            if store is None:
+                store = cls(path, max_size)
+                cls.__stores[str(path)] = store
+
+            return store
+
+    def get(self, key: str, allow_stale: bool = False) -> Optional[StoreEntry]:
+        with self.__lock:
+            row = self.__connection.execute(
+                "SELECT value, stored_at, expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            entry = StoreEntry(zlib.decompress(row[0]), row[1], row[2])
+
+            if not allow_stale and not entry.fresh:
+                return None
+
+            self.__connection.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (time.time(), key))
+
+        return entry
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        compressed_value = zlib.compress(value)
+        now = time.time()
+
+        with self.__lock:
+            self.__connection.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, stored_at, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, compressed_value, len(compressed_value), now, now + ttl, now)
+            )
+
+            self.__evict()
+
+    def touch(self, key: str, ttl: float) -> None:
+        """Marks an entry as fresh again for another ``ttl`` seconds without rewriting its value."""
+        now = time.time()
+
+        with self.__lock:
+            self.__connection.execute(
+                "UPDATE entries SET stored_at = ?, expires_at = ?, accessed_at = ? WHERE key = ?", (now, now + ttl, now, key)
+            )
+
+    def delete(self, key: str) -> None:
+        with self.__lock:
+            self.__connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__connection.execute("DELETE FROM entries")
+
+    def __evict(self) -> None:
+        total_size = self.__connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+        if total_size <= self.max_size:
+            return
+
+        # Evict down to 90% so we aren't evicting again on the very next write.
+        target_size = self.max_size * 0.9
+
+        for key, size in self.__connection.execute("SELECT key, size FROM entries ORDER BY accessed_at ASC").fetchall():
+            if total_size <= target_size:
+                break
+
+            self.__connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total_size -= size
@@ -0,0 +1,175 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Callable, Dict, Optional, TypeVar
+
+    from mov_cli import Metadata
+    from mov_cli.utils import EpisodeSelector
+    from mov_cli.http_client import HTTPClient
+
+    ScrapeT = TypeVar("ScrapeT", bound = Callable)
+
+import json
+import time
+import threading
+from functools import wraps
+
+from mov_cli import Multi, Single, MetadataType
+
+from .store import DiskStore
+from .http_client import unwrap_http_client
+from .paths import get_cache_directory
+from .options import get_bool_option
+
+__all__ = (
+    "StreamCache",
+    "cached_stream",
+)
+
+# Validation is a quick yes or no before playing, a host that doesn't answer in time counts as a no.
+VALIDATION_TIMEOUT = 3.0
+# How long a url that passed validation isn't checked again (e.g. by the aggregate scraper right after cached_stream).
+VALIDATED_FOR = 30.0
+
+class StreamCache():
+    """Persists the final ``Single`` / ``Multi`` a scraper resolved so re-opening a title skips the scrape."""
+    __default: Optional[StreamCache] = None
+    __default_lock = threading.Lock()
+
+    __validated: Dict[str, float] = {}
+    __validated_lock = threading.Lock()
+
+    def __init__(self, store: DiskStore) -> None:
+        self.store = store
+
+    @classmethod
+    def default(cls) -> StreamCache:
+        with cls.__default_lock:
+
+            if cls.__default is None:
+                cls.__default = cls(DiskStore.open(get_cache_directory().joinpath("streams.sqlite3"), max_size = 4 * 1024 * 1024))
+
+            return cls.__default
+
+    def key(self, scraper_name: str, metadata: Metadata, episode: EpisodeSelector) -> str:
+        if metadata.type == MetadataType.SINGLE:
+            return f"{scraper_name}:{metadata.id}"
+
+        return f"{scraper_name}:{metadata.id}:{episode.season}:{episode.episode}"
+
+    def get(self, key: str, episode: EpisodeSelector) -> Optional[Multi | Single]:
+        entry = self.store.get(key)
+
+        if entry is None:
+            return None
+
+        data = json.loads(entry.value)
+
+        if data["type"] == "multi":
+            return Multi(
+                data["url"],
+                title = data["title"],
+                episode = episode,
+                audio_url = data["audio_url"],
+                referrer = data["referrer"],
+                subtitles = data["subtitles"]
+            )
+
+        return Single(
+            data["url"],
+            title = data["title"],
+            audio_url = data["audio_url"],
+            referrer = data["referrer"],
+            year = data["year"],
+            subtitles = data["subtitles"]
+        )
+
+    def set(self, key: str, media: Multi | Single, ttl: float) -> None:
+        data = {
+            "type": "multi" if isinstance(media, Multi) else "single",
+            "url": media.url,
+            "title": media.title,
+            "audio_url": getattr(media, "audio_url", None), # Older mov-cli versions don't have audio urls.
+            "referrer": media.referrer,
+            "subtitles": media.subtitles,
+            "year": getattr(media, "year", None)
+        }
+
+        self.store.set(key, json.dumps(data).encode(), ttl)
+
+    def delete(self, key: str) -> None:
+        self.store.delete(key)
+
+    @classmethod
+    def is_still_valid(cls, http_client: HTTPClient, media: Multi | Single) -> bool:
+        """
+        A cheap HEAD of the stream url to make sure the host still serves it before we hand it to the player.
+
+        It's sent straight through mov-cli's client with a short timeout, retrying or waiting 
+        on a circuit breaker would cost more than scraping the stream again.
+        """
+        now = time.time()
+
+        with cls.__validated_lock:
+            checked_at = cls.__validated.get(media.url)
+
+        if checked_at is not None and now - checked_at < VALIDATED_FOR:
+            return True
+
+        headers = {"Referer": media.referrer} if media.referrer else {}
+
+        try:
+            response = unwrap_http_client(http_client).request(
+                "HEAD", media.url, headers = headers, redirect = True, timeout = VALIDATION_TIMEOUT
+            )
+        except Exception:
+            return False
+
+        # Some CDNs don't do HEAD at all, that isn't the same as the stream being gone.
+        valid = response.status_code < 400 or response.status_code in (405, 501)
+
+        if valid:
+
+            with cls.__validated_lock:
+                cls.__validated = {url: at for url, at in cls.__validated.items() if now - at < VALIDATED_FOR}
+                cls.__validated[media.url] = now
+
+        return valid
+
+def cached_stream(ttl: float) -> Callable[[ScrapeT], ScrapeT]:
+    """
+    Decorates a scraper's ``scrape()`` so what it resolves is kept for ``ttl`` seconds, keyed 
+    by scraper, metadata id, season and episode. Pass ``--cache false`` to the scraper to skip it.
+    """
+    def decorator(scrape: ScrapeT) -> ScrapeT:
+
+        @wraps(scrape)
+        def wrapper(self, metadata: Metadata, episode: EpisodeSelector):
+
+            if not get_bool_option(self.options, "cache", True):
+                return scrape(self, metadata, episode)
+
+            cache = StreamCache.default()
+            key = cache.key(self.__class__.__name__, metadata, episode)
+
+            media = cache.get(key, episode)
+
+            if media is not None:
+
+                if cache.is_still_valid(self.http_client, media):
+                    self.logger.debug(f"Using the cached stream of '{metadata.title}'.")
+                    return media
+
+                cache.delete(key)
+
+            media = scrape(self, metadata, episode)
+
+            if media is not None:
+                cache.set(key, media, ttl)
+
+            return media
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,38 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Dict, Generator
+
+import time
+from contextlib import contextmanager
+
+from .tracing import tracer
+
+__all__ = (
+    "StepTimer",
+)
+
+class StepTimer():
+    """Records how long each named step of a scrape took, in the order they ran."""
+    def __init__(self) -> None:
+        self.steps: Dict[str, float] = {}
+        self.__started_at = time.perf_counter()
+
+    @contextmanager
+    def step(self, name: str) -> Generator[None, None, None]:
+        started_at = time.perf_counter()
+
+        try:
+            with tracer.span(name, "step"):
+                yield
+        finally:
+            self.steps[name] = self.steps.get(name, 0.0) + time.perf_counter() - started_at
+
+    @property
+    def total(self) -> float:
+        return time.perf_counter() - self.__started_at
+
+    def __str__(self) -> str:
+        steps = " ".join(f"{name}={duration * 1000:.0f}ms" for name, duration in self.steps.items())
+        return f"{steps} (total={self.total * 1000:.0f}ms)"
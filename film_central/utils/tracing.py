@@ -0,0 +1,246 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Any, Dict, List, Optional, Tuple, Generator, TextIO
+
+    from pathlib import Path
+
+    from httpx import Response
+    from mov_cli.http_client import HTTPClient
+
+import os
+import re
+import json
+import time
+import atexit
+import threading
+from itertools import count
+from contextvars import ContextVar
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from httpx import URL
+
+from .http_client import HTTPClientWrapper
+
+__all__ = (
+    "Span",
+    "TraceSink",
+    "StatsSink",
+    "JSONLinesSink",
+    "Tracer",
+    "tracer",
+    "url_template",
+    "TracingHTTPClient",
+)
+
+TRACE_ENV_VARIABLE = "FILM_CENTRAL_TRACE"
+
+SPAN_KINDS = (
+    "http", # A request through the http client stack.
+    "parse", # Turning a page into something we can read (soups, directory listings).
+    "decode", # Deobfuscating ids and urls.
+    "probe", # Measuring a stream variant before picking one.
+    "step", # A step of a scrape, see ``StepTimer``.
+)
+
+SPAN_IDS = count(1)
+
+# The innermost open span. A context variable rather than a thread local so coroutines 
+# interleaving on the event loop thread each see their own (tasks copy it when created).
+current_span: ContextVar[Optional[Span]] = ContextVar("film_central_current_span", default = None)
+
+# Path segments that look like ids, tokens or slugs with numbers in them.
+ID_SEGMENT_REGEX = re.compile(r"^(?=.*\d)[\w.,%+=~-]+$|^[\w-]{24,}$")
+
+@dataclass
+class Span:
+    name: str
+    kind: str
+    """One of ``SPAN_KINDS``."""
+    started_at: float = field(default_factory = time.time)
+    duration: float = 0.0
+    attributes: Dict[str, Any] = field(default_factory = dict)
+    thread: str = field(default_factory = lambda: threading.current_thread().name)
+    id: int = field(default_factory = lambda: next(SPAN_IDS))
+    parent_id: Optional[int] = None
+    """The ``id`` of the span this one was opened in, if any."""
+
+    def set(self, name: str, value: Any) -> None:
+        self.attributes[name] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "started_at": self.started_at,
+            "duration": self.duration,
+            "thread": self.thread,
+            "id": self.id,
+            "parent_id": self.parent_id,
+            **self.attributes
+        }
+
+class NoSpan():
+    """Handed out instead of a span while tracing is off so the hot paths don't pay for it."""
+    __slots__ = ()
+
+    def set(self, name: str, value: Any) -> None:
+        pass
+
+NO_SPAN = NoSpan()
+
+class TraceSink(ABC):
+    """Receives every finished span. Sinks are called from whatever thread the span ran on."""
+    @abstractmethod
+    def emit(self, span: Span) -> None:
+        ...
+
+class StatsSink(TraceSink):
+    """Keeps count, total and max duration per (kind, name), e.g. ("http", "https://vidsrc.to/embed/movie/{}")."""
+    def __init__(self) -> None:
+        self.stats: Dict[Tuple[str, str], List[float]] = {}
+        self.__lock = threading.Lock()
+
+    def emit(self, span: Span) -> None:
+        with self.__lock:
+            stats = self.stats.setdefault((span.kind, span.name), [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += span.duration
+            stats[2] = max(stats[2], span.duration)
+
+    def summary(self) -> str:
+        with self.__lock:
+            rows = sorted(self.stats.items(), key = lambda x: x[1][1], reverse = True)
+
+        return "\n".join(
+            f"{kind:<6} {name:<60} count={count:<4} total={total * 1000:.0f}ms max={longest * 1000:.0f}ms" 
+                for (kind, name), (count, total, longest) in rows
+        )
+
+class JSONLinesSink(TraceSink):
+    """
+    Appends every span to a file as one JSON object per line. The file is opened on the first span 
+    and kept open, writes are buffered and flushed by ``flush()``, ``close()`` or on exit.
+    """
+    def __init__(self, path: Path | str) -> None:
+        self.path = path
+
+        self.__file: Optional[TextIO] = None
+        self.__lock = threading.Lock()
+
+        atexit.register(self.close)
+
+    def emit(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default = str) + "\n"
+
+        with self.__lock:
+
+            if self.__file is None:
+                self.__file = open(self.path, "a", encoding = "utf-8")
+
+            self.__file.write(line)
+
+    def flush(self) -> None:
+        with self.__lock:
+
+            if self.__file is not None:
+                self.__file.flush()
+
+    def close(self) -> None:
+        with self.__lock:
+
+            if self.__file is not None:
+                self.__file.close()
+                self.__file = None
+
+class Tracer():
+    """Hands out spans to the sinks attached to it. With no sinks attached tracing is off."""
+    def __init__(self) -> None:
+        self.sinks: List[TraceSink] = []
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.sinks)
+
+    def add_sink(self, sink: TraceSink) -> None:
+        self.sinks.append(sink)
+
+    def remove_sink(self, sink: TraceSink) -> None:
+        self.sinks.remove(sink)
+
+    @contextmanager
+    def span(self, name: str, kind: str = "step", **attributes) -> Generator[Span | NoSpan, None, None]:
+        if kind not in SPAN_KINDS:
+            raise ValueError(f"'{kind}' isn't a span kind, expected one of {SPAN_KINDS}.")
+
+        if not self.sinks:
+            yield NO_SPAN
+            return
+
+        parent = current_span.get()
+
+        span = Span(name, kind, attributes = attributes, parent_id = None if parent is None else parent.id)
+        token = current_span.set(span)
+        started_at = time.perf_counter()
+
+        try:
+            yield span
+        except BaseException as e:
+            span.set("error", e.__class__.__name__)
+            raise
+        finally:
+            span.duration = time.perf_counter() - started_at
+
+            try:
+                current_span.reset(token)
+            except ValueError:
+                # Closed from another context (e.g. an async generator resumed by another 
+                # task), the one it was opened in is gone so there's nothing to restore.
+                pass
+
+            for sink in self.sinks:
+                sink.emit(span)
+
+    def annotate(self, name: str, value: Any) -> None:
+        """Sets an attribute on the innermost span open in this thread or task, if there's one."""
+        if not self.sinks:
+            return
+
+        span = current_span.get()
+
+        if span is not None:
+            span.set(name, value)
+
+tracer = Tracer()
+
+if os.environ.get(TRACE_ENV_VARIABLE):
+    tracer.add_sink(JSONLinesSink(os.environ[TRACE_ENV_VARIABLE]))
+
+def url_template(url: URL | str) -> str:
+    """Strips the ids and query values out of a url so requests to the same endpoint group together."""
+    url = URL(url)
+
+    path = "/".join("{}" if ID_SEGMENT_REGEX.match(segment) else segment for segment in url.path.split("/"))
+    query = "&".join(f"{name}={{}}" for name in dict(url.params))
+
+    return f"{url.scheme}://{url.host}{path}" + (f"?{query}" if query else "")
+
+class TracingHTTPClient(HTTPClientWrapper):
+    """Records a span per request with its url template, status, size and how many retries it took."""
+    def __init__(self, http_client: HTTPClient) -> None:
+        super().__init__(http_client)
+
+    def request(self, method: str, url: str, params: Optional[Dict[str, str]] = None, **kwargs) -> Response:
+        if not tracer.enabled:
+            return super().request(method, url, params = params, **kwargs)
+
+        with tracer.span(url_template(URL(url).copy_merge_params(params or {})), "http", method = method.upper()) as span:
+            response = super().request(method, url, params = params, **kwargs)
+
+            span.set("status", response.status_code)
+            span.set("bytes", len(response.content))
+
+        return response
@@ -0,0 +1,183 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, NamedTuple
+
+if TYPE_CHECKING:
+    from typing import Callable, Dict, List, Optional, Sequence
+
+    from mov_cli.http_client import HTTPClient
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import httpx
+
+from .tracing import tracer, url_template
+
+__all__ = (
+    "VariantProbe",
+    "probe_variant",
+    "pick_variant",
+    "get_probe_client",
+)
+
+SAMPLE_SIZE = 256 * 1024
+"""How much of each candidate is downloaded to measure its throughput."""
+
+PROBE_TIMEOUT = 5.0
+"""A probe is one attempt, a candidate that takes longer than this to answer isn't worth waiting on."""
+
+probe_executor = ThreadPoolExecutor(max_workers = 8, thread_name_prefix = "film-central-variant-probe")
+
+_probe_client: Optional[httpx.Client] = None
+_probe_client_lock = threading.Lock()
+
+def get_probe_client() -> httpx.Client:
+    """
+    The httpx client probes are streamed through. mov-cli's client reads whole bodies (and ours 
+    retries), neither of which a probe wants, it's configured the same otherwise (no proxy).
+    """
+    global _probe_client
+
+    with _probe_client_lock:
+
+        if _probe_client is None:
+            _probe_client = httpx.Client(timeout = PROBE_TIMEOUT, follow_redirects = True)
+
+        return _probe_client
+
+def _first_uri(playlist: str) -> Optional[str]:
+    """The first variant of a master playlist or the first segment of a media playlist."""
+    for line in playlist.splitlines():
+        line = line.strip()
+
+        if line and not line.startswith("#"):
+            return line
+
+    return None
+
+def _read_at_most(response: httpx.Response, size: int) -> int:
+    """Reads up to ``size`` bytes of the body (a server ignoring the range would send all of it) and returns how many."""
+    received = 0
+
+    for chunk in response.iter_bytes():
+        received += len(chunk)
+
+        if received >= size:
+            break
+
+    return min(received, size)
+
+class VariantProbe(NamedTuple):
+    url: str
+    latency: Optional[float] = None
+    """Seconds spent getting to the sampled file, i.e. following the playlists (0 for a plain file)."""
+    ttfb: Optional[float] = None
+    """Seconds from requesting the sample to its response starting to come in."""
+    throughput: Optional[float] = None
+    """Bytes per second of the sample once it started coming in."""
+
+    @property
+    def ok(self) -> bool:
+        return self.latency is not None and self.ttfb is not None and self.throughput is not None
+
+    @property
+    def sample_time(self) -> float:
+        """Roughly how long it takes to get the sample, which is what the player waits on before starting."""
+        return self.latency + self.ttfb + SAMPLE_SIZE / max(self.throughput, 1.0)
+
+def probe_variant(
+    client: httpx.Client, 
+    url: str, 
+    headers: Optional[Dict[str, str]] = None, 
+    sample_size: int = SAMPLE_SIZE
+) -> VariantProbe:
+    """
+    Measures a stream url by streaming its first ``sample_size`` bytes with a ranged GET through ``client``, 
+    once with no retries. HLS playlists are followed down to their first media segment, which is what actually gets sampled.
+    """
+    headers = {**(headers or {}), "Range": f"bytes=0-{sample_size - 1}"}
+    target = url
+
+    with tracer.span(url_template(url), "probe") as span:
+
+        try:
+            started_at = time.perf_counter()
+
+            for _ in range(3): # master playlist -> media playlist -> segment
+                requested_at = time.perf_counter()
+
+                with client.stream("GET", target, headers = headers) as response:
+                    answered_at = time.perf_counter()
+
+                    if response.status_code >= 400:
+                        return VariantProbe(url)
+
+                    is_playlist = target.split("?")[0].endswith(".m3u8") or "mpegurl" in response.headers.get("content-type", "").lower()
+
+                    if is_playlist:
+                        next_url = _first_uri(response.read().decode(response.encoding or "utf-8", errors = "replace"))
+
+                        if next_url is None:
+                            return VariantProbe(url)
+
+                        target = str(response.url.join(next_url))
+                        continue
+
+                    received = _read_at_most(response, sample_size)
+
+                if received == 0:
+                    return VariantProbe(url)
+
+                latency = requested_at - started_at
+                ttfb = answered_at - requested_at
+                throughput = received / max(time.perf_counter() - answered_at, 1e-3)
+
+                span.set("latency", latency)
+                span.set("ttfb", ttfb)
+                span.set("throughput", throughput)
+
+                return VariantProbe(url, latency, ttfb, throughput)
+
+        except Exception as e: # A probe that fails just doesn't get picked.
+            span.set("error", e.__class__.__name__)
+
+    return VariantProbe(url)
+
+def pick_variant(
+    http_client: HTTPClient, 
+    urls: Sequence[str], 
+    headers: Optional[Dict[str, str]] = None, 
+    budget: float = 3.0, 
+    preference: Callable[[str], int] = lambda url: 0, 
+    required_throughput: Callable[[int], float] = lambda preference: 0.0
+) -> Optional[str]:
+    """
+    Probes every candidate at once (sending ``http_client``'s default headers along with ``headers``) 
+    and picks one from whatever answered within ``budget`` seconds.
+
+    The most preferred candidates (e.g. highest resolution) whose fastest probe keeps up with 
+    ``required_throughput`` win, the quickest of them is picked. If nothing keeps up the quickest 
+    overall is picked, and if nothing answered in time the first candidate is returned.
+    """
+    if len(urls) <= 1:
+        return urls[0] if urls else None
+
+    headers = {**getattr(http_client, "headers", {}), **(headers or {})}
+    client = get_probe_client()
+
+    futures = [probe_executor.submit(probe_variant, client, url, headers) for url in urls]
+    done, _ = wait(futures, timeout = budget)
+
+    probes: List[VariantProbe] = [future.result() for future in futures if future in done and future.result().ok]
+
+    if not probes:
+        return urls[0]
+
+    for level in sorted({preference(probe.url) for probe in probes}, reverse = True):
+        fastest = min((probe for probe in probes if preference(probe.url) == level), key = lambda probe: probe.sample_time)
+
+        if fastest.throughput >= required_throughput(level):
+            return fastest.url
+
+    return min(probes, key = lambda probe: probe.sample_time).url
@@ -0,0 +1,160 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, NamedTuple
+
+if TYPE_CHECKING:
+    from typing import Callable, List, Optional, Tuple
+
+    from bs4 import BeautifulSoup, Tag
+
+from html.parser import HTMLParser
+from dataclasses import dataclass, field
+
+from ..utils import tracer
+
+__all__ = (
+    "DirectoryEntry",
+    "Directory",
+    "parse_directory",
+    "parse_directory_html",
+)
+
+class DirectoryEntry(NamedTuple):
+    name: str
+    href: str
+
+@dataclass
+class Directory:
+    """A parsed vadapav directory page."""
+    path: str
+    breadcrumb: List[str] = field(default_factory = list)
+    """The names in the path bar at the top of the page, e.g. ["Movies", ...] or ["TV", ...]."""
+    directories: List[DirectoryEntry] = field(default_factory = list)
+    """Sub directories, including the ".." parent entry vadapav puts first."""
+    files: List[DirectoryEntry] = field(default_factory = list)
+
+    def files_excluding(self, *extensions: str) -> List[DirectoryEntry]:
+        return [file for file in self.files if file.name[-4:] not in extensions]
+
+    def files_with(self, extension: str) -> List[DirectoryEntry]:
+        return [file for file in self.files if file.name[-4:] == extension]
+
+def parse_directory(path: str, soup: BeautifulSoup) -> Directory:
+    directory = Directory(path)
+
+    directory_div = soup.find("div", {"class": "directory"})
+
+    if directory_div is not None and directory_div.find("div") is not None:
+        directory.breadcrumb = [span.text for span in directory_div.find("div").find_all("span")]
+
+    for entry in soup.find_all("a", {"class": "directory-entry"}):
+        directory.directories.append(_to_entry(entry))
+
+    for entry in soup.find_all("a", {"class": "file-entry"}):
+        directory.files.append(_to_entry(entry))
+
+    return directory
+
+def _to_entry(tag: Tag) -> DirectoryEntry:
+    return DirectoryEntry(
+        name = tag.string or tag.get_text(),
+        href = tag.get("data-href") or tag.get("href")
+    )
+
+def parse_directory_html(path: str, html: str, soup: Callable[[str], BeautifulSoup]) -> Directory:
+    """
+    Parses a directory page with the streaming fast path, only building a 
+    full soup (through ``soup``) if the fast path fails or finds nothing.
+    """
+    with tracer.span("vadapav.directory", "parse", bytes = len(html)) as span:
+        directory = _parse_directory_fast(path, html)
+
+        if directory is None:
+            span.set("fallback", True)
+            directory = parse_directory(path, soup(html))
+
+    return directory
+
+def _parse_directory_fast(path: str, html: str) -> Optional[Directory]:
+    parser = _DirectoryParser()
+
+    try:
+        parser.feed(html)
+        parser.close()
+    except Exception:
+        return None
+
+    if not parser.breadcrumb and not parser.directories and not parser.files:
+        return None # Doesn't look like a directory page we understand.
+
+    return Directory(path, parser.breadcrumb, parser.directories, parser.files)
+
+class _DirectoryParser(HTMLParser):
+    """
+    Streams through a vadapav directory page keeping only what ``Directory`` needs: 
+    the breadcrumb spans and the directory / file anchors. No tree is ever built.
+    """
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs = True)
+
+        self.breadcrumb: List[str] = []
+        self.directories: List[DirectoryEntry] = []
+        self.files: List[DirectoryEntry] = []
+
+        self.__div_depth = 0
+        self.__directory_div_depth: Optional[int] = None
+        self.__breadcrumb_div_depth: Optional[int] = None
+        self.__breadcrumb_done = False
+
+        self.__in_span = False
+        self.__anchor: Optional[Tuple[str, str]] = None
+        self.__text: List[str] = []
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        if tag == "div":
+            self.__div_depth += 1
+            classes = (dict(attrs).get("class") or "").split()
+
+            if self.__directory_div_depth is None and "directory" in classes:
+                self.__directory_div_depth = self.__div_depth
+
+            elif self.__directory_div_depth == self.__div_depth - 1 and self.__breadcrumb_div_depth is None and not self.__breadcrumb_done:
+                self.__breadcrumb_div_depth = self.__div_depth
+
+        elif tag == "span" and self.__breadcrumb_div_depth is not None:
+            self.__in_span = True
+            self.__text = []
+
+        elif tag == "a":
+            attributes = dict(attrs)
+            classes = (attributes.get("class") or "").split()
+
+            kind = "directory" if "directory-entry" in classes else "file" if "file-entry" in classes else None
+
+            if kind is not None:
+                self.__anchor = (kind, attributes.get("data-href") or attributes.get("href"))
+                self.__text = []
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "div":
+
+            if self.__div_depth == self.__breadcrumb_div_depth:
+                self.__breadcrumb_div_depth = None
+                self.__breadcrumb_done = True
+
+            self.__div_depth -= 1
+
+        elif tag == "span" and self.__in_span:
+            self.breadcrumb.append("".join(self.__text))
+            self.__in_span = False
+
+        elif tag == "a" and self.__anchor is not None:
+            kind, href = self.__anchor
+            entry = DirectoryEntry("".join(self.__text), href)
+
+            (self.directories if kind == "directory" else self.files).append(entry)
+
+            self.__anchor = None
+
+    def handle_data(self, data: str) -> None:
+        if self.__in_span or self.__anchor is not None:
+            self.__text.append(data)
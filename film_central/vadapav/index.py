@@ -0,0 +1,468 @@
+"""
+An opt-in local index of the vadapav directory tree.
+
+Build or refresh it with ``python -m film_central.vadapav.index`` and then pass 
+``--index`` to the vadapav scraper to search (and look up episodes) without touching the network.
+"""
+from __future__ import annotations
+from typing import TYPE_CHECKING, NamedTuple
+
+if TYPE_CHECKING:
+    from typing import Dict, List, Optional, Tuple, Iterable
+    from pathlib import Path
+
+    from mov_cli.http_client import HTTPClient
+
+    from .directory import Directory
+
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+from bs4 import BeautifulSoup
+from mov_cli import MetadataType
+
+from ..utils import get_cache_directory, ordered_map
+from .directory import DirectoryEntry, parse_directory_html
+
+__all__ = (
+    "VadapavIndex",
+    "VadapavIndexer",
+    "IndexedTitle",
+)
+
+VIDEO_EXTENSIONS = (".mkv", ".mp4", ".avi", ".m4v", ".webm")
+
+MOVIE_NAME_REGEX = re.compile(r"^(.*?)\s*\((\d{4})\)$")
+SEASON_NAME_REGEX = re.compile(r"season\s*(\d+)", re.IGNORECASE)
+EPISODE_REGEX = re.compile(r"S(\d{1,2})E(\d{1,3})", re.IGNORECASE)
+
+class IndexedTitle(NamedTuple):
+    path: str
+    title: str
+    year: Optional[str]
+    type: MetadataType
+    file_href: Optional[str]
+    subtitle_href: Optional[str]
+
+class VadapavIndex():
+    """The on-disk index itself, a single SQLite file."""
+    __default: Optional[VadapavIndex] = None
+    __default_lock = threading.Lock()
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(str(path), timeout = 10, check_same_thread = False)
+
+        with self.__connection:
+            self.__connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS titles (
+                    path TEXT PRIMARY KEY, title TEXT NOT NULL, normalized_title TEXT NOT NULL, 
+                    year TEXT, type INTEGER NOT NULL, file_href TEXT, subtitle_href TEXT
+                );
+                CREATE TABLE IF NOT EXISTS episodes (
+                    series_path TEXT NOT NULL, season INTEGER NOT NULL, episode INTEGER NOT NULL, 
+                    file_href TEXT NOT NULL, subtitle_href TEXT, 
+                    PRIMARY KEY (series_path, season, episode)
+                );
+                CREATE TABLE IF NOT EXISTS seasons (
+                    series_path TEXT NOT NULL, season INTEGER NOT NULL, href TEXT NOT NULL, 
+                    PRIMARY KEY (series_path, season)
+                );
+                CREATE TABLE IF NOT EXISTS directories (
+                    path TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, 
+                    etag TEXT, last_modified TEXT, crawled_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS groupings (
+                    path TEXT PRIMARY KEY, entries TEXT NOT NULL
+                );
+                """
+            )
+
+    @classmethod
+    def default(cls) -> VadapavIndex:
+        """The index shared by every scraper in this process, so they all use one connection."""
+        with cls.__default_lock:
+
+            if cls.__default is None:
+                cls.__default = cls(get_cache_directory().joinpath("vadapav-index.sqlite3"))
+
+            return cls.__default
+
+    def is_empty(self) -> bool:
+        with self.__lock:
+            return self.__connection.execute("SELECT 1 FROM titles LIMIT 1").fetchone() is None
+
+    def search(self, query: str, limit: int) -> List[IndexedTitle]:
+        words = normalize_title(query).split()
+
+        if not words:
+            return []
+
+        where = " AND ".join("normalized_title LIKE ? ESCAPE '\\'" for _ in words)
+
+        with self.__lock:
+            rows = self.__connection.execute(
+                f"SELECT path, title, year, type, file_href, subtitle_href FROM titles WHERE {where} " \
+                    "ORDER BY (normalized_title = ?) DESC, length(normalized_title) ASC LIMIT ?",
+                [f"%{escape_like(word)}%" for word in words] + [" ".join(words), limit]
+            ).fetchall()
+
+        return [self.__to_title(row) for row in rows]
+
+    def get_title(self, path: str) -> Optional[IndexedTitle]:
+        with self.__lock:
+            row = self.__connection.execute(
+                "SELECT path, title, year, type, file_href, subtitle_href FROM titles WHERE path = ?", (path.strip("/"),)
+            ).fetchone()
+
+        return None if row is None else self.__to_title(row)
+
+    def season_episode_counts(self, series_path: str) -> Dict[int, int]:
+        with self.__lock:
+            rows = self.__connection.execute(
+                "SELECT season, COUNT(*) FROM episodes WHERE series_path = ? GROUP BY season ORDER BY season", (series_path.strip("/"),)
+            ).fetchall()
+
+        return {season: count for season, count in rows}
+
+    def episode_files(self, series_path: str) -> Dict[Tuple[int, int], Tuple[str, Optional[str]]]:
+        """Returns ``(season, episode) -> (file href, subtitle href)`` for a series."""
+        with self.__lock:
+            rows = self.__connection.execute(
+                "SELECT season, episode, file_href, subtitle_href FROM episodes WHERE series_path = ?", (series_path.strip("/"),)
+            ).fetchall()
+
+        return {(season, episode): (file_href, subtitle_href) for season, episode, file_href, subtitle_href in rows}
+
+    def directory_state(self, path: str) -> Optional[Tuple[str, Optional[str], Optional[str], float]]:
+        """Returns ``(fingerprint, etag, last modified, crawled at)`` for a crawled directory."""
+        with self.__lock:
+            return self.__connection.execute(
+                "SELECT fingerprint, etag, last_modified, crawled_at FROM directories WHERE path = ?", (path,)
+            ).fetchone()
+
+    def save_directory_state(self, path: str, fingerprint: str, etag: Optional[str], last_modified: Optional[str]) -> None:
+        with self.__lock, self.__connection:
+            self.__connection.execute(
+                "INSERT OR REPLACE INTO directories (path, fingerprint, etag, last_modified, crawled_at) VALUES (?, ?, ?, ?, ?)",
+                (path, fingerprint, etag, last_modified, time.time())
+            )
+
+    def grouping_entries(self, path: str) -> Optional[List[DirectoryEntry]]:
+        """Returns the sub directories a grouping directory (e.g. a letter or collection) had when it was last crawled."""
+        with self.__lock:
+            row = self.__connection.execute("SELECT entries FROM groupings WHERE path = ?", (path,)).fetchone()
+
+        return None if row is None else [DirectoryEntry(name, href) for name, href in json.loads(row[0])]
+
+    def save_grouping(self, path: str, entries: List[DirectoryEntry]) -> None:
+        with self.__lock, self.__connection:
+            self.__connection.execute(
+                "INSERT OR REPLACE INTO groupings (path, entries) VALUES (?, ?)", (path, json.dumps(entries))
+            )
+
+    def save_title(self, title: IndexedTitle) -> None:
+        with self.__lock, self.__connection:
+            self.__connection.execute(
+                "INSERT OR REPLACE INTO titles (path, title, normalized_title, year, type, file_href, subtitle_href) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (title.path, title.title, normalize_title(title.title), title.year, title.type.value, title.file_href, title.subtitle_href)
+            )
+
+    def season_directories(self, series_path: str) -> List[Tuple[int, str]]:
+        """Returns ``(season, directory href)`` for every crawled season of a series."""
+        with self.__lock:
+            return self.__connection.execute(
+                "SELECT season, href FROM seasons WHERE series_path = ? ORDER BY season", (series_path.strip("/"),)
+            ).fetchall()
+
+    def save_season(self, series_path: str, season: int, href: str, episodes: Dict[int, Tuple[str, Optional[str]]]) -> None:
+        with self.__lock, self.__connection:
+            self.__connection.execute(
+                "INSERT OR REPLACE INTO seasons (series_path, season, href) VALUES (?, ?, ?)", (series_path, season, href)
+            )
+            self.__connection.execute("DELETE FROM episodes WHERE series_path = ? AND season = ?", (series_path, season))
+            self.__connection.executemany(
+                "INSERT INTO episodes (series_path, season, episode, file_href, subtitle_href) VALUES (?, ?, ?, ?, ?)",
+                [(series_path, season, episode, file_href, subtitle_href) for episode, (file_href, subtitle_href) in episodes.items()]
+            )
+
+    def remove_titles_not_in(self, paths: Iterable[str]) -> int:
+        """Drops titles (and their episodes) that vanished from the site, returns how many were removed."""
+        paths = set(paths)
+
+        with self.__lock, self.__connection:
+            stale_paths = [
+                (path,) for (path,) in self.__connection.execute("SELECT path FROM titles").fetchall() if path not in paths
+            ]
+
+            self.__connection.executemany("DELETE FROM titles WHERE path = ?", stale_paths)
+            self.__connection.executemany("DELETE FROM episodes WHERE series_path = ?", stale_paths)
+            self.__connection.executemany("DELETE FROM seasons WHERE series_path = ?", stale_paths)
+
+        return len(stale_paths)
+
+    def __to_title(self, row: tuple) -> IndexedTitle:
+        path, title, year, type, file_href, subtitle_href = row
+        return IndexedTitle(path, title, year, MetadataType(type), file_href, subtitle_href)
+
+class VadapavIndexer():
+    """
+    Crawls the Movies and TV trees of vadapav into a ``VadapavIndex``.
+
+    Every directory is requested conditionally (ETag / Last-Modified) and fingerprinted, 
+    so a refresh only re-parses and rewrites the directories that actually changed. 
+    Directories crawled less than ``max_age`` seconds ago aren't requested at all.
+    """
+    def __init__(
+        self, 
+        http_client: HTTPClient, 
+        index: VadapavIndex, 
+        base_url: str = "https://vadapav.mov", 
+        workers: int = 8, 
+        max_age: float = 0, 
+        parser: str = "html.parser"
+    ) -> None:
+        self.http_client = http_client
+        self.index = index
+        self.base_url = base_url
+        self.workers = workers
+        self.max_age = max_age
+        self.parser = parser
+
+        self.changed_directories = 0
+        self.unchanged_directories = 0
+
+    def refresh(self) -> None:
+        root = self.__fetch_directory("", force = True)
+
+        seen_titles: List[str] = []
+
+        for category in root.directories:
+
+            if category.name.startswith("Movies"):
+                seen_titles.extend(self.__crawl_movies(category.href, grouping = self.__fetch_directory(category.href)))
+
+            elif category.name.startswith("TV"):
+                seen_titles.extend(self.__crawl_tv(category.href, grouping = self.__fetch_directory(category.href)))
+
+        self.index.remove_titles_not_in(seen_titles)
+
+    def __crawl_movies(self, path: str, depth: int = 0, grouping: Optional[Directory] = None) -> List[str]:
+        seen_titles = []
+
+        for entry, directory in ordered_map(self.__fetch_entry, self.__grouping_entries(path, grouping), self.workers):
+            title_path = entry.href.strip("/")
+
+            if directory is None and self.index.get_title(title_path) is not None: # Unchanged since the last crawl.
+                seen_titles.append(title_path)
+                continue
+
+            if directory is None or not video_files(directory):
+                # Not a film but a directory grouping films (e.g. by letter or collection).
+                if depth < 2:
+                    seen_titles.extend(self.__crawl_movies(entry.href, depth + 1, directory))
+
+                continue
+
+            self.index.save_title(movie_title(entry, directory))
+            seen_titles.append(title_path)
+
+        return seen_titles
+
+    def __crawl_tv(self, path: str, depth: int = 0, grouping: Optional[Directory] = None) -> List[str]:
+        seen_titles = []
+
+        for entry, directory in ordered_map(self.__fetch_entry, self.__grouping_entries(path, grouping), self.workers):
+            series_path = entry.href.strip("/")
+
+            if directory is None and self.index.get_title(series_path) is not None:
+                # The series listing itself is unchanged but episodes get added 
+                # to existing seasons, so we still check on the season directories.
+                seasons = [
+                    DirectoryEntry(f"Season {season:02d}", href) for season, href in self.index.season_directories(series_path)
+                ]
+
+            else:
+                seasons = [] if directory is None else [
+                    x for x in directory.directories[1:] if SEASON_NAME_REGEX.search(x.name)
+                ]
+
+                if not seasons: # A directory grouping series rather than a series.
+
+                    if depth < 2:
+                        seen_titles.extend(self.__crawl_tv(entry.href, depth + 1, directory))
+
+                    continue
+
+                self.index.save_title(IndexedTitle(series_path, entry.name, None, MetadataType.MULTI, None, None))
+
+            seen_titles.append(series_path)
+
+            for season_entry, season_directory in ordered_map(self.__fetch_entry, seasons, self.workers):
+
+                if season_directory is None:
+                    continue
+
+                season = int(SEASON_NAME_REGEX.search(season_entry.name).group(1))
+                self.index.save_season(series_path, season, season_entry.href, season_episodes(season_directory))
+
+        return seen_titles
+
+    def __grouping_entries(self, path: str, grouping: Optional[Directory]) -> List[DirectoryEntry]:
+        """
+        The sub directories of a grouping directory. ``grouping`` is what the conditional fetch 
+        returned, when that's None (unchanged) they come from the index instead of downloading it again.
+        """
+        key = path.strip("/")
+
+        if grouping is None:
+            entries = self.index.grouping_entries(key)
+
+            if entries is not None:
+                return entries
+
+            grouping = self.__fetch_directory(path, force = True) # Crawled by an older version that didn't keep them.
+
+        entries = grouping.directories[1:]
+        self.index.save_grouping(key, entries)
+
+        return entries
+
+    def __fetch_entry(self, entry: DirectoryEntry) -> Tuple[DirectoryEntry, Optional[Directory]]:
+        return entry, self.__fetch_directory(entry.href)
+
+    def __fetch_directory(self, path: str, force: bool = False) -> Optional[Directory]:
+        """
+        Returns the parsed directory or None if it hasn't changed since the last crawl. 
+        Forced fetches always download and return the directory.
+        """
+        key = path.strip("/")
+        state = None if force else self.index.directory_state(key)
+
+        headers = {}
+
+        if state is not None:
+            fingerprint, etag, last_modified, crawled_at = state
+
+            if time.time() - crawled_at < self.max_age:
+                self.unchanged_directories += 1
+                return None
+
+            if etag is not None:
+                headers["If-None-Match"] = etag
+
+            if last_modified is not None:
+                headers["If-Modified-Since"] = last_modified
+
+        response = self.http_client.request("GET", f"{self.base_url}/{path.lstrip('/')}", headers = headers)
+
+        if response.status_code == 304 and state is not None:
+            self.index.save_directory_state(key, fingerprint, etag, last_modified)
+            self.unchanged_directories += 1
+            return None
+
+        directory = parse_directory_html(key, response.text, lambda html: BeautifulSoup(html, self.parser))
+        new_fingerprint = fingerprint_directory(directory)
+
+        self.index.save_directory_state(
+            key, new_fingerprint, response.headers.get("etag"), response.headers.get("last-modified")
+        )
+
+        if state is not None and fingerprint == new_fingerprint:
+            self.unchanged_directories += 1
+            return None
+
+        self.changed_directories += 1
+        return directory
+
+def normalize_title(title: str) -> str:
+    return " ".join(re.sub(r"[^\w\s]", " ", title.lower()).split())
+
+def escape_like(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def fingerprint_directory(directory: Directory) -> str:
+    entries = "\n".join(f"{name}\t{href}" for name, href in directory.directories + directory.files)
+    return hashlib.sha1(entries.encode()).hexdigest()
+
+def movie_title(entry: DirectoryEntry, directory: Directory) -> IndexedTitle:
+    match = MOVIE_NAME_REGEX.match(entry.name)
+    title, year = (match.group(1), match.group(2)) if match else (entry.name, None)
+
+    subtitles = directory.files_with(".srt")
+
+    # Same rule as the scraper: the highest resolution file wins.
+    best_file = max(video_files(directory), key = lambda file: resolution_of(file.name))
+
+    return IndexedTitle(
+        entry.href.strip("/"), 
+        title, 
+        year, 
+        MetadataType.SINGLE, 
+        best_file.href, 
+        subtitles[0].href if subtitles else None
+    )
+
+def video_files(directory: Directory) -> List[DirectoryEntry]:
+    """The files of that directory that can be played, the one rule every vadapav scraper picks files by."""
+    return [file for file in directory.files if file.name.lower().endswith(VIDEO_EXTENSIONS)]
+
+def season_episodes(directory: Directory) -> Dict[int, Tuple[str, Optional[str]]]:
+    subtitles: Dict[int, str] = {}
+    episodes: Dict[int, str] = {}
+
+    for file in directory.files:
+        match = EPISODE_REGEX.search(file.name)
+
+        if match is None:
+            continue
+
+        episode = int(match.group(2))
+
+        if file.name.endswith(".srt"):
+            subtitles.setdefault(episode, file.href)
+
+        elif file.name.lower().endswith(VIDEO_EXTENSIONS):
+            episodes.setdefault(episode, file.href)
+
+    return {episode: (href, subtitles.get(episode)) for episode, href in episodes.items()}
+
+def resolution_of(filename: str) -> int:
+    match = re.search(r"(\d+)p|4K", filename)
+
+    if match is None:
+        return 0
+
+    return int(match.group(1)) if match.group(1) else 2160
+
+def main() -> None:
+    import argparse
+    from mov_cli.http_client import HTTPClient
+
+    parser = argparse.ArgumentParser(description = "Build or refresh the local vadapav title index.")
+    parser.add_argument("--workers", type = int, default = 8, help = "How many directories to fetch at once.")
+    parser.add_argument(
+        "--max-age", type = float, default = 0, help = "Skip directories crawled less than this many hours ago."
+    )
+    args = parser.parse_args()
+
+    index = VadapavIndex.default()
+    indexer = VadapavIndexer(HTTPClient(), index, workers = args.workers, max_age = args.max_age * 60 * 60)
+
+    started_at = time.perf_counter()
+    indexer.refresh()
+
+    print(
+        f"Indexed vadapav into '{index.path}' in {time.perf_counter() - started_at:.1f}s " \
+            f"({indexer.changed_directories} changed, {indexer.unchanged_directories} unchanged directories)."
+    )
+
+if __name__ == "__main__":
+    main()
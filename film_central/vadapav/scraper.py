@@ -2,98 +2,197 @@ from __future__ import annotations
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
-    from typing import Iterable, Optional
+    from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+    from concurrent.futures import Future
 
-    from bs4 import ResultSet, Tag
     from mov_cli import Config
     from mov_cli.http_client import HTTPClient
     from mov_cli.scraper import ScraperOptionsT
 
+    from .directory import Directory, DirectoryEntry
+
 import re
+import threading
+from urllib.parse import unquote
+from concurrent.futures import ThreadPoolExecutor
 
 from mov_cli import utils
 from mov_cli.scraper import Scraper
 from mov_cli import Multi, Single, Metadata, MetadataType
 
+from ..utils import SingleFlight, ordered_map, unordered_map, cached_stream, pick_variant, get_int_option, get_bool_option, wrap_http_client
+from .directory import parse_directory_html
+from .index import VadapavIndex, season_episodes, video_files, MOVIE_NAME_REGEX
+
 __all__ = ("VadapavScraper",)
 
+# Fetches the next season's directory in the background while the current episode plays.
+prefetch_executor = ThreadPoolExecutor(max_workers = 2, thread_name_prefix = "vadapav-prefetch")
+
+# Roughly the bytes per second a file of that resolution needs to play without stalling.
+REQUIRED_THROUGHPUT = {2160: 4_000_000, 1080: 1_250_000, 720: 600_000}
+
+# Names that can only be a show, e.g. "Show (TV)", "Show Season 1-3", "Show S01-S05" or "Show Mini-Series".
+TV_NAME_REGEX = re.compile(r"\(TV\)|\bTV Series\b|\bMini[- ]?Series\b|\bSeasons? \d|\bS\d{2}\b", re.IGNORECASE)
+
 class VadapavScraper(Scraper):
     def __init__(self, config: Config, http_client: HTTPClient, options: Optional[ScraperOptionsT] = None) -> None:
         self.base_url = "https://vadapav.mov"
-        super().__init__(config, http_client, options)
 
-    def search(self, query: str, limit: Optional[int]) -> Iterable[Metadata]:
-        limit = 20 if limit is None else limit
+        # Parsed directory pages by path, so the series and season directories
+        # walked in scrape_episodes() don't get downloaded again by scrape().
+        self.__directories: Dict[str, Directory] = {}
+        self.__directories_lock = threading.Lock()
 
-        search_url = f"{self.base_url}/s/{query}"
-        search_html = self.http_client.get(search_url)
-        search_results_soup = self.soup(search_html)
-        # In this site, all movies are appended with its release year.
-        # So it can be used as an inexpensive way to determine the type of media
-        # movie_pattern = r".*\(\d{4}\)$"
+        # (series id, season) -> episode -> (file href, subtitle href), built once per season from its directory.
+        self.__episode_maps: Dict[Tuple[str, int], Dict[int, Tuple[str, Optional[str]]]] = {}
 
-        index = 0
+        # Opt-in local index built by 'python -m film_central.vadapav.index'.
+        self.index = VadapavIndex.default() if get_bool_option(options or {}, "index", False) else None
 
-        for search_result_item in search_results_soup.find_all("a", {"class": "directory-entry"}):
-            if index > limit:
-                break
+        super().__init__(config, wrap_http_client(http_client, options or {}), options)
 
-            item_url = search_result_item.get("href")
+    def search(self, query: str, limit: Optional[int]) -> Iterable[Metadata]:
+        limit = 20 if limit is None else limit
 
-            r = self.http_client.get(self.base_url + item_url)
-            item_page = self.soup(r.text)
+        if self.index is not None:
 
-            item_directory_path: ResultSet[Tag] = item_page.find("div", {"class": "directory"}).find("div").find_all("span")
+            if not self.index.is_empty():
+                yield from self.__search_index(query, limit)
+                return
 
-            item_type = None
-            item_name = None
-            item_year = None
+            self.logger.warning(
+                "The vadapav index is empty so we're searching online instead. Build it with 'python -m film_central.vadapav.index'."
+            )
 
-            for dir_path in item_directory_path:
+        search_url = f"{self.base_url}/s/{query}"
+        search_html = self.http_client.get(search_url)
+        search_results = parse_directory_html(f"s/{query}", search_html.text, self.soup)
+
+        # Results under the Movies or TV directories (or named like a show) can be classified 
+        # from their entry alone. Only the ambiguous ones get their page fetched, in parallel but 
+        # never more at once than results we still need, and none once we have ``limit`` of them.
+        classify = self.__classify_search_result
+
+        if get_bool_option(self.options, "fast", True):
+            classify = self.__classify_search_result_fast
+
+        classified_results = ordered_map(
+            classify,
+            search_results.directories,
+            workers = get_int_option(self.options, "workers", 8),
+            limit = limit,
+            counts = lambda metadata: metadata is not None
+        )
 
-                if dir_path.text.startswith(("Movies",)):
-                    item_type = MetadataType.SINGLE
-                    item_year = search_result_item.string[-5:-1]
-                    item_name = search_result_item.string[:-6]
-                    break
+        try:
 
-                elif dir_path.text.startswith(("TV", "TV Shows")):
-                    item_type = MetadataType.MULTI
-                    item_name = search_result_item.string
-                    break
+            for metadata in classified_results:
 
-            if item_type is None:
-                continue
+                if metadata is not None:
+                    yield metadata
 
-            index =+ 1
+        finally:
+            classified_results.close()
 
+    def __search_index(self, query: str, limit: int) -> Iterable[Metadata]:
+        for title in self.index.search(query, limit):
             yield Metadata(
-                id=item_url.strip("/"),
-                title=item_name,
-                type=item_type,
-                year=item_year,
+                id=title.path,
+                title=title.title,
+                type=title.type,
+                year=title.year,
             )
 
+    def __classify_search_result_fast(self, search_result_item: DirectoryEntry) -> Optional[Metadata]:
+        metadata = classify_from_name(search_result_item)
+
+        if metadata is None:
+            self.logger.debug(f"Can't tell what '{search_result_item.name}' is from its name, fetching its page...")
+            return self.__classify_search_result(search_result_item)
+
+        return metadata
+
+    def __classify_search_result(self, search_result_item: DirectoryEntry) -> Optional[Metadata]:
+        return classify_search_result(search_result_item, self.__get_directory(search_result_item.href))
+
     def scrape_episodes(self, metadata: Metadata):
-        seasons_html = self.http_client.get(f"{self.base_url}/{metadata.id}")
-        seasons_soup = self.soup(seasons_html)
+        if self.index is not None:
+            indexed_seasons = self.index.season_episode_counts(metadata.id)
+
+            if indexed_seasons:
+                return indexed_seasons
+
+        series_directory = self.__get_directory(metadata.id)
         season_dirs = [
             dir
-            for dir in seasons_soup.find_all("a", {"class": "directory-entry"})
-            if "Season" in dir.string
+            for dir in series_directory.directories
+            if "Season" in dir.name
         ]
+
+        season_directories = ordered_map(
+            lambda season: self.__get_directory(season.href),
+            season_dirs,
+            workers = get_int_option(self.options, "workers", 8)
+        )
+
+        # Counted with the same rule scrape() picks episodes by, so every episode listed can be played.
         result = {}
-        for i, season in enumerate(season_dirs):
-            season_html = self.http_client.get(self.base_url + season.get("href"))
-            season_soup = self.soup(season_html)
-            episodes_entries = [
-                episode
-                for episode in season_soup.find_all("a", {"class": "file-entry"})
-                if episode.string[-4:] not in [".srt", ".txt"]
-            ]
-            result[i + 1] = len(episodes_entries)
+        for i, season_directory in enumerate(season_directories):
+            result[i + 1] = len(season_episodes(season_directory))
         return result
 
+    def __get_directory(self, path: str) -> Directory:
+        """Returns the parsed directory page at that path, only downloading it the first time it's asked for."""
+        key = path.strip("/")
+
+        with self.__directories_lock:
+            directory = self.__directories.get(key)
+
+        if directory is None:
+            # Concurrent callers (scrape_episodes and a prefetch for example, even from
+            # another scraper instance) wait on the one download and parse instead of repeating it.
+            directory = SingleFlight.default().do(
+                "vadapav.directory", (self.base_url, key), lambda: self.__download_directory(path, key)
+            )
+
+            with self.__directories_lock:
+                self.__directories[key] = directory
+
+        return directory
+
+    def __download_directory(self, path: str, key: str) -> Directory:
+        directory_html = self.http_client.get(f"{self.base_url}/{path.lstrip('/')}")
+        return parse_directory_html(key, directory_html.text, self.soup)
+
+    def __scrape_index(self, metadata: Metadata, episode: utils.EpisodeSelector) -> Optional[Multi | Single]:
+        if metadata.type == MetadataType.SINGLE:
+            title = self.index.get_title(metadata.id)
+
+            if title is None or title.file_href is None:
+                return None
+
+            return Single(
+                self.base_url + title.file_href,
+                title=metadata.title,
+                referrer=self.base_url,
+                year=metadata.year,
+                subtitles={"en": self.base_url + title.subtitle_href} if title.subtitle_href else None,
+            )
+
+        episode_file = self.index.episode_files(metadata.id).get((int(episode.season), int(episode.episode)))
+
+        if episode_file is None:
+            return None
+
+        return Multi(
+            self.base_url + episode_file[0],
+            title=metadata.title,
+            referrer=self.base_url,
+            episode=episode,
+            subtitles=None,
+        )
+
     def extract_resolution(self, filename):
         # Regular expression to extract resolution information
         match = re.search(r"(\d+)p|4K", filename)
@@ -105,26 +204,27 @@ class VadapavScraper(Scraper):
         else:
             return 0  # Default to 0 if resolution is not found
 
+    @cached_stream(ttl = 7 * 24 * 60 * 60) # Vadapav paths are stable so these can live for a long time.
     def scrape(self, metadata: Metadata, episode: utils.EpisodeSelector) -> Multi | Single:
 
+        if self.index is not None:
+            indexed_media = self.__scrape_index(metadata, episode)
+
+            if indexed_media is not None:
+                return indexed_media
+
         if metadata.type == MetadataType.SINGLE:
-            mov_dir_html = self.http_client.get(f"{self.base_url}/{metadata.id}")
-            movie_soup = self.soup(mov_dir_html)
-            mov_files = [
-                x
-                for x in movie_soup.find_all("a", {"class": "file-entry"})
-                if x.string[-4:] not in [".srt", ".txt"]
-            ]
+            movie_directory = self.__get_directory(metadata.id)
+            mov_files = video_files(movie_directory)
 
-            subtitles = [
-                x
-                for x in movie_soup.find_all("a", {"class": "file-entry"})
-                if x.string[-4:] == ".srt"
-            ]
+            if not mov_files:
+                return None
+
+            subtitles = movie_directory.files_with(".srt")
             subtitle_url = (
                 {
                     "en": self.base_url
-                    + (subtitles[0].get("data-href") or subtitles[0].get("href"))
+                    + subtitles[0].href
                 }
                 if subtitles
                 else None
@@ -134,13 +234,26 @@ class VadapavScraper(Scraper):
             # Starting with a resolution that's lower than any possible resolution
             movie_url, max_resolution = "", -1
             for mov_file in mov_files:
-                resolution = self.extract_resolution(mov_file.string)
+                resolution = self.extract_resolution(mov_file.name)
                 if resolution > max_resolution:
                     max_resolution = resolution
-                    movie_url = mov_file.get("data-href") or mov_file.get("href")
+                    movie_url = mov_file.href
 
             series_url = self.base_url + movie_url
 
+            if len(mov_files) > 1 and get_bool_option(self.options, "probe", False):
+                # ...unless the connection to it can't keep up, then the best one that can.
+                resolutions = {self.base_url + mov_file.href: self.extract_resolution(mov_file.name) for mov_file in mov_files}
+
+                series_url = pick_variant(
+                    self.http_client,
+                    sorted(resolutions, key = resolutions.get, reverse = True),
+                    headers = {"Referer": self.base_url},
+                    budget = get_int_option(self.options, "probe_budget", 3),
+                    preference = resolutions.get,
+                    required_throughput = lambda resolution: REQUIRED_THROUGHPUT.get(resolution, 0)
+                )
+
             return Single(
                 series_url,
                 title=metadata.title,
@@ -152,42 +265,183 @@ class VadapavScraper(Scraper):
         season_no = int(episode.season)
         episode_no = int(episode.episode)
 
-        season_str = "S" + str(season_no) if season_no > 9 else "S0" + str(season_no)
-        season_dir_name = (
-            "Season " + str(season_no) if season_no > 9 else "Season 0" + str(season_no)
-        )
-        episode_str = (
-            "E" + str(episode_no) if episode_no > 9 else "E0" + str(episode_no)
-        )
+        episode_map = self.__episode_map(metadata.id, season_no)
+        episode_file = episode_map.get(episode_no)
 
-        series_dir_html = self.http_client.get(f"{self.base_url}/{metadata.id}")
-        series_soup = self.soup(series_dir_html)
-        season_directories = series_soup.find_all("a", {"class": "directory-entry"})[1:]
+        # Opt-in. Not called "prefetch" as aggregate and adaptive pass the same options 
+        # to every provider and bflix already reads that one as a count.
+        if get_bool_option(self.options, "prefetch_next_season", False) and episode_no + 1 not in episode_map:
+            # The next episode is in the next season, get its directory ready before it's asked for.
+            prefetch = prefetch_executor.submit(self.__episode_map, metadata.id, season_no + 1)
+            prefetch.add_done_callback(self.__log_prefetch_failure)
 
-        for season_dir in season_directories:
-            if season_dir.string == season_dir_name:
-                season_dir_html = self.http_client.get(
-                    self.base_url + season_dir.get("href")
-                )
-                season_soup = self.soup(season_dir_html)
-                episode_files = [
-                    file_entry
-                    for file_entry in season_soup.find_all("a", {"class": "file-entry"})
-                    if file_entry.string[-4:] != ".srt"
-                ]
-                break
-
-        for episode_file in episode_files:
-            if season_str + episode_str in episode_file.string.upper():
-                episode_url = self.base_url + (
-                    episode_file.get("data-href") or episode_file.get("href")
-                )
-                break
+        if episode_file is None:
+            return None
 
         return Multi(
-            episode_url,
+            self.base_url + episode_file[0],
             title=metadata.title,
             referrer=self.base_url,
             episode=episode,
-            subtitles=None,
+            subtitles={"en": self.base_url + episode_file[1]} if episode_file[1] else None,
         )
+
+    def scrape_season(
+        self, 
+        metadata: Metadata, 
+        season: int = 1, 
+        episodes: Optional[Iterable[utils.EpisodeSelector]] = None
+    ) -> Iterator[Multi]:
+        """
+        Resolves every episode of ``season`` (or just ``episodes``, which may span seasons) in one go, 
+        yielding each ``Multi`` as soon as its season is known. Each directory is only fetched once.
+        """
+        # Season number -> the episode numbers wanted from it, None for all of them.
+        wanted: Dict[int, Optional[List[int]]] = {}
+
+        if episodes is None:
+            wanted[int(season)] = None
+        else:
+
+            for episode in episodes:
+                wanted.setdefault(int(episode.season), []).append(int(episode.episode))
+
+        def resolve_season(season_no: int) -> List[Multi]:
+            episode_files = self.index.episode_files(metadata.id) if self.index is not None else {}
+            files = {episode_no: file for (season, episode_no), file in episode_files.items() if season == season_no}
+
+            if not files:
+
+                try:
+                    files = self.__episode_map(metadata.id, season_no)
+                except Exception as e:
+                    self.logger.warning(f"Failed to get the episodes of season {season_no} of '{metadata.title}': {e}")
+                    return []
+
+            episode_numbers = wanted[season_no] or sorted(files)
+
+            return [
+                Multi(
+                    self.base_url + files[episode_no][0],
+                    title=metadata.title,
+                    referrer=self.base_url,
+                    episode=utils.EpisodeSelector(episode_no, season_no),
+                    subtitles={"en": self.base_url + files[episode_no][1]} if files[episode_no][1] else None,
+                )
+                for episode_no in episode_numbers if episode_no in files
+            ]
+
+        for multis in unordered_map(resolve_season, wanted, workers = get_int_option(self.options, "workers", 8)):
+            yield from multis
+
+    def __log_prefetch_failure(self, prefetch: Future) -> None:
+        if not prefetch.cancelled() and prefetch.exception() is not None:
+            self.logger.debug(f"Prefetching the next season failed, it'll be fetched when it's asked for. Error: {prefetch.exception()}")
+
+    def __episode_map(self, series_id: str, season_no: int) -> Dict[int, Tuple[str, Optional[str]]]:
+        key = (series_id.strip("/"), season_no)
+
+        with self.__directories_lock:
+            episode_map = self.__episode_maps.get(key)
+
+        if episode_map is None:
+            season_directory = self.__get_season_directory(series_id, season_no)
+            episode_map = season_episodes(season_directory) if season_directory is not None else {}
+
+            with self.__directories_lock:
+                self.__episode_maps[key] = episode_map
+
+        return episode_map
+
+    def __get_season_directory(self, series_id: str, season_no: int) -> Optional[Directory]:
+        season_dir = season_directory_entry(self.__get_directory(series_id), season_no)
+
+        return None if season_dir is None else self.__get_directory(season_dir.href)
+
+def classify_search_result(search_result_item: DirectoryEntry, item_directory: Directory) -> Optional[Metadata]:
+    """Tells films and shows apart from the breadcrumb of the result's own directory page."""
+    item_url = search_result_item.href
+
+    item_type = None
+    item_name = None
+    item_year = None
+
+    for dir_path in item_directory.breadcrumb:
+
+        if dir_path.startswith(("Movies",)):
+            item_type = MetadataType.SINGLE
+            item_name = search_result_item.name.strip()
+
+            match = MOVIE_NAME_REGEX.match(item_name)
+
+            if match is not None:
+                item_name, item_year = match.group(1), match.group(2)
+
+            break
+
+        elif dir_path.startswith(("TV", "TV Shows")):
+            item_type = MetadataType.MULTI
+            item_name = search_result_item.name
+            break
+
+    if item_type is None:
+        return None
+
+    return Metadata(
+        id=item_url.strip("/"),
+        title=item_name,
+        type=item_type,
+        year=item_year,
+    )
+
+def classify_from_name(search_result_item: DirectoryEntry) -> Optional[Metadata]:
+    """
+    Classifies a result from its name and the directories its href is in, None if that's ambiguous. 
+    A name ending in a year isn't enough on its own, shows are named like that too (e.g. "Doctor Who (2005)").
+    """
+    name = search_result_item.name.strip()
+    item_type = type_from_path(search_result_item.href)
+
+    if item_type is None and TV_NAME_REGEX.search(name):
+        item_type = MetadataType.MULTI
+
+    if item_type is None:
+        return None
+
+    item_name, item_year = name, None
+
+    if item_type == MetadataType.SINGLE:
+        match = MOVIE_NAME_REGEX.match(name)
+
+        if match is not None:
+            item_name, item_year = match.group(1), match.group(2)
+
+    return Metadata(
+        id=search_result_item.href.strip("/"),
+        title=item_name,
+        type=item_type,
+        year=item_year,
+    )
+
+def type_from_path(href: str) -> Optional[MetadataType]:
+    """Whether that href is under the films or the shows (same names as the breadcrumb), None if its path doesn't say."""
+    for segment in unquote(href).strip("/").split("/")[:-1]:
+
+        if segment.startswith("Movies"):
+            return MetadataType.SINGLE
+
+        elif segment.startswith(("TV", "TV Shows")):
+            return MetadataType.MULTI
+
+    return None
+
+def season_directory_entry(series_directory: Directory, season_no: int) -> Optional[DirectoryEntry]:
+    season_dir_name = (
+        "Season " + str(season_no) if season_no > 9 else "Season 0" + str(season_no)
+    )
+
+    for season_dir in series_directory.directories[1:]:
+        if season_dir.name == season_dir_name:
+            return season_dir
+
+    return None
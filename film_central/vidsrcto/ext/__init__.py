@@ -1 +1,3 @@
-from .vidplay import *
\ No newline at end of file
+from .rc4 import *
+from .keys import *
+from .vidplay import *
@@ -0,0 +1,184 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Dict, Optional, Tuple
+
+    from mov_cli.http_client import HTTPClient
+
+import re
+import json
+import time
+import threading
+from concurrent.futures import Future
+
+from devgoldyutils import LoggerAdapter
+from mov_cli.logger import mov_cli_logger
+
+__all__ = (
+    "KeyStore",
+    "KEY_STORE",
+    "FutokenStore",
+    "FUTOKEN_STORE",
+)
+
+KEY_URL = "https://github.com/JDALab/vidkey-js/blob/main/keys.json"
+
+logger = LoggerAdapter(mov_cli_logger, prefix = "KeyStore")
+
+class KeyStore():
+    """
+    Holds the two RC4 keys VidPlay ids are encoded with.
+
+    The keys are fetched once and then reused by every ``VidPlay`` in the process until 
+    ``ttl`` runs out. Once an entry is past ``refresh_after`` it's still served but a 
+    background refresh is kicked off, so resolving a stream never waits on the key fetch 
+    unless we have no keys at all (or they've been invalidated).
+    """
+    def __init__(self, key_url: str, ttl: float = 6 * 60 * 60, refresh_after: float = 4 * 60 * 60) -> None:
+        self.key_url = key_url
+        self.ttl = ttl
+        self.refresh_after = refresh_after
+
+        self.__keys: Optional[Tuple[str, str]] = None
+        self.__fetched_at = 0.0
+
+        self.__lock = threading.Lock()
+        self.__refreshing = False
+
+    def get(self, http_client: HTTPClient) -> Tuple[str, str]:
+        age = time.time() - self.__fetched_at
+        keys = self.__keys
+
+        if keys is not None and age < self.ttl:
+
+            if age >= self.refresh_after:
+                self.__refresh_in_background(http_client)
+
+            return keys
+
+        with self.__lock:
+            # Someone else may have fetched the keys while we were waiting on the lock.
+            if self.__keys is not None and time.time() - self.__fetched_at < self.ttl:
+                return self.__keys
+
+            return self.__fetch(http_client)
+
+    @property
+    def age(self) -> float:
+        """Seconds since the keys were last fetched."""
+        return time.time() - self.__fetched_at
+
+    def invalidate(self) -> None:
+        """Throws away the keys, e.g. because the site rejected a request made with them."""
+        logger.debug("Invalidating the vidplay keys...")
+
+        with self.__lock:
+            self.__keys = None
+            self.__fetched_at = 0.0
+
+    def __fetch(self, http_client: HTTPClient) -> Tuple[str, str]:
+        logger.debug("Fetching vidplay keys...")
+
+        response = http_client.get(self.key_url)
+
+        matches = re.search(r"\"rawLines\":\s*\[\"(.+)\"\]", response.text)
+
+        key1, key2 = json.loads(matches.group(1).replace("\\", ""))
+
+        self.__keys = (key1, key2)
+        self.__fetched_at = time.time()
+
+        return self.__keys
+
+    def __refresh_in_background(self, http_client: HTTPClient) -> None:
+        with self.__lock:
+
+            if self.__refreshing:
+                return
+
+            self.__refreshing = True
+
+        def refresh() -> None:
+            try:
+
+                with self.__lock:
+                    self.__fetch(http_client)
+
+            except Exception as e:
+                logger.debug(f"Background refresh of the vidplay keys failed, we'll keep the old ones. Error: {e}")
+
+            finally:
+                self.__refreshing = False
+
+        threading.Thread(target = refresh, daemon = True).start()
+
+KEY_STORE = KeyStore(KEY_URL)
+
+class FutokenStore():
+    """
+    Caches the ``k`` value served at ``{provider}/futoken`` per provider host.
+
+    It's the same for every video on a host until it rotates so there's no reason to refetch it 
+    per stream. Concurrent callers for the same host share a single in-flight fetch, 
+    which is what lets ``VidPlay`` start the fetch early and pick the result up later.
+    """
+    def __init__(self, ttl: float = 10 * 60) -> None:
+        self.ttl = ttl
+
+        self.__keys: Dict[str, Tuple[str, float]] = {}
+        self.__in_flight: Dict[str, Future] = {}
+        self.__lock = threading.Lock()
+
+    def get(self, http_client: HTTPClient, provider_url: str, referer: str) -> str:
+        """Returns the ``k`` of ``provider_url``, fetching it with ``referer`` (the embed it's for) if we don't have it."""
+        with self.__lock:
+            cached = self.__keys.get(provider_url)
+
+            if cached is not None and time.time() - cached[1] < self.ttl:
+                return cached[0]
+
+            future = self.__in_flight.get(provider_url)
+            fetch_it_ourselves = future is None
+
+            if fetch_it_ourselves:
+                future = Future()
+                self.__in_flight[provider_url] = future
+
+        if not fetch_it_ourselves:
+            return future.result()
+
+        try:
+            fu_key = self.__fetch(http_client, provider_url, referer)
+
+            with self.__lock:
+                self.__keys[provider_url] = (fu_key, time.time())
+
+            future.set_result(fu_key)
+            return fu_key
+
+        except Exception as e:
+            future.set_exception(e)
+            raise
+
+        finally:
+            with self.__lock:
+                self.__in_flight.pop(provider_url, None)
+
+    def age(self, provider_url: str) -> float:
+        """Seconds since the ``k`` of that host was fetched (infinite if we don't have it)."""
+        cached = self.__keys.get(provider_url)
+        return float("inf") if cached is None else time.time() - cached[1]
+
+    def invalidate(self, provider_url: str) -> None:
+        with self.__lock:
+            self.__keys.pop(provider_url, None)
+
+    def __fetch(self, http_client: HTTPClient, provider_url: str, referer: str) -> str:
+        logger.debug(f"Fetching futoken from '{provider_url}'...")
+
+        response = http_client.get(f"{provider_url}/futoken", {"Referer": referer})
+
+        return re.search(r"var\s+k\s*=\s*'([^']+)'", response.text).group(1)
+
+FUTOKEN_STORE = FutokenStore()
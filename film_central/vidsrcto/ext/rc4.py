@@ -0,0 +1,117 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Union
+
+    BytesLike = Union[bytes, bytearray, memoryview, str]
+
+import threading
+from functools import lru_cache
+
+from mov_cli.errors import MovCliException
+
+__all__ = (
+    "RC4",
+    "rc4_decode",
+    "RC4DecodeFailure",
+)
+
+# Keystreams are cached up to this many bytes per key, anything 
+# longer gets the cached prefix plus a freshly generated tail.
+MAX_CACHED_KEYSTREAM = 1024 * 1024
+
+class RC4():
+    """
+    RC4 with the key schedule done once per key and the keystream cached and grown on demand.
+
+    RC4 always XORs the data against the same keystream for a given key, so for the 
+    fixed keys vidsrc.to and vidplay use we only ever generate each keystream byte once 
+    and the per call work is a single big int XOR.
+    """
+    def __init__(self, key: bytes) -> None:
+        s = list(range(256))
+        j = 0
+
+        for i in range(256):
+            j = (j + s[i] + key[i % len(key)]) & 0xff
+            s[i], s[j] = s[j], s[i]
+
+        self.__s = s
+        self.__i = 0
+        self.__j = 0
+
+        self.__keystream = bytearray()
+        self.__lock = threading.Lock()
+
+    def keystream(self, length: int) -> bytes:
+        """Returns the first ``length`` bytes of the keystream."""
+        if length > len(self.__keystream):
+
+            with self.__lock:
+
+                if length > len(self.__keystream):
+                    self.__extend_keystream(min(length, MAX_CACHED_KEYSTREAM) - len(self.__keystream))
+
+            if length > len(self.__keystream): # Bigger than we're willing to cache.
+                return bytes(self.__keystream) + self.__generate_tail(length)
+
+        return bytes(self.__keystream[:length])
+
+    def apply(self, data: BytesLike) -> bytearray:
+        """Encrypts or decrypts ``data`` (it's the same operation in RC4)."""
+        if isinstance(data, str):
+            try:
+                data = data.encode("latin-1")
+            except UnicodeEncodeError:
+                raise RC4DecodeFailure()
+
+        try:
+            view = memoryview(data)
+        except TypeError:
+            raise RC4DecodeFailure()
+
+        length = view.nbytes
+
+        if length == 0:
+            return bytearray()
+
+        decoded = int.from_bytes(view, "big") ^ int.from_bytes(self.keystream(length), "big")
+
+        return bytearray(decoded.to_bytes(length, "big"))
+
+    def __extend_keystream(self, length: int) -> None:
+        self.__keystream += self.__prga(self.__s, self.__i, self.__j, length, save_state = True)
+
+    def __generate_tail(self, length: int) -> bytes:
+        with self.__lock:
+            return bytes(self.__prga(list(self.__s), self.__i, self.__j, length - len(self.__keystream)))
+
+    def __prga(self, s: list, i: int, j: int, length: int, save_state: bool = False) -> bytearray:
+        output = bytearray(length)
+
+        for index in range(length):
+            i = (i + 1) & 0xff
+            j = (j + s[i]) & 0xff
+            s[i], s[j] = s[j], s[i]
+            output[index] = s[(s[i] + s[j]) & 0xff]
+
+        if save_state:
+            self.__i, self.__j = i, j
+
+        return output
+
+@lru_cache(maxsize = 32)
+def get_rc4(key: str) -> RC4:
+    return RC4(key.encode("utf-8"))
+
+def rc4_decode(key: str, data: BytesLike) -> bytearray:
+    """RC4 ``data`` with ``key`` reusing the cached key schedule and keystream of that key."""
+    return get_rc4(key).apply(data)
+
+class RC4DecodeFailure(MovCliException):
+    """Raised when failure on decoding RC4 data."""
+    def __init__(self) -> None:
+        super().__init__(
+            "Failed to decode RC4 Data."
+        )
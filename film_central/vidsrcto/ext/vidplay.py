@@ -7,47 +7,27 @@ if TYPE_CHECKING:
 
     from mov_cli.http_client import HTTPClient
 
-import re
 import base64
-import json
-from mov_cli.errors import MovCliException
+from concurrent.futures import ThreadPoolExecutor
+
+from ...utils import StepTimer, tracer
+from .rc4 import rc4_decode
+from .keys import KEY_STORE, FUTOKEN_STORE
 
 __all__ = (
     "VidPlay",
 )
 
+# Small shared pool the key and futoken fetches are started on ahead of time.
+prefetch_executor = ThreadPoolExecutor(max_workers = 4, thread_name_prefix = "vidplay-prefetch")
+
 class VidPlay():
     def __init__(self, http_client: HTTPClient) -> None:
-        self.KEY_URL : str = "https://github.com/JDALab/vidkey-js/blob/main/keys.json"
+        self.KEY_URL : str = KEY_STORE.key_url
         self.http_client = http_client
     
     def decode_data(self, key: str, data: Union[bytearray, str]) -> bytearray:
-        key_bytes = bytes(key, 'utf-8')
-        s = bytearray(range(256))
-        j = 0
-
-        for i in range(256):
-            j = (j + s[i] + key_bytes[i % len(key_bytes)]) & 0xff
-            s[i], s[j] = s[j], s[i]
-
-        decoded = bytearray(len(data))
-        i = 0
-        k = 0
-
-        for index in range(len(data)):
-            i = (i + 1) & 0xff
-            k = (k + s[i]) & 0xff
-            s[i], s[k] = s[k], s[i]
-            t = (s[i] + s[k]) & 0xff
-
-            if isinstance(data[index], str):
-                decoded[index] = ord(data[index]) ^ s[t]
-            elif isinstance(data[index], int):
-                decoded[index] = data[index] ^ s[t]
-            else:
-                raise RC4DecodeFailure("Unsupported data type in the input")
-
-        return decoded
+        return rc4_decode(key, data)
     
     def int_2_base(self, x: int, base: int) -> str:
         charset = "0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ+/"
@@ -77,46 +57,66 @@ class VidPlay():
         binary_data = base64.b64decode(standardized_input)
         return bytearray(binary_data)
 
+    def prefetch(self) -> None:
+        """
+        Starts fetching the keys in the background. They don't depend on the 
+        video being resolved, so they can overlap with the vidsrc.to source lookup.
+        """
+        prefetch_executor.submit(KEY_STORE.get, self.http_client)
+
     def get_futoken(self, key: str, url: str, provider_url: str) -> str:
-        req = self.http_client.get(f"{provider_url}/futoken", {"Referer": url})
-        fu_key = re.search(r"var\s+k\s*=\s*'([^']+)'", req.text).group(1)
+        fu_key = FUTOKEN_STORE.get(self.http_client, provider_url, url)
         
         return f"{fu_key},{','.join([str(ord(fu_key[i % len(fu_key)]) + ord(key[i])) for i in range(len(key))])}"
 
     def encode_id(self, v_id: str) -> str:
-        req = self.http_client.get(self.KEY_URL)
-        
-        matches = re.search(r"\"rawLines\":\s*\[\"(.+)\"\]", req.text)
+        key1, key2 = KEY_STORE.get(self.http_client)
 
-        key1, key2 = json.loads(matches.group(1).replace("\\", ""))
-        decoded_id = self.decode_data(key1, v_id)
-        encoded_result = self.decode_data(key2, decoded_id)
+        with tracer.span("vidplay.encode_id", "decode"):
+            decoded_id = self.decode_data(key1, v_id)
+            encoded_result = self.decode_data(key2, decoded_id)
         
         encoded_base64 = base64.b64encode(encoded_result)
         decoded_result = encoded_base64.decode("utf-8")
 
         return decoded_result.replace("/", "_")
     
-    def resolve_source(self, url: str, provider_url: str = "https://vidplay.online") -> Tuple[Optional[List], Optional[Dict]]:
+    def resolve_source(
+        self, 
+        url: str, 
+        provider_url: str = "https://vidplay.online", 
+        retry_on_stale_keys: bool = True, 
+        timer: Optional[StepTimer] = None
+    ) -> Tuple[Optional[List], Optional[Dict]]:
         url_data = url.split("?")
 
-        key = self.encode_id(url_data[0].split("/e/")[-1])
-        futoken = self.get_futoken(key, url, provider_url)
-        
-        req = self.http_client.get(f"{provider_url}/mediainfo/{futoken}?{url_data[1]}&autostart=true", headers={"Referer": url})
-        if req.status_code != 200:
-            return None, None
-
-        req_data = req.json()
-        if (req_data.get("result")) and isinstance(req_data.get("result"), dict):
-            sources = req_data.get("result").get("sources")
-            return [value.get("file") for value in sources]
+        if timer is None:
+            timer = StepTimer()
+
+        # The futoken is fetched with the embed as its referrer so it can't be started before now, 
+        # but it doesn't need the keys, so fetch it while they're being worked out.
+        prefetch_executor.submit(FUTOKEN_STORE.get, self.http_client, provider_url, url)
+
+        with timer.step("keys"):
+            key = self.encode_id(url_data[0].split("/e/")[-1])
+
+        with timer.step("futoken"):
+            futoken = self.get_futoken(key, url, provider_url)
         
-        return None, None
+        with timer.step("mediainfo"):
+            req = self.http_client.get(f"{provider_url}/mediainfo/{futoken}?{url_data[1]}&autostart=true", headers={"Referer": url})
+
+        if req.status_code == 200:
+            req_data = req.json()
+            if (req_data.get("result")) and isinstance(req_data.get("result"), dict):
+                sources = req_data.get("result").get("sources")
+                return [value.get("file") for value in sources]
+
+        # A rejected mediainfo request usually means the keys or futoken rotated under 
+        # us, so fetch fresh ones and try once more (unless they are fresh already).
+        if retry_on_stale_keys and (KEY_STORE.age > 60 or FUTOKEN_STORE.age(provider_url) > 60):
+            KEY_STORE.invalidate()
+            FUTOKEN_STORE.invalidate(provider_url)
+            return self.resolve_source(url, provider_url, retry_on_stale_keys = False, timer = timer)
 
-class RC4DecodeFailure(MovCliException):
-    """Raised when failure on decoding RC4 data."""
-    def __init__(self) -> None:
-        super().__init__(
-            "Failed to decode RC4 Data."
-        )
\ No newline at end of file
+        return None, None
@@ -2,7 +2,7 @@ from __future__ import annotations
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
-    from typing import Dict, Any, Literal, Generator, Optional
+    from typing import Dict, Any, Iterable, Iterator, Literal, Generator, Optional
 
     from httpx import Response
 
@@ -16,28 +16,46 @@ from mov_cli import Multi, Single, Metadata, MetadataType
 
 import base64
 from urllib.parse import unquote
-from .ext import VidPlay
+from .ext import VidPlay, rc4_decode
+from ..utils import StepTimer, DiskStore, cached_stream, get_cache_directory, get_bool_option, get_int_option, ordered_map, unordered_map, pick_variant, tracer, wrap_http_client
 from mov_cli.utils.scraper import TheMovieDB
 
 __all__ = ("VidSrcToScraper", )
 
+# How long an embed that 404'd is assumed to still be missing.
+MISSING_EMBED_TTL = 24 * 60 * 60
+
 
 class VidSrcToScraper(Scraper):
     def __init__(self, config: Config, http_client: HTTPClient, options: Optional[ScraperOptionsT] = None) -> None:
+        http_client = wrap_http_client(http_client, options or {})
+
         self.base_url = "https://vidsrc.to"
         self.sources = self.base_url + "/ajax/embed/episode/{}/sources"
         self.source = self.base_url + "/ajax/embed/source/{}"
-        self.tmdb = TheMovieDB(http_client)
+        self.tmdb = TheMovieDB(http_client) # Its responses are kept by the http cache.
         self.referrer = "https://vid2v11.site"
+        self.vidplay = VidPlay(http_client)
+
+        # Negative cache of embed urls vidsrc.to doesn't have, shared between runs.
+        self.missing_embeds = DiskStore.open(
+            get_cache_directory().joinpath("vidsrcto-missing.sqlite3")
+        ) if get_bool_option(options or {}, "cache", True) else None
 
         super().__init__(config, http_client, options)
 
     def search(self, query: str, limit: int = 20) -> Generator[Metadata, Any, None]:
+        # Probing is one request per result so we run them in parallel, results 
+        # still come back in the order TMDB ranked them.
+        probed_results = ordered_map(
+            lambda search_result: (search_result, self.__is_available(search_result)),
+            self.tmdb.search(query, limit),
+            workers = get_int_option(self.options, "workers", 8)
+        )
 
-        for search_result in self.tmdb.search(query, limit):
-            embed_response = self.__get_embed(search_result, EpisodeSelector())
+        for search_result, available in probed_results:
 
-            if embed_response.status_code == 404: # don't include media that isn't available on the provider.
+            if not available: # don't include media that isn't available on the provider.
                 continue
 
             yield search_result
@@ -45,10 +63,18 @@ class VidSrcToScraper(Scraper):
     def scrape_episodes(self, metadata: Metadata) -> Dict[int, int] | Dict[None, Literal[1]]:
         return self.tmdb.scrape_episodes(metadata)
 
+    @cached_stream(ttl = 20 * 60) # Vidplay urls are signed and expire quickly.
     def scrape(self, metadata: Metadata, episode: EpisodeSelector) -> Optional[Multi | Single]:
-        embed_response = self.__get_embed(metadata, episode)
+        timer = StepTimer() # Per call, scrape_season() runs several of these at once.
+
+        # The keys don't depend on the video so get them going right away.
+        self.vidplay.prefetch()
 
-        soup = self.soup(embed_response)
+        with timer.step("embed"):
+            embed_response = self.__get_embed(metadata, episode)
+
+            with tracer.span("vidsrcto.embed", "parse"):
+                soup = self.soup(embed_response)
 
         id = soup.find('a', {'data-id': True})
 
@@ -57,7 +83,8 @@ class VidSrcToScraper(Scraper):
 
         id = id.get("data-id", None)
 
-        sources = self.http_client.get(self.sources.format(id)).json()
+        with timer.step("sources"):
+            sources = self.http_client.get(self.sources.format(id)).json()
 
         vidplay_id = None
 
@@ -68,13 +95,25 @@ class VidSrcToScraper(Scraper):
         if not vidplay_id:
             return None
 
-        get_source = self.http_client.get(self.source.format(vidplay_id)).json()["result"]["url"]
+        with timer.step("source"):
+            get_source = self.http_client.get(self.source.format(vidplay_id)).json()["result"]["url"]
+
+            vidplay_url = deobfuscate_source_url(get_source)
+
+        # A list of source files, or (None, None) if vidplay wouldn't give us any.
+        sources = [source for source in self.vidplay.resolve_source(vidplay_url, self.referrer, timer = timer) if source]
 
-        vidplay_url = self.__deobf(get_source)
+        url = None
 
-        vidplay = VidPlay(self.http_client)
+        if sources and get_bool_option(self.options, "probe", False):
+            # The sources are mirrors of the same video, start on whichever answers fastest.
+            with timer.step("probe"):
+                url = pick_variant(self.http_client, sources, headers = {"Referer": self.referrer}, budget = get_int_option(self.options, "probe_budget", 3))
 
-        url = vidplay.resolve_source(vidplay_url, self.referrer)[0]
+        elif sources:
+            url = sources[0]
+
+        self.logger.debug(f"Resolved '{metadata.title}' in {timer}")
 
         if url is None:
             return None
@@ -94,45 +133,78 @@ class VidSrcToScraper(Scraper):
             referrer = self.referrer
         )
 
+    def scrape_season(
+        self, 
+        metadata: Metadata, 
+        season: int = 1, 
+        episodes: Optional[Iterable[EpisodeSelector]] = None
+    ) -> Iterator[Multi]:
+        """
+        Resolves every episode of ``season`` (or just ``episodes``) a few at a time, yielding each 
+        ``Multi`` as soon as it's ready. Keys and futoken are fetched once and shared by all of them.
+        """
+        if episodes is None:
+            episode_count = self.scrape_episodes(metadata).get(int(season), 0)
+            episodes = [EpisodeSelector(episode, int(season)) for episode in range(1, episode_count + 1)]
+
+        self.vidplay.prefetch()
+
+        def resolve(episode: EpisodeSelector) -> Optional[Multi]:
+            try:
+                return self.scrape(metadata, episode)
+            except Exception as e:
+                self.logger.warning(f"Failed to resolve episode {episode.episode} of season {episode.season} of '{metadata.title}': {e}")
+                return None
+
+        # Kept lower than the search's probing as every episode is a chain of several requests.
+        for media in unordered_map(resolve, episodes, workers = get_int_option(self.options, "workers", 4)):
+
+            if media is not None:
+                yield media
+
     def __get_embed(self, metadata: Metadata, episode: EpisodeSelector) -> Response:
-        media_type = "tv" if metadata.type == MetadataType.MULTI else "movie"
+        return self.http_client.get(self.__embed_url(metadata, episode))
 
-        url = f"{self.base_url}/embed/{media_type}/{metadata.id}"
+    def __embed_url(self, metadata: Metadata, episode: EpisodeSelector) -> str:
+        return embed_url(self.base_url, metadata, episode)
 
-        if metadata.type == MetadataType.MULTI:
-            url += f"/{episode.season}/{episode.episode}"
+    def __is_available(self, metadata: Metadata) -> bool:
+        url = self.__embed_url(metadata, EpisodeSelector())
 
-        return self.http_client.get(url)
+        if self.missing_embeds is not None and self.missing_embeds.get(url) is not None:
+            return False
 
-    def __deobf(self, encoded_url: str) -> str | bool:
-        # This is based on https://github.com/Ciarands/vidsrc-to-resolver/blob/dffa45e726a4b944cb9af0c9e7630476c93c0213/vidsrc.py#L16
-        # Thanks to @Ciarands!
-        standardized_input = encoded_url.replace('_', '/').replace('-', '+')
-        binary_data = base64.b64decode(standardized_input)
+        # A HEAD is all we need to tell a 404 apart, we only fall 
+        # back to a full GET if the site refuses HEAD requests.
+        response = self.http_client.request("HEAD", url, include_default_headers = True)
+
+        if response.status_code in (405, 501):
+            response = self.http_client.get(url)
+
+        if response.status_code == 404:
 
-        key_bytes = bytes("WXrUARXb1aDLaZjI", 'utf-8')
-        s = bytearray(range(256))
-        j = 0
+            if self.missing_embeds is not None:
+                self.missing_embeds.set(url, b"", MISSING_EMBED_TTL)
 
-        for i in range(256):
-            j = (j + s[i] + key_bytes[i % len(key_bytes)]) & 0xff
-            s[i], s[j] = s[j], s[i]
+            return False
 
-        decoded = bytearray(len(binary_data))
-        i = 0
-        k = 0
+        return True
 
-        for index in range(len(binary_data)):
-            i = (i + 1) & 0xff
-            k = (k + s[i]) & 0xff
-            s[i], s[k] = s[k], s[i]
-            t = (s[i] + s[k]) & 0xff
+def embed_url(base_url: str, metadata: Metadata, episode: EpisodeSelector) -> str:
+    media_type = "tv" if metadata.type == MetadataType.MULTI else "movie"
 
-            if isinstance(binary_data[index], str):
-                decoded[index] = ord(binary_data[index]) ^ s[t]
-            elif isinstance(binary_data[index], int):
-                decoded[index] = binary_data[index] ^ s[t]
-            else:
-                decoded = False
+    url = f"{base_url}/embed/{media_type}/{metadata.id}"
+
+    if metadata.type == MetadataType.MULTI:
+        url += f"/{episode.season}/{episode.episode}"
+
+    return url
+
+def deobfuscate_source_url(encoded_url: str) -> str:
+    # This is based on https://github.com/Ciarands/vidsrc-to-resolver/blob/dffa45e726a4b944cb9af0c9e7630476c93c0213/vidsrc.py#L16
+    # Thanks to @Ciarands!
+    with tracer.span("vidsrcto.deobfuscate", "decode"):
+        standardized_input = encoded_url.replace('_', '/').replace('-', '+')
+        binary_data = base64.b64decode(standardized_input)
 
-        return unquote(decoded.decode("utf-8"))
\ No newline at end of file
+        return unquote(rc4_decode("WXrUARXb1aDLaZjI", binary_data).decode("utf-8"))
@@ -0,0 +1,86 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Callable, Dict, List, Optional, Tuple
+
+import os
+import tempfile
+import threading
+
+import httpx
+import pytest
+
+def pytest_configure(config):
+    # Anything that picks its cache path before the first fixture runs (e.g. during collection) still stays out of the real one.
+    home = tempfile.mkdtemp(prefix = "film-central-tests-")
+
+    os.environ["HOME"] = home
+    os.environ["XDG_CACHE_HOME"] = os.path.join(home, ".cache")
+
+@pytest.fixture(autouse = True)
+def isolated_cache_directory(tmp_path, monkeypatch):
+    """Keeps every on-disk cache the code under test opens out of the real user's cache directory."""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path.joinpath(".cache")))
+
+class FakeHTTPClient():
+    """
+    Stands in for mov-cli's ``HTTPClient``, answering every request with ``handler(method, url, headers)`` 
+    (a ``Response``, a status code or a body) and remembering what was asked for in ``requests``.
+    """
+    def __init__(self, handler: Callable[[str, str, Dict[str, str]], object]) -> None:
+        self.handler = handler
+        self.headers: Dict[str, str] = {}
+        self.requests: List[Tuple[str, str, Dict[str, str]]] = []
+
+        self.__lock = threading.Lock()
+
+    def request(
+        self, 
+        method: str, 
+        url: str, 
+        params: Optional[Dict[str, str]] = None, 
+        headers: Optional[Dict[str, str]] = None, 
+        include_default_headers: bool = False, 
+        redirect: bool = False, 
+        **kwargs
+    ) -> httpx.Response:
+        url = str(httpx.URL(url).copy_merge_params(params or {}))
+        headers = dict(headers or {})
+
+        with self.__lock:
+            self.requests.append((method.upper(), url, headers))
+
+        result = self.handler(method.upper(), url, headers)
+
+        if isinstance(result, Exception):
+            raise result
+
+        if isinstance(result, httpx.Response):
+            response = result
+        elif isinstance(result, int):
+            response = httpx.Response(result)
+        else:
+            response = httpx.Response(200, text = result)
+
+        response.request = httpx.Request(method.upper(), url)
+        return response
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None, **kwargs) -> httpx.Response:
+        return self.request("GET", url, headers = headers, **kwargs)
+
+@pytest.fixture
+def fake_http_client() -> Callable[..., FakeHTTPClient]:
+    return FakeHTTPClient
+
+def render_vadapav_page(breadcrumb: str, directories = (), files = ()) -> str:
+    entries = "".join(f'<div class="row"><a class="directory-entry" href="{href}">{name}</a></div>' for name, href in directories)
+    entries += "".join(f'<div class="row"><a class="file-entry" href="{href}" data-href="{href}">{name}</a></div>' for name, href in files)
+
+    return f'<html><body><div class="directory"><div><span>{breadcrumb}</span></div>{entries}</div></body></html>'
+
+@pytest.fixture
+def vadapav_page() -> Callable[..., str]:
+    """Renders a vadapav directory listing, ``directories`` and ``files`` are ``(name, href)`` pairs."""
+    return render_vadapav_page
@@ -0,0 +1,128 @@
+import json
+import time
+
+import pytest
+from mov_cli import Config, Metadata, MetadataType, Single
+from mov_cli.utils import EpisodeSelector
+
+from film_central.utils import DiskStore
+from film_central.aggregate import adaptive
+from film_central.aggregate import AdaptiveScraper, ProviderHealth, ProviderStats
+
+@pytest.fixture
+def health(tmp_path):
+    def health(*providers):
+        return ProviderHealth(DiskStore.open(tmp_path.joinpath("stats.sqlite3")), providers)
+
+    return health
+
+def test_unmeasured_providers_rank_as_the_median(health):
+    provider_health = health("fast", "new", "slow", "slower")
+
+    for name, latency in (("fast", 1.0), ("slow", 3.0), ("slower", 5.0)):
+        provider_health.record(name, latency, failed = False)
+
+    assert ProviderStats().score is None
+    assert provider_health.ranked() == ["fast", "new", "slow", "slower"]
+
+def test_unhealthy_providers_go_last(health):
+    provider_health = health("flaky", "steady")
+
+    for _ in range(5):
+        provider_health.record("flaky", 0.1, failed = True)
+
+    provider_health.record("steady", 2.0, failed = False)
+
+    assert provider_health.ranked() == ["steady", "flaky"]
+
+def test_stats_are_kept_between_runs(health):
+    health("a", "b").record("b", 0.5, failed = False)
+
+    assert health("a", "b").stats("b").latency == 0.5
+
+def test_only_searches_rank_but_failed_scrapes_make_providers_unhealthy(health):
+    provider_health = health("a", "b", "c")
+
+    for name, search_latency in (("a", 1.0), ("b", 2.0), ("c", 3.0)):
+        provider_health.record(name, search_latency, failed = False)
+
+    provider_health.record("a", 30.0, failed = False, kind = "scrape") # scrapes are always slower than searches.
+
+    for _ in range(5):
+        provider_health.record("b", 1.0, failed = True, kind = "scrape")
+
+    assert provider_health.ranked() == ["a", "c", "b"]
+    assert (provider_health.stats("a").latency, provider_health.stats("a", "scrape").latency) == (1.0, 30.0)
+
+def test_stats_saved_by_other_versions_still_load(tmp_path):
+    store = DiskStore.open(tmp_path.joinpath("stats.sqlite3"))
+    store.set("provider:a:search", json.dumps({"latency": 0.5, "p95": 0.9}).encode(), 60)
+    store.set("provider:b:search", b"[0.5]", 60)
+
+    provider_health = ProviderHealth(store, ["a", "b"])
+
+    assert provider_health.stats("a").latency == 0.5
+    assert provider_health.stats("b") == ProviderStats()
+
+class FakeProvider():
+    titles = []
+    fails = False
+
+    def __init__(self, config, http_client, options = None):
+        pass
+
+    def search(self, query, limit = None):
+        if self.fails:
+            raise ConnectionError("down")
+
+        for title in self.titles:
+            yield Metadata(id = f"{self.__class__.__name__}:{title}", title = title, type = MetadataType.SINGLE, year = "2000")
+
+    def scrape(self, metadata, episode):
+        assert metadata.id.startswith(self.__class__.__name__)
+        return Single(url = f"https://cdn/{metadata.id}.mp4", title = metadata.title)
+
+def provider(name, titles = (), fails = False):
+    return type(name, (FakeProvider,), {"titles": list(titles), "fails": fails})
+
+def test_search_falls_back_and_scrapes_with_the_provider_that_found_it(monkeypatch, fake_http_client):
+    monkeypatch.setattr(adaptive, "PROVIDERS", {"down": provider("down", fails = True), "up": provider("up", ["Film"])})
+    monkeypatch.setattr(AdaptiveScraper, "_AdaptiveScraper__probe_stale_providers", lambda self: None)
+
+    scraper = AdaptiveScraper(Config(), fake_http_client(lambda *_: 200), {"cache": False})
+    scraper.health.record("down", 0.1, failed = False) # measured as the fastest, so searched first.
+    scraper.health.record("up", 1.0, failed = False)
+
+    results = list(scraper.search("film", 10))
+
+    assert [metadata.id for metadata in results] == ["up:Film"]
+    assert scraper.scrape(results[0], EpisodeSelector()).url == "https://cdn/up:Film.mp4"
+    assert scraper.health.stats("down").error_rate > 0
+
+class CachedProvider(FakeProvider):
+    """Searches a page the http cache keeps, so every search but the first is answered from the cache."""
+    url = f"https://vadapav.mov/s/adaptive-{time.time_ns()}"
+
+    def __init__(self, config, http_client, options = None):
+        self.http_client = http_client
+
+    def search(self, query, limit = None):
+        self.http_client.get(self.url)
+        yield from super().search(query, limit)
+
+def test_searches_answered_by_the_cache_leave_the_latency_alone(monkeypatch, fake_http_client):
+    monkeypatch.setattr(adaptive, "PROVIDERS", {"cached": type("cached", (CachedProvider,), {"titles": ["Film"]})})
+    monkeypatch.setattr(AdaptiveScraper, "_AdaptiveScraper__probe_stale_providers", lambda self: None)
+
+    scraper = AdaptiveScraper(Config(), fake_http_client(lambda *_: "page"), {})
+
+    latencies = []
+
+    for _ in range(2):
+        assert [metadata.title for metadata in scraper.search("film", 10)] == ["Film"]
+        latencies.append(scraper.health.stats("cached").latency)
+
+    # Both searches count towards its health, only the first one (that went to the site) towards its latency.
+    assert scraper.health.stats("cached").samples == 2
+    assert latencies[0] is not None and latencies[0] == latencies[1]
+    assert scraper.cache.stats[("vadapav.mov", "hit")] >= 1
@@ -0,0 +1,99 @@
+import time
+
+import pytest
+from mov_cli import Config, Metadata, MetadataType, Single
+from mov_cli.utils import EpisodeSelector
+
+from film_central.aggregate import scraper as aggregate
+from film_central.aggregate import AggregateScraper
+
+class FakeProvider():
+    """Lists ``titles`` after ``delay`` seconds and scrapes them to ``stream`` (None means it has no working stream)."""
+    titles = []
+    delay = 0.0
+    stream = None
+
+    def __init__(self, config, http_client, options = None):
+        self.scraped = []
+
+    def search(self, query, limit = None):
+        time.sleep(self.delay)
+
+        for title in self.titles:
+            yield Metadata(id = f"{self.__class__.__name__}:{title}", title = title, type = MetadataType.SINGLE, year = "2000")
+
+    def scrape_episodes(self, metadata):
+        return {None: 1}
+
+    def scrape(self, metadata, episode):
+        assert metadata.id.startswith(self.__class__.__name__) # ids only mean something to their own provider.
+
+        if self.stream is None:
+            return None
+
+        return Single(url = self.stream, title = metadata.title)
+
+def provider(name, titles, delay = 0.0, stream = None):
+    return type(name, (FakeProvider,), {"titles": titles, "delay": delay, "stream": stream})
+
+@pytest.fixture
+def make_aggregate(monkeypatch, fake_http_client):
+    def make_aggregate(**providers):
+        monkeypatch.setattr(aggregate, "PROVIDERS", providers)
+
+        return AggregateScraper(Config(), fake_http_client(lambda *_: 200), {"validate": False, "cache": False})
+
+    return make_aggregate
+
+def test_results_are_merged_without_duplicates(make_aggregate):
+    scraper = make_aggregate(
+        fast = provider("fast", ["Film A", "Film B"]), slow = provider("slow", ["film a", "Film C"], delay = 0.05)
+    )
+
+    assert [metadata.title for metadata in scraper.search("film", 10)] == ["Film A", "Film B", "Film C"]
+
+def test_slower_copies_are_raced_even_after_the_limit(make_aggregate):
+    scraper = make_aggregate(
+        fast = provider("fast", ["Film A"], stream = None), # lists it first but has nothing playable.
+        slow = provider("slow", ["Film A"], delay = 0.05, stream = "https://cdn/slow.mp4"),
+    )
+
+    metadata, = scraper.search("film", 1)
+    time.sleep(0.2) # let the slow provider finish listing in the background.
+
+    assert metadata.provider == "fast"
+    assert scraper.scrape(metadata, EpisodeSelector()).url == "https://cdn/slow.mp4"
+
+def test_unknown_titles_go_to_the_provider_they_are_tagged_with(make_aggregate):
+    scraper = make_aggregate(
+        fast = provider("fast", [], stream = "https://cdn/fast.mp4"), slow = provider("slow", [], stream = "https://cdn/slow.mp4")
+    )
+
+    metadata = Metadata(id = "slow:Film Z", title = "Film Z", type = MetadataType.SINGLE, year = "2000")
+    metadata.provider = "slow"
+
+    assert scraper.scrape(metadata, EpisodeSelector()).url == "https://cdn/slow.mp4"
+
+def test_untagged_unknown_titles_are_tried_on_every_provider(make_aggregate):
+    scraper = make_aggregate(fast = provider("fast", []), slow = provider("slow", [], stream = "https://cdn/slow.mp4"))
+
+    metadata = Metadata(id = "slow:Film Z", title = "Film Z", type = MetadataType.SINGLE, year = "2000")
+
+    assert scraper.scrape(metadata, EpisodeSelector()).url == "https://cdn/slow.mp4"
+
+def test_titles_from_an_earlier_search_keep_their_copies(make_aggregate):
+    scraper = make_aggregate(
+        fast = provider("fast", ["Film A", "Film B"]), slow = provider("slow", ["Film A", "Film B"], delay = 0.05, stream = "https://cdn/slow.mp4")
+    )
+
+    first = list(scraper.search("film a", 10))
+    list(scraper.search("film b", 10))
+
+    assert scraper.scrape(first[0], EpisodeSelector()).url == "https://cdn/slow.mp4"
+
+def test_remakes_are_different_titles():
+    original = Metadata(id = "1", title = "Dune", type = MetadataType.SINGLE, year = "1984")
+    remake = Metadata(id = "2", title = "dune", type = MetadataType.SINGLE, year = "2021")
+
+    assert aggregate.title_key(original) != aggregate.title_key(remake)
+    assert aggregate.title_key(original) == aggregate.title_key(Metadata(id = "3", title = "Dune!", type = MetadataType.SINGLE, year = "1984 "))
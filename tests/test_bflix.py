@@ -0,0 +1,137 @@
+import os
+import sys
+import json
+import time
+import types
+import threading
+import subprocess
+
+import httpx
+from bs4 import BeautifulSoup
+from mov_cli import Config
+from mov_cli.media import Metadata, MetadataType, Single
+
+from film_central.bflix import BFlix
+from film_central.bflix.prefetch import Prefetcher
+from film_central.bflix import query_optimizer
+from film_central.bflix.query_optimizer import SeenTitles
+from film_central.bflix.scraper import parse_search_results
+
+def article(title: str, kind: str = "HD") -> str:
+    return (
+        '<article class="post dfx fcl movies more-infos">'
+        f'<div class="entry-title">{title}</div>'
+        '<div class="post-thumbnail"><img data-src="//img.example/w342/poster.jpg"></div>'
+        f'<span class="quality">{kind}</span><span class="year">2001</span>'
+        f'<ul><li class="fg1"><a class="btn" href="https://nites.nz/{title}">watch</a></li></ul>'
+        '</article>'
+    )
+
+def test_search_results_are_yielded_lazily(monkeypatch):
+    monkeypatch.setattr(query_optimizer, "_seen_titles", SeenTitles(save_delay = 60))
+
+    soup = BeautifulSoup(article("Alpha") + article("Beta", "TV-Show") + article("Gamma"), "html.parser")
+
+    results = parse_search_results(soup)
+
+    assert isinstance(results, types.GeneratorType)
+    assert [(metadata.title, metadata.image_url) for metadata in results] == [
+        ("Alpha", "https://img.example/w500/poster.jpg"), ("Gamma", "https://img.example/w500/poster.jpg")
+    ]
+
+def learned_titles(monkeypatch, *titles):
+    """Starts the query optimizer over from ``titles``, as if bflix had shown us them before."""
+    seen_titles = SeenTitles(save_delay = 60)
+    seen_titles.add(titles)
+
+    monkeypatch.setattr(query_optimizer, "_seen_titles", seen_titles)
+    monkeypatch.setattr(query_optimizer, "_query_index", None)
+
+def searched_for(http_client):
+    return [httpx.URL(url).params["s"] for _, url, _ in http_client.requests]
+
+def test_queries_are_searched_as_typed_first(monkeypatch, fake_http_client):
+    learned_titles(monkeypatch, "Hannibal Holocaust")
+    http_client = fake_http_client(lambda *_: article("Cannibal Holocaust"))
+
+    results = BFlix(Config(), http_client, {"cache": False}).search("Cannibal Holocaust")
+
+    assert [metadata.title for metadata in results] == ["Cannibal Holocaust"]
+    assert searched_for(http_client) == ["Cannibal Holocaust"]
+
+def test_typos_are_corrected_when_nothing_was_found(monkeypatch, fake_http_client):
+    learned_titles(monkeypatch, "Guardians of the Galaxy")
+    http_client = fake_http_client(lambda method, url, headers: article("Guardians of the Galaxy") if "Guardians" in url else "")
+
+    results = BFlix(Config(), http_client, {"cache": False}).search("Gaurdians of the Galaxy")
+
+    assert [metadata.title for metadata in results] == ["Guardians of the Galaxy"]
+    assert searched_for(http_client) == ["Gaurdians of the Galaxy", "Guardians of the Galaxy"]
+
+def test_importing_leaves_the_cache_directory_alone(tmp_path):
+    environment = dict(os.environ, HOME = str(tmp_path), XDG_CACHE_HOME = str(tmp_path.joinpath(".cache")))
+    subprocess.run([sys.executable, "-c", "import film_central.bflix.query_optimizer"], env = environment, check = True)
+
+    assert list(tmp_path.iterdir()) == []
+
+def test_seen_titles_are_written_in_batches():
+    seen_titles = SeenTitles(save_delay = 60)
+
+    assert seen_titles.add(["Alpha", "Beta"]) == ["Alpha", "Beta"]
+    assert seen_titles.add(["Beta", "Gamma"]) == ["Gamma"]
+    assert not seen_titles.path.exists()
+
+    seen_titles.save()
+
+    assert json.loads(seen_titles.path.read_text()) == ["Alpha", "Beta", "Gamma"]
+    assert SeenTitles().titles == ["Alpha", "Beta", "Gamma"]
+
+def test_seen_titles_save_on_their_own_after_the_delay():
+    seen_titles = SeenTitles(save_delay = 0.05)
+    seen_titles.add(["Alpha"])
+
+    deadline = time.monotonic() + 2
+
+    while not seen_titles.path.exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert json.loads(seen_titles.path.read_text()) == ["Alpha"]
+
+def metadata(id: str) -> Metadata:
+    return Metadata(id = id, title = id, type = MetadataType.SINGLE)
+
+def test_prefetched_results_are_taken_once():
+    prefetcher = Prefetcher(lambda metadata: Single(url = f"https://cdn/{metadata.id}.mp4", title = metadata.title))
+    prefetcher.submit(metadata("a"))
+
+    assert prefetcher.take(metadata("a")).url == "https://cdn/a.mp4"
+    assert prefetcher.take(metadata("a")) is None
+    assert prefetcher.take(metadata("b")) is None
+
+def test_new_search_cancels_queued_prefetches():
+    release = threading.Event()
+    resolved = []
+
+    def resolve(metadata):
+        release.wait(2)
+        resolved.append(metadata.id)
+        return Single(url = "https://cdn/x.mp4", title = metadata.title)
+
+    prefetcher = Prefetcher(resolve, workers = 1)
+    prefetcher.submit(metadata("running"))
+    prefetcher.submit(metadata("queued"))
+    prefetcher.new_search()
+    release.set()
+
+    assert prefetcher.take(metadata("queued")) is None
+    time.sleep(0.05)
+    assert "queued" not in resolved
+
+def test_failed_prefetches_fall_back_to_scraping():
+    def resolve(metadata):
+        raise ValueError("broken page")
+
+    prefetcher = Prefetcher(resolve)
+    prefetcher.submit(metadata("a"))
+
+    assert prefetcher.take(metadata("a")) is None
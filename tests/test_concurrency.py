@@ -0,0 +1,61 @@
+import time
+import threading
+
+from film_central.utils import ordered_map, unordered_map, race
+
+def test_ordered_map_keeps_the_order():
+    assert list(ordered_map(lambda x: (time.sleep(0.01 * (5 - x)), x)[1], range(5), workers = 5)) == [0, 1, 2, 3, 4]
+
+def test_ordered_map_stops_working_when_the_consumer_stops():
+    started = []
+    lock = threading.Lock()
+
+    def func(item):
+        with lock:
+            started.append(item)
+
+        return item
+
+    results = ordered_map(func, range(100), workers = 4)
+
+    assert [next(results) for _ in range(2)] == [0, 1]
+    results.close()
+
+    # What was in flight plus the window topped up for the two taken.
+    assert len(started) <= 4 + 2
+
+def test_ordered_map_only_starts_what_the_limit_can_use():
+    started = []
+    lock = threading.Lock()
+
+    def func(item):
+        with lock:
+            started.append(item)
+
+        return item if item % 2 == 0 else None # Only even items count.
+
+    for workers in (1, 8):
+        started.clear()
+
+        results = list(ordered_map(func, range(100), workers = workers, limit = 3, counts = lambda result: result is not None))
+
+        assert [result for result in results if result is not None] == [0, 2, 4]
+        assert sorted(started) == [0, 1, 2, 3, 4]
+
+def test_unordered_map_yields_the_fastest_first():
+    results = list(unordered_map(lambda x: (time.sleep(0.05 * x), x)[1], [3, 0, 1], workers = 3))
+
+    assert results == [0, 1, 3]
+
+def test_race_returns_the_first_accepted_result():
+    def slow():
+        time.sleep(0.2)
+        return "slow"
+
+    def broken():
+        raise ValueError("nope")
+
+    assert race([slow, broken, lambda: None, lambda: "fast"]) == "fast"
+    assert race([broken, lambda: None]) is None
+    assert race([lambda: 1, lambda: 2], accept = lambda result: result == 2) == 2
+    assert race([]) is None
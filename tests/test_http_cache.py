@@ -0,0 +1,112 @@
+import httpx
+
+from film_central.utils import DiskStore, HTTPCache, CachedHTTPClient
+
+def make_client(tmp_path, fake_http_client, handler, **cache_kwargs):
+    cache = HTTPCache(DiskStore(tmp_path.joinpath("http-cache.sqlite3")), **cache_kwargs)
+    inner = fake_http_client(handler)
+
+    return CachedHTTPClient(inner, cache), inner, cache
+
+def test_fresh_entries_are_served_without_a_request(tmp_path, fake_http_client):
+    client, inner, cache = make_client(tmp_path, fake_http_client, lambda *_: "listing", ttls = {"vadapav.mov": 60})
+
+    assert client.get("https://vadapav.mov/abc").text == "listing"
+    assert client.get("https://vadapav.mov/abc").text == "listing"
+
+    assert len(inner.requests) == 1
+    assert cache.stats[("vadapav.mov", "hit")] == 1
+
+def test_replayed_responses_have_elapsed(tmp_path, fake_http_client):
+    client, _, _ = make_client(tmp_path, fake_http_client, lambda *_: "listing", ttls = {"vadapav.mov": 60})
+
+    client.get("https://vadapav.mov/abc")
+
+    assert client.get("https://vadapav.mov/abc").elapsed.total_seconds() == 0
+
+def test_query_strings_split_entries(tmp_path, fake_http_client):
+    client, inner, _ = make_client(tmp_path, fake_http_client, lambda method, url, headers: url, ttls = {"api.themoviedb.org": 60})
+
+    for _ in range(2):
+        assert client.get("https://api.themoviedb.org/3/search/movie?query=alpha").text.endswith("query=alpha")
+        assert client.get("https://api.themoviedb.org/3/search/movie?query=beta").text.endswith("query=beta")
+        assert client.request("GET", "https://api.themoviedb.org/3/search/movie?query=beta", params = {"page": "2"}).text.endswith("query=beta&page=2")
+
+    assert len(inner.requests) == 3
+
+def test_hosts_without_a_ttl_are_not_cached(tmp_path, fake_http_client):
+    client, inner, _ = make_client(tmp_path, fake_http_client, lambda *_: "k", ttls = {"vadapav.mov": 60})
+
+    client.get("https://vidplay.online/futoken")
+    client.get("https://vidplay.online/futoken")
+
+    assert len(inner.requests) == 2
+
+def test_parent_domains_share_a_ttl(tmp_path):
+    cache = HTTPCache(DiskStore(tmp_path.joinpath("http-cache.sqlite3")), ttls = {"vadapav.mov": 60})
+
+    assert cache.ttl_for("www.vadapav.mov") == 60
+    assert cache.ttl_for("vadapav.com") == 0
+
+def test_uncacheable_paths_always_go_to_the_site(tmp_path, fake_http_client):
+    client, inner, _ = make_client(tmp_path, fake_http_client, lambda *_: "{}", ttls = {"vidsrc.to": 60})
+
+    client.get("https://vidsrc.to/ajax/embed/source/abc")
+    client.get("https://vidsrc.to/ajax/embed/source/abc")
+    client.get("https://vidsrc.to/embed/movie/1")
+    client.get("https://vidsrc.to/embed/movie/1")
+
+    assert [url for _, url, _ in inner.requests] == [
+        "https://vidsrc.to/ajax/embed/source/abc", "https://vidsrc.to/ajax/embed/source/abc", "https://vidsrc.to/embed/movie/1"
+    ]
+
+def test_key_headers_split_entries(tmp_path, fake_http_client):
+    client, inner, _ = make_client(
+        tmp_path, fake_http_client, lambda method, url, headers: headers.get("Referer", "none"), ttls = {"vadapav.mov": 60}
+    )
+
+    assert client.get("https://vadapav.mov/abc", headers = {"Referer": "https://a/"}).text == "https://a/"
+    assert client.get("https://vadapav.mov/abc", headers = {"Referer": "https://b/"}).text == "https://b/"
+    assert client.get("https://vadapav.mov/abc", headers = {"referer": "https://a/", "User-Agent": "x"}).text == "https://a/"
+
+    assert len(inner.requests) == 2
+
+def test_stale_entries_are_revalidated(tmp_path, fake_http_client):
+    def handler(method, url, headers):
+        if headers.get("If-None-Match") == "v1":
+            return 304
+
+        return httpx.Response(200, text = "listing", headers = {"ETag": "v1"})
+
+    client, inner, cache = make_client(tmp_path, fake_http_client, handler, ttls = {"vadapav.mov": 60})
+
+    client.get("https://vadapav.mov/abc")
+    cache.store.touch(cache.key_for(httpx.URL("https://vadapav.mov/abc")), -1) # expire it
+
+    assert client.get("https://vadapav.mov/abc").text == "listing"
+    assert inner.requests[-1][2]["If-None-Match"] == "v1"
+    assert cache.stats[("vadapav.mov", "revalidated")] == 1
+    assert cache.store.get(cache.key_for(httpx.URL("https://vadapav.mov/abc"))) is not None
+
+def test_max_age_shortens_the_ttl(tmp_path, fake_http_client):
+    client, inner, cache = make_client(
+        tmp_path, fake_http_client, lambda *_: httpx.Response(200, text = "x", headers = {"Cache-Control": "max-age=0"}), ttls = {"vadapav.mov": 60}
+    )
+
+    client.get("https://vadapav.mov/abc")
+    client.get("https://vadapav.mov/abc")
+
+    assert len(inner.requests) == 2
+
+def test_no_store_and_errors_are_not_stored(tmp_path, fake_http_client):
+    responses = {
+        "https://vadapav.mov/private": httpx.Response(200, text = "x", headers = {"Cache-Control": "no-store"}),
+        "https://vadapav.mov/broken": httpx.Response(500),
+    }
+    client, inner, _ = make_client(tmp_path, fake_http_client, lambda method, url, headers: responses[url], ttls = {"vadapav.mov": 60})
+
+    for _ in range(2):
+        client.get("https://vadapav.mov/private")
+        client.get("https://vadapav.mov/broken")
+
+    assert len(inner.requests) == 4
@@ -0,0 +1,35 @@
+import sys
+import subprocess
+
+from mov_cli.scraper import Scraper
+
+import film_central
+
+def imported_modules_after(code):
+    output = subprocess.run(
+        [sys.executable, "-c", code + "\nimport sys\nprint('\\n'.join(sys.modules))"], capture_output = True, text = True, check = True
+    ).stdout
+
+    return set(output.split())
+
+def test_importing_the_plugin_imports_no_scraper():
+    modules = imported_modules_after("import film_central")
+
+    assert not any(module.startswith(("film_central.bflix", "film_central.vadapav", "film_central.vidsrcto")) for module in modules)
+
+def test_the_default_scraper_only_imports_the_providers_it_uses():
+    modules = imported_modules_after("import film_central\nfilm_central.plugin['scrapers']['DEFAULT']")
+
+    assert "film_central.aggregate.adaptive" in modules
+    assert not any(module.startswith(("film_central.bflix", "film_central.vadapav", "film_central.vidsrcto")) for module in modules)
+
+def test_every_exported_scraper_resolves_and_is_listed_once():
+    assert len(set(film_central.SCRAPERS.values())) == len(film_central.SCRAPERS)
+
+    for name in film_central.SCRAPERS:
+        scraper = getattr(film_central, name)
+
+        assert issubclass(scraper, Scraper) and scraper.__name__ == name
+
+    for name, lazy_scraper in film_central.plugin["scrapers"].items():
+        assert issubclass(lazy_scraper.resolve(), Scraper), name
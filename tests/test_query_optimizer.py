@@ -0,0 +1,53 @@
+import pytest
+
+from film_central.bflix.query_optimizer import QueryIndex, compact, match_case, normalize
+
+@pytest.fixture
+def query_index() -> QueryIndex:
+    query_index = QueryIndex()
+    query_index.add_correction("Spider-Man", ["spiderman"])
+
+    for title in ("Ocean's Eleven", "Guardians of the Galaxy", "Aliens", "Amélie", "Iron Man"):
+        query_index.add_title(title)
+
+    return query_index
+
+def test_normalize_and_compact():
+    assert normalize("  Amélie: Spider-Man_2 ") == "amelie spider man 2"
+    assert compact("Spider Man") == compact("spider-man") == compact("SpiderMan") == "spiderman"
+
+def test_whole_query_corrections(query_index):
+    assert query_index.lookup("spider man") == "Spider-Man"
+    assert query_index.lookup("SPIDERMAN") == "Spider-Man"
+
+def test_only_misspelled_words_are_replaced(query_index):
+    assert query_index.lookup("Ocean's Elevn", fuzzy = True) == "Ocean's Eleven"
+    assert query_index.lookup("gaurdians of the GALAXY", fuzzy = True) == "guardians of the GALAXY"
+    assert query_index.lookup("Gaurdians: Vol. 2", fuzzy = True) == "Guardians: Vol. 2"
+
+def test_hyphenated_words_are_always_matched(query_index):
+    assert query_index.lookup("spiderman homecoming") == "spider-man homecoming"
+
+def test_compound_words_are_split_back_up(query_index):
+    assert query_index.lookup("ironman 3", fuzzy = True) == "iron man 3"
+    assert query_index.lookup("Ironman", fuzzy = True) == "Iron Man"
+
+def test_guesses_are_only_made_when_asked_for(query_index):
+    for title in ("Seven Universe", "Hannibal Holocaust", "Any One"):
+        query_index.add_title(title)
+
+    for query, guess in (("Steven Universe", "Seven Universe"), ("Cannibal Holocaust", "Hannibal Holocaust"), ("anyone", "any one")):
+        assert query_index.lookup(query) is None
+        assert query_index.lookup(query, fuzzy = True) == guess
+
+def test_known_and_unfixable_queries_are_left_alone(query_index):
+    assert query_index.lookup("Ocean's Eleven") is None
+    assert query_index.lookup("amelie") is None # accents don't make it a different word.
+    assert query_index.lookup("alien") is None # bflix already matches substrings of "aliens".
+    assert query_index.lookup("xyzzy 1999") is None
+    assert query_index.lookup("") is None
+
+def test_match_case():
+    assert match_case("spiderman", "spider-man") == "spider-man"
+    assert match_case("Spiderman", "spider-man") == "Spider-Man"
+    assert match_case("SPIDERMAN", "spider-man") == "SPIDER-MAN"
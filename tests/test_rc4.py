@@ -0,0 +1,62 @@
+import os
+
+import pytest
+
+from film_central.vidsrcto.ext import rc4
+from film_central.vidsrcto.ext.rc4 import RC4, RC4DecodeFailure, get_rc4, rc4_decode
+
+def reference_rc4(key: bytes, data: bytes) -> bytes:
+    s = list(range(256))
+    j = 0
+
+    for i in range(256):
+        j = (j + s[i] + key[i % len(key)]) & 0xff
+        s[i], s[j] = s[j], s[i]
+
+    i = j = 0
+    output = bytearray()
+
+    for byte in data:
+        i = (i + 1) & 0xff
+        j = (j + s[i]) & 0xff
+        s[i], s[j] = s[j], s[i]
+        output.append(byte ^ s[(s[i] + s[j]) & 0xff])
+
+    return bytes(output)
+
+def test_known_vector():
+    assert rc4_decode("Key", b"Plaintext").hex() == "bbf316e8d940af0ad3"
+
+def test_cached_keystream_gives_the_same_output_every_call():
+    data = os.urandom(300)
+    expected = reference_rc4(b"WXrUARXb1aDLaZjI", data)
+
+    # Short then long then short again, the keystream grows in between.
+    assert bytes(rc4_decode("WXrUARXb1aDLaZjI", data[:10])) == expected[:10]
+    assert bytes(rc4_decode("WXrUARXb1aDLaZjI", data)) == expected
+    assert bytes(rc4_decode("WXrUARXb1aDLaZjI", data[:10])) == expected[:10]
+
+def test_engines_are_shared_per_key():
+    assert get_rc4("a key") is get_rc4("a key")
+    assert get_rc4("a key") is not get_rc4("another key")
+
+def test_data_longer_than_the_cache_gets_a_generated_tail(monkeypatch):
+    monkeypatch.setattr(rc4, "MAX_CACHED_KEYSTREAM", 64)
+
+    engine = RC4(b"secret")
+    data = os.urandom(200)
+
+    assert bytes(engine.apply(data)) == reference_rc4(b"secret", data)
+    assert bytes(engine.apply(data[:50])) == reference_rc4(b"secret", data[:50])
+    assert bytes(engine.apply(data)) == reference_rc4(b"secret", data) # the tail didn't disturb the cached state.
+
+def test_strings_and_empty_data():
+    assert bytes(rc4_decode("Key", "Plaintext")) == bytes(rc4_decode("Key", b"Plaintext"))
+    assert rc4_decode("Key", b"") == bytearray()
+
+def test_undecodable_input_raises():
+    with pytest.raises(RC4DecodeFailure):
+        rc4_decode("Key", "not latin-1 ☃")
+
+    with pytest.raises(RC4DecodeFailure):
+        rc4_decode("Key", 12345)
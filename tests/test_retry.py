@@ -0,0 +1,120 @@
+import time
+import uuid
+import threading
+
+import httpx
+import pytest
+
+from film_central.utils import CircuitBreaker, HostUnavailable, RequestPolicy, RetryingHTTPClient
+
+FAST = RequestPolicy(retries = 2, backoff = 0, deadline = 5)
+
+def unique_host() -> str:
+    # Breakers are process wide, so every test gets hosts nobody else has touched.
+    return f"{uuid.uuid4().hex}.example"
+
+def test_retries_until_it_succeeds(fake_http_client):
+    host = unique_host()
+    statuses = iter([503, 502, 200])
+    inner = fake_http_client(lambda *_: next(statuses))
+
+    response = RetryingHTTPClient(inner, FAST, policies = {}).get(f"https://{host}/")
+
+    assert response.status_code == 200
+    assert len(inner.requests) == 3
+    assert CircuitBreaker.for_host(host).failures == 0
+
+def test_gives_up_with_the_real_error_and_counts_one_failure(fake_http_client):
+    host = unique_host()
+    inner = fake_http_client(lambda *_: httpx.ConnectError("refused"))
+
+    # More attempts than the breaker's threshold, the request itself must not trip it half way.
+    client = RetryingHTTPClient(inner, RequestPolicy(retries = 7, backoff = 0, deadline = 5), policies = {})
+
+    with pytest.raises(httpx.ConnectError):
+        client.get(f"https://{host}/")
+
+    assert len(inner.requests) == 8
+    assert CircuitBreaker.for_host(host).failures == 1
+
+def test_breaker_opens_after_enough_failed_requests(fake_http_client):
+    host = unique_host()
+    inner = fake_http_client(lambda *_: 503)
+    client = RetryingHTTPClient(inner, FAST, policies = {})
+
+    for _ in range(CircuitBreaker.for_host(host).failure_threshold):
+        assert client.get(f"https://{host}/").status_code == 503
+
+    requests_before = len(inner.requests)
+
+    with pytest.raises(HostUnavailable):
+        client.get(f"https://{host}/")
+
+    assert len(inner.requests) == requests_before
+
+def test_breaker_lets_one_request_through_after_the_reset_timeout():
+    breaker = CircuitBreaker(unique_host(), failure_threshold = 2, reset_timeout = 0.05)
+
+    breaker.record_failure()
+    breaker.before_request()
+    breaker.record_failure()
+
+    with pytest.raises(HostUnavailable):
+        breaker.before_request()
+
+    time.sleep(0.06)
+    breaker.before_request() # half open
+
+    with pytest.raises(HostUnavailable): # only the one probe gets through.
+        breaker.before_request()
+
+    breaker.record_success()
+    breaker.before_request()
+
+def test_only_idempotent_requests_are_retried(fake_http_client):
+    host = unique_host()
+    inner = fake_http_client(lambda *_: 503)
+    client = RetryingHTTPClient(inner, FAST, policies = {})
+
+    assert client.request("POST", f"https://{host}/").status_code == 503
+    assert len(inner.requests) == 1
+
+    assert client.request("HEAD", f"https://{host}/").status_code == 503
+    assert len(inner.requests) == 4
+
+def test_retries_option_overrides_host_policies(fake_http_client):
+    host = unique_host()
+    inner = fake_http_client(lambda *_: 503)
+    client = RetryingHTTPClient(
+        inner, FAST, policies = {host: RequestPolicy(retries = 5, backoff = 0)}, retries = 1
+    )
+
+    client.get(f"https://{host}/")
+
+    assert len(inner.requests) == 2
+    assert client.policy_for(host).deadline == FAST.deadline # the tighter deadline wins too.
+
+def test_hedged_request_takes_the_faster_answer(fake_http_client):
+    host = unique_host()
+    calls = []
+    lock = threading.Lock()
+
+    def handler(method, url, headers):
+        with lock:
+            calls.append(url)
+            first = len(calls) == 1
+
+        if first:
+            time.sleep(1)
+            return httpx.Response(200, text = "slow")
+
+        return httpx.Response(200, text = "fast")
+
+    policy = RequestPolicy(retries = 0, hedge = True, min_hedge_delay = 0.05, attempt_timeout = 0.15)
+    client = RetryingHTTPClient(fake_http_client(handler), policy, policies = {})
+
+    started_at = time.monotonic()
+    response = client.get(f"https://{host}/")
+
+    assert response.text == "fast"
+    assert time.monotonic() - started_at < 0.9
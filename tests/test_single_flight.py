@@ -0,0 +1,97 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from film_central.utils import SingleFlight, CoalescingHTTPClient
+
+def run_together(func, count = 8):
+    """Calls ``func`` from ``count`` threads at once and returns what each got (or raised)."""
+    barrier = threading.Barrier(count)
+
+    def call():
+        barrier.wait()
+
+        try:
+            return func()
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers = count) as executor:
+        return [future.result() for future in [executor.submit(call) for _ in range(count)]]
+
+def slow_handler(release, calls):
+    def handler(method, url, headers):
+        calls.append(url)
+        release.wait(5)
+        return "page"
+
+    return handler
+
+def test_concurrent_calls_share_one_run():
+    flights = SingleFlight()
+    release = threading.Event()
+    runs = []
+
+    def func():
+        runs.append(1)
+        release.wait(5)
+        return "result"
+
+    threading.Timer(0.1, release.set).start()
+
+    assert run_together(lambda: flights.do("test", "key", func)) == ["result"] * 8
+    assert len(runs) == 1
+    assert flights.saved("test") == 7 and flights.saved("other") == 0
+
+def test_exceptions_are_shared_and_nothing_is_kept():
+    flights = SingleFlight()
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise ValueError("broken")
+
+    threading.Timer(0.1, release.set).start()
+
+    assert all(isinstance(result, ValueError) for result in run_together(lambda: flights.do("test", "key", fail)))
+
+    # Once it's finished the next call runs again.
+    assert flights.do("test", "key", lambda: "fresh") == "fresh"
+    assert flights.stats[("test", "run")] == 2
+
+def test_identical_requests_in_flight_are_sent_once(fake_http_client):
+    release, calls = threading.Event(), []
+    http_client = CoalescingHTTPClient(fake_http_client(slow_handler(release, calls)), SingleFlight())
+
+    threading.Timer(0.1, release.set).start()
+
+    responses = run_together(lambda: http_client.get("https://vadapav.mov/page", headers = {"Referer": "https://vadapav.mov"}))
+
+    assert [response.text for response in responses] == ["page"] * 8
+    assert calls == ["https://vadapav.mov/page"]
+    assert http_client.flights.saved("vadapav.mov") == 7
+
+@pytest.mark.parametrize("vary", [
+    lambda client, i: client.get("https://vadapav.mov/page", headers = {"Referer": f"https://vadapav.mov/{i}"}),
+    lambda client, i: client.request("GET", "https://vadapav.mov/page", params = {"page": str(i)}),
+    lambda client, i: client.get(f"https://vadapav.mov/page?page={i}"),
+    lambda client, i: client.request("POST", "https://vadapav.mov/page", data = {"same": "body"}),
+])
+def test_different_or_unsafe_requests_are_not_coalesced(fake_http_client, vary):
+    release, calls = threading.Event(), []
+    http_client = CoalescingHTTPClient(fake_http_client(slow_handler(release, calls)), SingleFlight())
+    numbers = iter(range(8))
+    lock = threading.Lock()
+
+    def call():
+        with lock:
+            i = next(numbers)
+
+        return vary(http_client, i)
+
+    threading.Timer(0.1, release.set).start()
+    run_together(call)
+
+    assert len(calls) == 8
+    assert http_client.flights.saved() == 0
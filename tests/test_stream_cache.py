@@ -0,0 +1,109 @@
+import time
+import types
+
+from mov_cli import Metadata, MetadataType, Multi, Single
+from mov_cli.utils import EpisodeSelector
+
+from film_central.utils import CircuitBreaker, DiskStore, StreamCache, cached_stream, wrap_http_client
+
+def make_scraper(fake_http_client, head_status = 200, options = None):
+    """A scraper whose every scrape() resolves a new url, so we can tell cached streams apart."""
+    http_client = fake_http_client(lambda *_: head_status)
+
+    class Scraper():
+        def __init__(self):
+            self.options = {} if options is None else options
+            self.http_client = http_client
+            self.logger = types.SimpleNamespace(debug = lambda message: None)
+            self.scrapes = 0
+
+        @cached_stream(ttl = 60)
+        def scrape(self, metadata, episode):
+            self.scrapes += 1
+
+            if metadata.type == MetadataType.SINGLE:
+                return Single(f"https://cdn.test/{self.__class__.__name__}/{metadata.id}/{self.scrapes}.mp4", title = metadata.title, referrer = "https://site.test", year = "2000")
+
+            return Multi(f"https://cdn.test/{self.__class__.__name__}/{metadata.id}/{self.scrapes}.m3u8", title = metadata.title, referrer = "https://site.test", episode = episode)
+
+    # Entries are keyed by class name and the cache is shared by the whole test run.
+    Scraper.__name__ = f"Scraper{time.time_ns()}"
+
+    return Scraper(), http_client
+
+FILM = Metadata("film", "Film", MetadataType.SINGLE, year = "2000")
+SHOW = Metadata("show", "Show", MetadataType.MULTI)
+
+def test_streams_are_reused_once_checked(fake_http_client):
+    scraper, http_client = make_scraper(fake_http_client)
+
+    first = scraper.scrape(FILM, EpisodeSelector())
+    second = scraper.scrape(FILM, EpisodeSelector())
+
+    assert scraper.scrapes == 1
+    assert (second.url, second.referrer, second.year) == (first.url, first.referrer, first.year)
+    assert [(method, url) for method, url, _ in http_client.requests] == [("HEAD", first.url)]
+
+def test_episodes_are_cached_separately(fake_http_client):
+    scraper, _ = make_scraper(fake_http_client)
+
+    urls = [scraper.scrape(SHOW, EpisodeSelector(episode, 1)).url for episode in (1, 2, 1)]
+
+    assert scraper.scrapes == 2
+    assert urls[0] == urls[2] != urls[1]
+    assert scraper.scrape(SHOW, EpisodeSelector(2, 1)).episode.episode == 2
+
+def test_dead_streams_are_scraped_again(fake_http_client):
+    scraper, _ = make_scraper(fake_http_client, head_status = 404)
+
+    first = scraper.scrape(FILM, EpisodeSelector())
+    second = scraper.scrape(FILM, EpisodeSelector())
+
+    assert scraper.scrapes == 2 and first.url != second.url
+
+def test_hosts_without_head_are_trusted(fake_http_client):
+    scraper, _ = make_scraper(fake_http_client, head_status = 405)
+
+    scraper.scrape(FILM, EpisodeSelector())
+    scraper.scrape(FILM, EpisodeSelector())
+
+    assert scraper.scrapes == 1
+
+def test_cache_option_turns_it_off(fake_http_client):
+    scraper, http_client = make_scraper(fake_http_client, options = {"cache": False})
+
+    scraper.scrape(FILM, EpisodeSelector())
+    scraper.scrape(FILM, EpisodeSelector())
+
+    assert scraper.scrapes == 2 and http_client.requests == []
+
+def test_entries_expire(tmp_path):
+    cache = StreamCache(DiskStore.open(tmp_path.joinpath("streams.sqlite3")))
+    key = cache.key("Scraper", FILM, EpisodeSelector())
+
+    cache.set(key, Single("https://cdn.test/film.mp4", title = "Film", referrer = None, year = "2000"), ttl = 0.05)
+    assert cache.get(key, EpisodeSelector()).url == "https://cdn.test/film.mp4"
+
+    time.sleep(0.1)
+    assert cache.get(key, EpisodeSelector()) is None
+
+def test_validation_is_one_quick_request_past_retries_and_breakers(fake_http_client):
+    host = f"validation-{time.time_ns()}.test"
+    breaker = CircuitBreaker.for_host(host)
+
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+
+    for status, valid in ((200, True), (503, False)):
+        inner = fake_http_client(lambda *_, status = status: status)
+        media = Single(f"https://{host}/{status}.mp4", title = "Film", referrer = None, year = "2000")
+
+        assert StreamCache.is_still_valid(wrap_http_client(inner, {"cache": False}), media) is valid
+        assert len(inner.requests) == 1
+
+def test_streams_checked_moments_ago_are_not_checked_again(fake_http_client):
+    http_client = fake_http_client(lambda *_: 200)
+    media = Single(f"https://cdn.test/checked-{time.time_ns()}.mp4", title = "Film", referrer = None, year = "2000")
+
+    assert StreamCache.is_still_valid(http_client, media) and StreamCache.is_still_valid(http_client, media)
+    assert len(http_client.requests) == 1
@@ -0,0 +1,128 @@
+import json
+import asyncio
+
+import pytest
+
+from film_central.utils import JSONLinesSink, StatsSink, TraceSink, Tracer, TracingHTTPClient, tracer, url_template
+
+class ListSink(TraceSink):
+    def __init__(self):
+        self.spans = []
+
+    def emit(self, span):
+        self.spans.append(span)
+
+def test_no_sinks_means_no_spans():
+    assert not Tracer().enabled
+
+    with Tracer().span("nothing", "parse") as span:
+        span.set("ignored", True)
+
+def test_spans_nest_and_annotate_the_innermost():
+    sink = ListSink()
+    tracer = Tracer()
+    tracer.add_sink(sink)
+
+    with tracer.span("outer", "step"):
+        with tracer.span("inner", "parse", bytes = 10):
+            tracer.annotate("cache", "hit")
+
+        tracer.annotate("retries", 1)
+
+    inner, outer = sink.spans
+
+    assert (inner.name, inner.kind, inner.attributes) == ("inner", "parse", {"bytes": 10, "cache": "hit"})
+    assert (outer.name, outer.attributes) == ("outer", {"retries": 1})
+    assert outer.duration >= inner.duration
+
+def test_errors_are_recorded_on_the_span():
+    sink = ListSink()
+    tracer = Tracer()
+    tracer.add_sink(sink)
+
+    with pytest.raises(KeyError):
+        with tracer.span("broken", "decode"):
+            raise KeyError()
+
+    assert sink.spans[0].attributes["error"] == "KeyError"
+
+def test_unknown_kinds_are_rejected():
+    with pytest.raises(ValueError):
+        with Tracer().span("typo", "htpp"):
+            pass
+
+def test_sinks_must_implement_emit():
+    class Incomplete(TraceSink):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+def test_json_lines_sink_keeps_one_file_open(tmp_path):
+    path = tmp_path.joinpath("trace.jsonl")
+    sink = JSONLinesSink(path)
+    tracer = Tracer()
+    tracer.add_sink(sink)
+
+    for name in ("a", "b"):
+        with tracer.span(name, "step"):
+            pass
+
+    sink.close()
+
+    assert [json.loads(line)["name"] for line in path.read_text().splitlines()] == ["a", "b"]
+
+def test_stats_sink_summarises_by_kind_and_name():
+    sink = StatsSink()
+    tracer = Tracer()
+    tracer.add_sink(sink)
+
+    for _ in range(3):
+        with tracer.span("https://vidsrc.to/embed/movie/{}", "http"):
+            pass
+
+    assert sink.stats[("http", "https://vidsrc.to/embed/movie/{}")][0] == 3
+    assert "count=3" in sink.summary()
+
+def test_url_template():
+    assert url_template("https://vidsrc.to/embed/tv/1399/1/2?t=abc") == "https://vidsrc.to/embed/tv/{}/{}/{}?t={}"
+    assert url_template("https://vadapav.mov/s/benchmark") == "https://vadapav.mov/s/benchmark"
+
+def test_tracing_http_client_records_requests(fake_http_client):
+    sink = ListSink()
+    tracer.add_sink(sink)
+
+    try:
+        TracingHTTPClient(fake_http_client(lambda *_: "hello")).get("https://vidsrc.to/embed/movie/123?t=abc")
+    finally:
+        tracer.remove_sink(sink)
+
+    span, = sink.spans
+
+    assert (span.name, span.kind) == ("https://vidsrc.to/embed/movie/{}?t={}", "http")
+    assert span.attributes == {"method": "GET", "status": 200, "bytes": 5}
+
+def test_spans_of_concurrent_coroutines_have_their_own_parents():
+    sink = ListSink()
+    tracer = Tracer()
+    tracer.add_sink(sink)
+
+    async def task(name):
+        with tracer.span(name, "step"):
+            await asyncio.sleep(0.01)
+
+            with tracer.span(f"{name}.child", "parse"):
+                tracer.annotate("owner", name)
+                await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(task("a"), task("b"))
+
+    asyncio.run(main())
+
+    spans = {span.name: span for span in sink.spans}
+
+    for name in ("a", "b"):
+        assert spans[f"{name}.child"].parent_id == spans[name].id
+        assert spans[f"{name}.child"].attributes == {"owner": name}
+        assert spans[name].parent_id is None
@@ -0,0 +1,42 @@
+import pytest
+from bs4 import BeautifulSoup
+
+from film_central.vadapav.directory import Directory, DirectoryEntry, parse_directory, parse_directory_html
+
+PAGE = """
+<html><body>
+<div class="header"><span>not the breadcrumb</span></div>
+<div class="directory">
+    <div><span>TV</span><span>Show &amp; Co</span></div>
+    <div class="row"><a class="directory-entry" href="/t/">..</a></div>
+    <div class="row"><a class="directory-entry" href="/t/show/s01/">Season 01</a></div>
+    <div class="row"><a class="file-entry" href="/f/1" data-href="/t/show/e01.mkv">Show.S01E01.mkv</a><span>1.2 GB</span></div>
+    <div class="row"><a class="file-entry" href="/t/show/e01.srt">Show.S01E01.srt</a></div>
+</div>
+</body></html>
+"""
+
+def soup(html):
+    return BeautifulSoup(html, "html.parser")
+
+def test_the_fast_parser_matches_the_soup_parser():
+    fast = parse_directory_html("t/show", PAGE, lambda html: pytest.fail("fell back to the soup"))
+
+    assert fast == parse_directory("t/show", soup(PAGE))
+    assert fast == Directory(
+        "t/show",
+        ["TV", "Show & Co"],
+        [DirectoryEntry("..", "/t/"), DirectoryEntry("Season 01", "/t/show/s01/")],
+        [DirectoryEntry("Show.S01E01.mkv", "/t/show/e01.mkv"), DirectoryEntry("Show.S01E01.srt", "/t/show/e01.srt")],
+    )
+
+def test_pages_it_doesnt_understand_fall_back_to_the_soup():
+    fell_back = []
+
+    def fallback(html):
+        fell_back.append(html)
+        return soup(html)
+
+    directory = parse_directory_html("x", "<html><body><p>Not found</p></body></html>", fallback)
+
+    assert fell_back and directory == Directory("x")
@@ -0,0 +1,81 @@
+import hashlib
+from collections import Counter
+
+import httpx
+from mov_cli import MetadataType
+
+from film_central.vadapav.index import VadapavIndex, VadapavIndexer, IndexedTitle
+
+def make_site(vadapav_page):
+    return {
+        "/": vadapav_page("", [("Movies", "/m/"), ("TV", "/t/")]),
+        "/m/": vadapav_page("Movies", [("..", "/"), ("A", "/m/a/"), ("Alpha (2001)", "/m/alpha/")]),
+        "/m/a/": vadapav_page("Movies", [("..", "/m/"), ("Apple (2002)", "/m/a/apple/")]),
+        "/m/alpha/": vadapav_page("Movies", [("..", "/m/")], [("Alpha.1080p.mkv", "/m/alpha/1080.mkv"), ("Alpha.srt", "/m/alpha/en.srt")]),
+        "/m/a/apple/": vadapav_page("Movies", [("..", "/m/a/")], [("Apple.720p.mkv", "/m/a/apple/720.mkv")]),
+        "/t/": vadapav_page("TV", [("..", "/"), ("Show", "/t/show/")]),
+        "/t/show/": vadapav_page("TV", [("..", "/t/"), ("Season 01", "/t/show/s01/")]),
+        "/t/show/s01/": vadapav_page("TV", [("..", "/t/show/")], [("Show.S01E01.mkv", "/t/show/s01/e01.mkv"), ("Show.S01E02.mkv", "/t/show/s01/e02.mkv")]),
+    }
+
+def make_handler(site):
+    def handler(method, url, headers):
+        page = site[httpx.URL(url).path]
+        etag = hashlib.sha1(page.encode()).hexdigest()
+
+        if headers.get("If-None-Match") == etag:
+            return 304
+
+        return httpx.Response(200, text = page, headers = {"ETag": etag})
+
+    return handler
+
+def test_refresh_indexes_films_and_shows(tmp_path, fake_http_client, vadapav_page):
+    index = VadapavIndex(tmp_path.joinpath("index.sqlite3"))
+    VadapavIndexer(fake_http_client(make_handler(make_site(vadapav_page))), index, base_url = "https://vadapav.mov").refresh()
+
+    assert {title.title for title in index.search("a", 10)} == {"Alpha", "Apple"}
+    assert index.get_title("t/show").type == MetadataType.MULTI
+    assert index.get_title("m/alpha") == IndexedTitle("m/alpha", "Alpha", "2001", MetadataType.SINGLE, "/m/alpha/1080.mkv", "/m/alpha/en.srt")
+    assert index.season_episode_counts("t/show") == {1: 2}
+
+def test_incremental_refresh_skips_unchanged_groupings(tmp_path, fake_http_client, vadapav_page):
+    site = make_site(vadapav_page)
+    index = VadapavIndex(tmp_path.joinpath("index.sqlite3"))
+
+    VadapavIndexer(fake_http_client(make_handler(site)), index, base_url = "https://vadapav.mov").refresh()
+
+    site["/m/a/apple/"] = vadapav_page("Movies", [("..", "/m/a/")], [("Apple.2160p.mkv", "/m/a/apple/2160.mkv")])
+
+    http_client = fake_http_client(make_handler(site))
+    indexer = VadapavIndexer(http_client, index, base_url = "https://vadapav.mov")
+    indexer.refresh()
+
+    requested = Counter(httpx.URL(url).path for _, url, _ in http_client.requests)
+
+    assert max(requested.values()) == 1 # nothing is downloaded twice, unchanged groupings come from the index.
+    assert indexer.changed_directories == 2 # the root (always fetched) and the film that changed.
+    assert index.get_title("m/a/apple").file_href == "/m/a/apple/2160.mkv"
+
+def test_refresh_drops_titles_that_vanished(tmp_path, fake_http_client, vadapav_page):
+    site = make_site(vadapav_page)
+    index = VadapavIndex(tmp_path.joinpath("index.sqlite3"))
+
+    VadapavIndexer(fake_http_client(make_handler(site)), index, base_url = "https://vadapav.mov").refresh()
+
+    site["/m/"] = vadapav_page("Movies", [("..", "/"), ("A", "/m/a/")])
+    VadapavIndexer(fake_http_client(make_handler(site)), index, base_url = "https://vadapav.mov").refresh()
+
+    assert index.get_title("m/alpha") is None
+    assert index.get_title("m/a/apple") is not None
+
+def test_search_escapes_like_wildcards(tmp_path):
+    index = VadapavIndex(tmp_path.joinpath("index.sqlite3"))
+
+    for path, title in (("a", "my_film"), ("b", "myxfilm")):
+        index.save_title(IndexedTitle(path, title, None, MetadataType.SINGLE, None, None))
+
+    assert [title.path for title in index.search("my_film", 10)] == ["a"]
+
+def test_default_index_is_shared():
+    assert VadapavIndex.default() is VadapavIndex.default()
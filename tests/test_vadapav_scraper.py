@@ -0,0 +1,175 @@
+import time
+import types
+import threading
+
+import httpx
+import pytest
+from bs4 import BeautifulSoup
+from mov_cli import Config, Metadata, MetadataType
+from mov_cli.utils import EpisodeSelector
+
+from film_central.vadapav import VadapavScraper
+from film_central.vadapav.directory import DirectoryEntry, parse_directory_html
+from film_central.vadapav.scraper import classify_from_name, classify_search_result
+
+@pytest.mark.parametrize("name, href, expected", [
+    ("Alpha (2001)", "/Movies/Alpha (2001)/", (MetadataType.SINGLE, "Alpha", "2001")),
+    ("Doctor Who (2005)", "/TV/Doctor Who (2005)/", (MetadataType.MULTI, "Doctor Who (2005)", None)),
+    ("Doctor Who (2005)", "/TV%20Shows/Doctor%20Who%20(2005)/", (MetadataType.MULTI, "Doctor Who (2005)", None)),
+    ("Show (TV)", "/3f2a9c10/", (MetadataType.MULTI, "Show (TV)", None)),
+    ("Show Season 1-3", "/3f2a9c10/", (MetadataType.MULTI, "Show Season 1-3", None)),
+])
+def test_classifies_from_the_name_and_path(name, href, expected):
+    metadata = classify_from_name(DirectoryEntry(name, href))
+
+    assert (metadata.type, metadata.title, metadata.year) == expected
+    assert metadata.id == href.strip("/")
+
+@pytest.mark.parametrize("name", ["Doctor Who (2005)", "Alpha (2001)", "Alpha"])
+def test_names_alone_are_ambiguous(name):
+    assert classify_from_name(DirectoryEntry(name, "/3f2a9c10/")) is None
+
+def test_search_fetches_the_page_of_year_suffixed_results(fake_http_client, vadapav_page):
+    site = {
+        "/s/doctor": vadapav_page(
+            "Search",
+            [("..", "/"), ("Doctor Who (2005)", "/0001/"), ("Doctor Sleep (2019)", "/Movies/Doctor Sleep (2019)/")]
+        ),
+        "/0001": vadapav_page("TV", [("..", "/"), ("Season 01", "/0001/s01/")]),
+        "": vadapav_page(""),
+    }
+
+    http_client = fake_http_client(lambda method, url, headers: site[httpx.URL(url).path.rstrip("/")])
+    scraper = VadapavScraper(Config(), http_client, {"cache": False})
+
+    results = list(scraper.search("doctor", 10))
+
+    assert [(metadata.title, metadata.type, metadata.year) for metadata in results] == [
+        ("Doctor Who (2005)", MetadataType.MULTI, None),
+        ("Doctor Sleep", MetadataType.SINGLE, "2019"),
+    ]
+
+    # The film's path says what it is, only the show needed its page.
+    assert sorted(httpx.URL(url).path.rstrip("/") for _, url, _ in http_client.requests) == ["", "/0001", "/s/doctor"]
+
+def test_search_fetches_no_more_pages_than_the_limit_needs(fake_http_client, vadapav_page):
+    films = [(f"Film {i} (2000)", f"/{i:04}/") for i in range(6)]
+
+    def handler(method, url, headers):
+        path = httpx.URL(url).path.rstrip("/")
+
+        if path == "/s/film":
+            return vadapav_page("Search", [("..", "/"), *films])
+
+        return vadapav_page("" if path == "" else "Movies")
+
+    http_client = fake_http_client(handler)
+    results = list(VadapavScraper(Config(), http_client, {"cache": False}).search("film", 3))
+
+    assert [(metadata.title, metadata.year) for metadata in results] == [("Film 0", "2000"), ("Film 1", "2000"), ("Film 2", "2000")]
+    assert sorted(httpx.URL(url).path.rstrip("/") for _, url, _ in http_client.requests) == ["", "/0000", "/0001", "/0002", "/s/film"]
+
+@pytest.mark.parametrize("name, expected", [("Alpha (2001)", ("Alpha", "2001")), ("Alpha", ("Alpha", None))])
+def test_films_without_a_year_keep_their_title(name, expected, vadapav_page):
+    directory = parse_directory_html("0001", vadapav_page("Movies"), lambda html, **kwargs: BeautifulSoup(html, "html.parser", **kwargs))
+    metadata = classify_search_result(DirectoryEntry(name, "/0001/"), directory)
+
+    assert (metadata.title, metadata.year) == expected
+
+def make_show(vadapav_page):
+    return {
+        "/t/show": vadapav_page("TV", [("..", "/t/"), ("Season 01", "/t/show/s01/"), ("Season 02", "/t/show/s02/")]),
+        "/t/show/s01": vadapav_page(
+            "TV",
+            [("..", "/t/show/")],
+            [
+                ("Show.S01E01.1080p.mkv", "/t/show/s01/e01.mkv"),
+                ("Show.S01E01.srt", "/t/show/s01/e01.srt"),
+                ("Show.S01E02.1080p.mp4", "/t/show/s01/e02.mp4"),
+                ("Show.S01.Extras.mkv", "/t/show/s01/extras.mkv"),
+                ("notes.nfo", "/t/show/s01/notes.nfo"),
+            ]
+        ),
+    }
+
+def test_episode_counts_match_what_scrape_resolves(fake_http_client, vadapav_page):
+    site = make_show(vadapav_page)
+    site["/t/show/s02"] = vadapav_page("TV", [("..", "/t/show/")], [("Show.S02E01.mkv", "/t/show/s02/e01.mkv")])
+
+    scraper = VadapavScraper(Config(), fake_http_client(lambda method, url, headers: site[httpx.URL(url).path.rstrip("/")]), {"cache": False})
+    metadata = Metadata("t/show", "Show", MetadataType.MULTI)
+
+    assert scraper.scrape_episodes(metadata) == {1: 2, 2: 1}
+
+    first = scraper.scrape(metadata, EpisodeSelector(1, 1))
+    assert (first.url, first.subtitles) == ("https://vadapav.mov/t/show/s01/e01.mkv", {"en": "https://vadapav.mov/t/show/s01/e01.srt"})
+    assert scraper.scrape(metadata, EpisodeSelector(3, 1)) is None
+
+    season = list(scraper.scrape_season(metadata, 1))
+    assert [multi.url for multi in season] == ["https://vadapav.mov/t/show/s01/e01.mkv", "https://vadapav.mov/t/show/s01/e02.mp4"]
+
+def test_failed_next_season_prefetches_are_logged(fake_http_client, vadapav_page):
+    site = make_show(vadapav_page)
+    logged = threading.Event()
+
+    def handler(method, url, headers):
+        path = httpx.URL(url).path.rstrip("/")
+
+        if path == "/t/show/s02":
+            return httpx.ConnectError("season 2 is down")
+
+        return site[path]
+
+    scraper = VadapavScraper(Config(), fake_http_client(handler), {"cache": False, "retries": 0, "prefetch_next_season": True})
+    scraper.logger = types.SimpleNamespace(debug = lambda message: "season 2 is down" in message and logged.set())
+
+    # The last episode of season 1, so season 2 gets prefetched.
+    assert scraper.scrape(Metadata("t/show", "Show", MetadataType.MULTI), EpisodeSelector(2, 1)) is not None
+    assert logged.wait(5)
+
+def test_seasons_are_fetched_once_however_many_episodes_are_asked_for(fake_http_client, vadapav_page):
+    site = make_show(vadapav_page)
+    site["/t/show/s02"] = vadapav_page("TV", [("..", "/t/show/")], [("Show.S02E01.mkv", "/t/show/s02/e01.mkv")])
+
+    http_client = fake_http_client(lambda method, url, headers: site[httpx.URL(url).path.rstrip("/")])
+    scraper = VadapavScraper(Config(), http_client, {"cache": False})
+
+    episodes = [EpisodeSelector(2, 1), EpisodeSelector(1, 2), EpisodeSelector(1, 1), EpisodeSelector(9, 1)]
+    season = sorted(scraper.scrape_season(Metadata("t/show", "Show", MetadataType.MULTI), episodes = episodes), key = lambda multi: multi.url)
+
+    # Episodes that don't exist are left out.
+    assert [(multi.episode.season, multi.episode.episode, multi.url) for multi in season] == [
+        (1, 1, "https://vadapav.mov/t/show/s01/e01.mkv"),
+        (1, 2, "https://vadapav.mov/t/show/s01/e02.mp4"),
+        (2, 1, "https://vadapav.mov/t/show/s02/e01.mkv"),
+    ]
+    assert sorted(httpx.URL(url).path.rstrip("/") for _, url, _ in http_client.requests) == ["/t/show", "/t/show/s01", "/t/show/s02"]
+
+def test_seasons_that_fail_are_skipped(fake_http_client, vadapav_page):
+    site = make_show(vadapav_page)
+
+    def handler(method, url, headers):
+        path = httpx.URL(url).path.rstrip("/")
+
+        if path == "/t/show/s02":
+            return httpx.ConnectError("season 2 is down")
+
+        return site[path]
+
+    scraper = VadapavScraper(Config(), fake_http_client(handler), {"cache": False, "retries": 0})
+    episodes = [EpisodeSelector(1, 1), EpisodeSelector(1, 2)]
+
+    assert [multi.url for multi in scraper.scrape_season(Metadata("t/show", "Show", MetadataType.MULTI), episodes = episodes)] == [
+        "https://vadapav.mov/t/show/s01/e01.mkv"
+    ]
+
+def test_next_seasons_are_not_prefetched_unless_asked_to(fake_http_client, vadapav_page):
+    site = make_show(vadapav_page)
+    http_client = fake_http_client(lambda method, url, headers: site[httpx.URL(url).path.rstrip("/")])
+
+    # bflix's prefetch count doesn't turn it on.
+    scraper = VadapavScraper(Config(), http_client, {"cache": False, "prefetch": 3})
+    scraper.scrape(Metadata("t/show", "Show", MetadataType.MULTI), EpisodeSelector(2, 1))
+
+    time.sleep(0.1)
+    assert "/t/show/s02" not in [httpx.URL(url).path.rstrip("/") for _, url, _ in http_client.requests]
@@ -0,0 +1,108 @@
+import time
+
+import httpx
+from mov_cli import Config, Metadata, MetadataType
+from mov_cli.utils import EpisodeSelector
+
+from film_central.utils import variants, pick_variant, probe_variant
+from film_central.vadapav import VadapavScraper
+
+SAMPLE = b"x" * 1024
+
+def probe_client(handler):
+    """An httpx client answering every request with ``handler(request)``, remembering each request in ``client.requests``."""
+    requests = []
+
+    def handle(request):
+        requests.append(request)
+        return handler(request)
+
+    client = httpx.Client(transport = httpx.MockTransport(handle), follow_redirects = True)
+    client.requests = requests
+
+    return client
+
+def test_playlists_are_followed_to_a_segment():
+    pages = {
+        "https://cdn.test/master.m3u8": "#EXTM3U\n#EXT-X-STREAM-INF:BANDWIDTH=1\nlow/index.m3u8\n",
+        "https://cdn.test/low/index.m3u8": "#EXTM3U\n#EXTINF:4,\nsegment0.ts\n",
+    }
+
+    client = probe_client(
+        lambda request: httpx.Response(200, text = pages[str(request.url)]) if str(request.url) in pages else httpx.Response(206, content = SAMPLE)
+    )
+
+    probe = probe_variant(client, "https://cdn.test/master.m3u8", {"Referer": "https://site.test"}, sample_size = len(SAMPLE))
+
+    assert probe.ok and probe.url == "https://cdn.test/master.m3u8"
+    assert [str(request.url) for request in client.requests] == [
+        "https://cdn.test/master.m3u8", "https://cdn.test/low/index.m3u8", "https://cdn.test/low/segment0.ts"
+    ]
+    assert all(
+        (request.headers["Referer"], request.headers["Range"]) == ("https://site.test", "bytes=0-1023") for request in client.requests
+    )
+
+def test_failed_probes_are_not_ok_and_not_retried():
+    def down(request):
+        raise httpx.ConnectError("down")
+
+    for handler in (lambda request: httpx.Response(503), down):
+        client = probe_client(handler)
+
+        assert not probe_variant(client, "https://cdn.test/a.mp4").ok
+        assert len(client.requests) == 1
+
+def test_servers_ignoring_the_range_are_only_read_up_to_the_sample():
+    sent = []
+
+    def whole_file():
+        for _ in range(1000):
+            sent.append(1)
+            yield b"x" * 1024
+
+    client = probe_client(lambda request: httpx.Response(200, content = whole_file()))
+    probe = probe_variant(client, "https://cdn.test/a.mp4", sample_size = 4 * 1024)
+
+    assert probe.ok and probe.ttfb >= 0
+    assert len(sent) <= 5
+
+def test_picks_the_best_variant_that_keeps_up(monkeypatch):
+    def trickle():
+        for _ in range(4):
+            time.sleep(0.05) # far too slow for 4K.
+            yield b"x" * 64 * 1024
+
+    def handler(request):
+        if "2160" in request.url.path:
+            return httpx.Response(206, content = trickle())
+
+        if "broken" in request.url.path:
+            return httpx.Response(500)
+
+        return httpx.Response(206, content = b"x" * 256 * 1024)
+
+    monkeypatch.setattr(variants, "get_probe_client", lambda: probe_client(handler))
+
+    resolutions = {"https://cdn.test/broken.mkv": 4320, "https://cdn.test/2160.mkv": 2160, "https://cdn.test/1080.mkv": 1080}
+
+    picked = pick_variant(
+        None,
+        list(resolutions),
+        preference = resolutions.get,
+        required_throughput = lambda resolution: {2160: 4_000_000}.get(resolution, 0)
+    )
+
+    assert picked == "https://cdn.test/1080.mkv"
+
+def test_probing_is_opt_in(fake_http_client, vadapav_page):
+    page = vadapav_page(
+        "Movies", [("..", "/")], [("Film.720p.mkv", "/m/film/720.mkv"), ("Film.2160p.mkv", "/m/film/2160.mkv")]
+    )
+
+    http_client = fake_http_client(lambda *_: page)
+    media = VadapavScraper(Config(), http_client, {"cache": False}).scrape(
+        Metadata("m/film", "Film", MetadataType.SINGLE, year = "2000"), EpisodeSelector()
+    )
+
+    assert media.url == "https://vadapav.mov/m/film/2160.mkv"
+    assert [url for _, url, _ in http_client.requests] == ["https://vadapav.mov/m/film"]
@@ -0,0 +1,101 @@
+import json
+import types
+import threading
+
+import httpx
+import pytest
+
+from film_central.vidsrcto.ext import VidPlay
+from film_central.vidsrcto.ext import keys, vidplay
+from film_central.vidsrcto.ext.keys import KeyStore, FutokenStore
+
+PROVIDER = "https://vidplay.test"
+EMBED = f"{PROVIDER}/e/ABCDEF?t=token"
+
+KEYS_PAGE = json.dumps({"rawLines": [json.dumps(["key-one", "key-two"])]})
+FUTOKEN_PAGE = "var k = 'futoken';"
+MEDIAINFO = json.dumps({"result": {"sources": [{"file": "https://cdn.test/master.m3u8"}]}})
+
+@pytest.fixture(autouse = True)
+def stores(monkeypatch):
+    """Gives every test its own key and futoken stores instead of the process wide ones."""
+    monkeypatch.setattr(vidplay, "KEY_STORE", KeyStore(f"{PROVIDER}/keys.json"))
+    monkeypatch.setattr(vidplay, "FUTOKEN_STORE", FutokenStore())
+
+def paths(http_client):
+    return [httpx.URL(url).path.split("/")[1] for _, url, _ in http_client.requests]
+
+def test_the_futoken_is_fetched_with_the_embed_while_the_keys_are(fake_http_client):
+    futoken_requested = threading.Event()
+
+    def handler(method, url, headers):
+        path = httpx.URL(url).path
+
+        if path == "/futoken":
+            futoken_requested.set()
+            return FUTOKEN_PAGE
+
+        if path == "/keys.json":
+            # Fetching the keys and then the futoken one after the other would never get the keys.
+            return KEYS_PAGE if futoken_requested.wait(5) else 500
+
+        return MEDIAINFO
+
+    http_client = fake_http_client(handler)
+
+    assert VidPlay(http_client).resolve_source(EMBED, PROVIDER) == ["https://cdn.test/master.m3u8"]
+
+    futoken_headers = next(headers for _, url, headers in http_client.requests if url.endswith("/futoken"))
+    assert futoken_headers == {"Referer": EMBED}
+
+def rejecting_then_answering(rejections):
+    rejected = []
+
+    def handler(method, url, headers):
+        path = httpx.URL(url).path
+
+        if path == "/keys.json":
+            return KEYS_PAGE
+
+        if path == "/futoken":
+            return FUTOKEN_PAGE
+
+        if len(rejected) < rejections:
+            rejected.append(url)
+            return 403
+
+        return MEDIAINFO
+
+    return handler
+
+def test_fresh_keys_are_not_retried(fake_http_client):
+    http_client = fake_http_client(rejecting_then_answering(1))
+
+    assert VidPlay(http_client).resolve_source(EMBED, PROVIDER) == (None, None)
+    assert sorted(paths(http_client)) == ["futoken", "keys.json", "mediainfo"]
+
+def test_stale_keys_are_refetched_and_retried_once(fake_http_client, monkeypatch):
+    http_client = fake_http_client(rejecting_then_answering(1))
+    resolver = VidPlay(http_client)
+
+    resolver.encode_id("ABCDEF")
+    resolver.get_futoken("key", EMBED, PROVIDER)
+
+    # Two minutes later, the keys and futoken we have may have rotated.
+    now = keys.time.time()
+    monkeypatch.setattr(keys, "time", types.SimpleNamespace(time = lambda: now + 120))
+
+    assert resolver.resolve_source(EMBED, PROVIDER) == ["https://cdn.test/master.m3u8"]
+    assert sorted(paths(http_client)) == ["futoken"] * 2 + ["keys.json"] * 2 + ["mediainfo"] * 2
+
+def test_stale_keys_are_only_retried_once(fake_http_client, monkeypatch):
+    http_client = fake_http_client(rejecting_then_answering(2))
+    resolver = VidPlay(http_client)
+
+    resolver.encode_id("ABCDEF")
+
+    now = keys.time.time()
+    monkeypatch.setattr(keys, "time", types.SimpleNamespace(time = lambda: now + 120))
+
+    assert resolver.resolve_source(EMBED, PROVIDER) == (None, None)
+    assert paths(http_client).count("mediainfo") == 2
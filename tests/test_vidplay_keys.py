@@ -0,0 +1,61 @@
+import json
+import threading
+
+import httpx
+
+from film_central.vidsrcto.ext.keys import KeyStore, FutokenStore
+
+KEYS_PAGE = json.dumps({"rawLines": [json.dumps(["key-one", "key-two"])]})
+
+def test_keys_are_fetched_once_until_invalidated(fake_http_client):
+    http_client = fake_http_client(lambda *_: KEYS_PAGE)
+    store = KeyStore("https://keys.test/keys.json")
+
+    assert store.get(http_client) == ("key-one", "key-two")
+    assert store.get(http_client) == ("key-one", "key-two")
+    assert len(http_client.requests) == 1
+
+    store.invalidate()
+    store.get(http_client)
+
+    assert len(http_client.requests) == 2
+
+def test_expired_keys_are_fetched_again(fake_http_client):
+    http_client = fake_http_client(lambda *_: KEYS_PAGE)
+    store = KeyStore("https://keys.test/keys.json", ttl = 0, refresh_after = 0)
+
+    store.get(http_client)
+    store.get(http_client)
+
+    assert len(http_client.requests) == 2
+
+def test_futokens_are_kept_per_host_and_fetched_once_at_a_time(fake_http_client):
+    release = threading.Event()
+
+    def handler(method, url, headers):
+        release.wait(5)
+        return f"var k = '{httpx.URL(url).host}-token';"
+
+    http_client = fake_http_client(handler)
+    store = FutokenStore()
+
+    results = []
+    threads = [threading.Thread(target = lambda: results.append(store.get(http_client, "https://a.test", "https://a.test/e/one"))) for _ in range(4)]
+
+    for thread in threads:
+        thread.start()
+
+    threading.Timer(0.1, release.set).start()
+
+    for thread in threads:
+        thread.join()
+
+    assert results == ["a.test-token"] * 4
+    assert store.get(http_client, "https://b.test", "https://b.test/e/two") == "b.test-token"
+    assert len(http_client.requests) == 2
+    assert [headers["Referer"] for _, _, headers in http_client.requests] == ["https://a.test/e/one", "https://b.test/e/two"]
+
+    store.invalidate("https://a.test")
+    store.get(http_client, "https://a.test", "https://a.test/e/three")
+
+    assert len(http_client.requests) == 3
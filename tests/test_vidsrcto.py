@@ -0,0 +1,159 @@
+import json
+import base64
+from urllib.parse import quote
+
+import httpx
+import pytest
+from mov_cli import Config, Metadata, MetadataType
+from mov_cli.utils import EpisodeSelector
+
+from film_central.vidsrcto import VidSrcToScraper
+from film_central.vidsrcto import scraper as vidsrcto_scraper
+from film_central.vidsrcto.ext import vidplay, rc4_decode
+from film_central.vidsrcto.ext.keys import KeyStore, FutokenStore
+
+MOVIES = [{"id": 550, "title": "Fight Club", "release_date": "1999-10-15", "poster_path": "/a.jpg"}]
+SHOWS = [{"id": 1399, "name": "Game of Thrones", "first_air_date": "2011-04-17", "poster_path": "/b.jpg"}]
+SEASONS = [{"season_number": 0, "episode_count": 5}, {"season_number": 1, "episode_count": 10}]
+KEYS_PAGE = json.dumps({"rawLines": [json.dumps(["key-one", "key-two"])]})
+
+def tmdb_handler(method, url, headers):
+    url = httpx.URL(url)
+
+    if url.host != "api.themoviedb.org":
+        return 200 # every embed exists.
+
+    if url.path == "/3/search/movie":
+        return httpx.Response(200, text = json.dumps({"results": MOVIES}))
+
+    if url.path == "/3/search/tv":
+        return httpx.Response(200, text = json.dumps({"results": SHOWS}))
+
+    return httpx.Response(200, text = json.dumps({"seasons": SEASONS}))
+
+def tmdb_requests(http_client):
+    return [url for _, url, _ in http_client.requests if "api.themoviedb.org" in url]
+
+def test_tmdb_lookups_are_answered_by_the_http_cache(fake_http_client):
+    http_client = fake_http_client(tmdb_handler)
+    scraper = VidSrcToScraper(Config(), http_client, {"probe": False})
+
+    for _ in range(2):
+        results = list(scraper.search("tmdb cache test", 10))
+        show = next(metadata for metadata in results if metadata.type == MetadataType.MULTI)
+
+        assert scraper.scrape_episodes(show) == {1: 10}
+
+    # Both searches and the show's seasons, each only asked for once.
+    assert len(tmdb_requests(http_client)) == 3
+
+def test_no_cache_always_asks_tmdb(fake_http_client):
+    http_client = fake_http_client(tmdb_handler)
+    scraper = VidSrcToScraper(Config(), http_client, {"cache": False, "probe": False})
+
+    for _ in range(2):
+        assert [metadata.title for metadata in scraper.search("tmdb no cache test", 10)] == ["Fight Club", "Game of Thrones"]
+
+    assert len(tmdb_requests(http_client)) == 4
+
+FILM_EMBED = "https://vidsrc.to/embed/movie/550"
+
+def embed_handler(answers):
+    """Answers TMDB like ``tmdb_handler`` and every embed with ``answers[method]`` (200 if missing)."""
+    def handler(method, url, headers):
+        if httpx.URL(url).host == "vidsrc.to":
+            return answers.get(method, 200) if url == FILM_EMBED else 200
+
+        return tmdb_handler(method, url, headers)
+
+    return handler
+
+def embed_requests(http_client):
+    return [method for method, url, _ in http_client.requests if url == FILM_EMBED]
+
+def search_titles(scraper):
+    return [metadata.title for metadata in scraper.search("embed probe test", 10)]
+
+def test_available_embeds_take_a_single_head(fake_http_client):
+    http_client = fake_http_client(embed_handler({}))
+
+    assert search_titles(VidSrcToScraper(Config(), http_client, {"cache": False})) == ["Fight Club", "Game of Thrones"]
+    assert embed_requests(http_client) == ["HEAD"]
+
+def test_missing_embeds_are_remembered_between_runs(fake_http_client):
+    http_client = fake_http_client(embed_handler({"HEAD": 404}))
+
+    for _ in range(2):
+        assert search_titles(VidSrcToScraper(Config(), http_client, {})) == ["Game of Thrones"]
+
+    # The second run knew it was missing without asking.
+    assert embed_requests(http_client) == ["HEAD"]
+
+def test_remembered_missing_embeds_expire(fake_http_client, monkeypatch):
+    monkeypatch.setattr(vidsrcto_scraper, "MISSING_EMBED_TTL", 0)
+    http_client = fake_http_client(embed_handler({"HEAD": 404}))
+
+    for _ in range(2):
+        assert search_titles(VidSrcToScraper(Config(), http_client, {})) == ["Game of Thrones"]
+
+    assert embed_requests(http_client) == ["HEAD", "HEAD"]
+
+@pytest.mark.parametrize("refused", [405, 501])
+@pytest.mark.parametrize("found, expected", [(200, ["Fight Club", "Game of Thrones"]), (404, ["Game of Thrones"])])
+def test_refused_heads_fall_back_to_a_get(fake_http_client, refused, found, expected):
+    http_client = fake_http_client(embed_handler({"HEAD": refused, "GET": found}))
+
+    assert search_titles(VidSrcToScraper(Config(), http_client, {"cache": False})) == expected
+    assert embed_requests(http_client) == ["HEAD", "GET"]
+
+SHOW = Metadata(1399, "Game of Thrones", MetadataType.MULTI)
+
+def vidsrcto_site(failing_embed):
+    """vidsrc.to and vidplay for every episode of SHOW, the stream of each is named after its episode."""
+    def handler(method, url, headers):
+        url = httpx.URL(url)
+
+        if url.host == "github.com":
+            return KEYS_PAGE
+
+        if url.path.startswith("/embed/tv/"):
+            season, episode = url.path.split("/")[-2:]
+
+            if url.path == failing_embed:
+                return httpx.ConnectError("embed is down")
+
+            return f'<html><body><a data-id="s{season}e{episode}">Server</a></body></html>'
+
+        if url.path.startswith("/ajax/embed/episode/"):
+            return json.dumps({"result": [{"title": "Vidplay", "id": url.path.split("/")[-2]}]})
+
+        if url.path.startswith("/ajax/embed/source/"):
+            vidplay_url = quote(f"https://vid2v11.site/e/ABCDEF?t={url.path.split('/')[-1]}")
+            encoded_url = base64.b64encode(bytes(rc4_decode("WXrUARXb1aDLaZjI", vidplay_url.encode()))).decode()
+
+            return json.dumps({"result": {"url": encoded_url.replace("/", "_").replace("+", "-")}})
+
+        if url.path == "/futoken":
+            return "var k = 'futoken';"
+
+        return json.dumps({"result": {"sources": [{"file": f"https://cdn.test/{url.params['t']}.m3u8"}]}})
+
+    return handler
+
+def test_seasons_share_keys_and_skip_failed_episodes(fake_http_client, monkeypatch):
+    monkeypatch.setattr(vidplay, "KEY_STORE", KeyStore("https://github.com/keys.json"))
+    monkeypatch.setattr(vidplay, "FUTOKEN_STORE", FutokenStore())
+
+    http_client = fake_http_client(vidsrcto_site(failing_embed = "/embed/tv/1399/1/2"))
+    scraper = VidSrcToScraper(Config(), http_client, {"cache": False, "retries": 0})
+
+    episodes = [EpisodeSelector(1, 1), EpisodeSelector(2, 1), EpisodeSelector(1, 2)]
+    season = sorted(scraper.scrape_season(SHOW, episodes = episodes), key = lambda multi: (multi.episode.season, multi.episode.episode))
+
+    assert [(multi.episode.season, multi.episode.episode, multi.url) for multi in season] == [
+        (1, 1, "https://cdn.test/s1e1.m3u8"), (2, 1, "https://cdn.test/s2e1.m3u8")
+    ]
+
+    # Every episode is resolved with the same keys and futoken.
+    paths = [httpx.URL(url).path for _, url, _ in http_client.requests]
+    assert (paths.count("/keys.json"), paths.count("/futoken")) == (1, 1)